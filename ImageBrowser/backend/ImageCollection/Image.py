@@ -11,7 +11,9 @@ __all__ = ['FileImage']
 ####################################################################################################
 
 from pathlib import Path
+from typing import Optional
 import logging
+import os
 
 import numpy as np
 
@@ -87,8 +89,8 @@ class FileImage(ImageAbc, File):
 
     ##############################################
 
-    def __init__(self, path: Path) -> None:
-        File.__init__(self, path)
+    def __init__(self, path: Path, resolve: bool = True, stat: Optional[os.stat_result] = None) -> None:
+        File.__init__(self, path, resolve=resolve, stat=stat)
         ImageAbc.__init__(self)
         #! self._logger.info(repr(self))   # _index is not yet defined
 
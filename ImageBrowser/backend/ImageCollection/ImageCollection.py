@@ -6,16 +6,29 @@
 #
 ####################################################################################################
 
-__all__ = ['ImageCollection', 'DirectoryCollection']
+__all__ = [
+    'ImageCollection', 'DirectoryCollection', 'RecursiveDirectoryCollection',
+    'CollectionChanges', 'SnapshotChanges',
+]
 
 ####################################################################################################
 
 from pathlib import Path
-from typing import Iterator, Union, Callable
+from typing import Iterator, NamedTuple, Optional, Union, Callable
 import logging
 import os
+import stat as stat_mode
+import threading
+import time
 
 from .Image import FileImage
+from .MetadataStore import MetadataStore
+from .ScanIndex import ScanIndex, ScanRecord, EntryKind
+from ImageBrowser.backend.thumbnail import FreeDesktop
+from ImageBrowser.library.path.walker import ParallelWalker
+from ImageBrowser.library.unicode import Collation, collation
+
+import numpy as np
 
 type PathOrStr = Union[Path, str]
 
@@ -27,14 +40,22 @@ LINESEP = os.linesep
 
 ####################################################################################################
 
-class Image(FileImage):
+class Image:
+
+    """Class to implement a view on an image of a collection.
+
+    The metadata are stored in the columns of the collection, thus a view is made on demand and
+    only holds a reference to the collection and an index.
+
+    """
+
+    __slots__ = ('_collection', '_index')
 
     _logger = _module_logger.getChild('Image')
 
     ##############################################
 
-    def __init__(self, collection: 'ImageCollection', path: Path, index: int) -> None:
-        super().__init__(path)
+    def __init__(self, collection: 'ImageCollection', index: int) -> None:
         self._collection = collection
         self._index = index
 
@@ -51,22 +72,115 @@ class Image(FileImage):
     ##############################################
 
     def __repr__(self) -> str:
-        return f"{self._path} {self._index}"
+        return f"{self.path} {self._index}"
 
     def __int__(self) -> int:
         return self._index
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Image):
+            return NotImplemented
+        return self._collection is other._collection and self._index == other._index
+
+    def __hash__(self) -> int:
+        return hash((id(self._collection), self._index))
+
     ##############################################
 
     def __lt__(self, other: 'Image') -> bool:
         """Sort by index"""
         return int(self) < int(other)
 
+    ##############################################
+
+    @property
+    def name(self) -> str:
+        return Path(self._collection.name_of(self._index)).name
+
+    @property
+    def path(self) -> Path:
+        return self._collection.path_of(self._index)
+
+    @property
+    def path_str(self) -> str:
+        return str(self.path)
+
+    @property
+    def stem(self) -> str:
+        return self.path.stem
+
+    @property
+    def suffix(self) -> str:
+        return self.path.suffix
+
+    ##############################################
+
+    def _value(self, column: str) -> int:
+        return self._collection.store.value(column, self._index)
+
+    @property
+    def size(self) -> int:
+        return self._value('size')
+
+    @property
+    def mtime(self) -> int:
+        return self._value('mtime_ns')
+
+    @property
+    def inode(self) -> int:
+        return self._value('inode')
+
+    @property
+    def device(self) -> int:
+        return self._value('device')
+
+    ##############################################
+
+    @property
+    def file(self) -> FileImage:
+        """Return a file image to load the image or to use the full file API"""
+        return FileImage(self.path, resolve=False)
+
+####################################################################################################
+
+class CollectionChanges(NamedTuple):
+
+    """Indexes of the images added, removed and modified by an update of a collection"""
+
+    added: list[int]
+    removed: list[int]
+    modified: list[int]
+    subdirectories_changed: bool = False
+
+    ##############################################
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified or self.subdirectories_changed)
+
+####################################################################################################
+
+class SnapshotChanges(NamedTuple):
+
+    """Changes of a directory snapshot, computed by :meth:`DirectoryCollection.diff_snapshot`"""
+
+    # image indexes
+    removed: list[int]
+    added: list[ScanRecord]
+    # (image index, record)
+    modified: list[tuple[int, ScanRecord]]
+    # names of the subdirectories of the snapshot
+    subdirectories: list[str]
+
 ####################################################################################################
 
 class ImageCollection:
 
-    """Class to implement an abstract collection of images"""
+    """Class to implement an abstract collection of images.
+
+    An image is identified by its index, which is stable: a removed image is kept as a tombstone
+    in the store, thus :meth:`__len__` can be lower than the number of indexes.
+
+    """
 
     __image_cls__ = Image
 
@@ -77,80 +191,237 @@ class ImageCollection:
         '.webp',
         '.tiff',
     )
+    if FreeDesktop.rawpy is not None:
+        # the camera RAW files are thumbnailed using rawpy
+        EXTENSIONS += FreeDesktop.Thumbnail.RAW_EXTENSIONS
+
+    # sort key -> column, None is the index order
+    SORT_KEYS = {
+        'index': None,
+        'name': 'collation',   # locale aware order of the names
+        'natural': 'natural_collation',   # idem, but the numbers are compared by value
+        'bytes': 'name',   # order of the encoded names
+        'mtime': 'mtime_ns',
+        'size': 'size',
+    }
+
+    # collation column -> numeric
+    COLLATIONS = {
+        'collation': False,
+        'natural_collation': True,
+    }
 
     _logger = _module_logger.getChild('ImageCollection')
 
     ##############################################
 
     def __init__(self) -> None:
-        self._images = []
+        self._store = MetadataStore()
+        # sort key -> permutation, cleared when the collection changes
+        self._permutations = {}
+        # incremented when the collection changes, the loader thread appends while the GUI sorts
+        self._generation = 0
+        self._permutations_lock = threading.Lock()
+        # name -> index, built on demand to apply updates
+        self._index_by_name = None
+        # collation -> sort keys of the names, computed once per image
+        self._sort_keys = {}
 
     ##############################################
 
+    @property
+    def store(self) -> MetadataStore:
+        return self._store
+
     def __len__(self) -> int:
-        return len(self._images)
+        return len(self._store) - self._store.number_of_removed
 
     @property
     def number_of_images(self) -> int:
-        return len(self._images)
+        return len(self)
 
     @property
     def last_index(self) -> int:
-        return len(self._images) - 1
+        return len(self._store) - 1
 
     ##############################################
 
-    def __getitem__(self, index) -> Image:
-        return self._images[index]
+    def name_of(self, index: int) -> str:
+        return self._store.name(index)
+
+    def path_of(self, index: int) -> Path:
+        # the name is the absolute path
+        return Path(self._store.name(index))
+
+    def _name_for(self, path: Path) -> str:
+        return str(path)
+
+    def index_of(self, name: str) -> Optional[int]:
+        """Return the index of the image *name* if it is in the collection"""
+        if self._index_by_name is None:
+            store = self._store
+            self._index_by_name = {
+                store.name(_): _ for _ in range(len(store)) if not store.is_removed(_)
+            }
+        return self._index_by_name.get(name)
+
+    def is_removed(self, index: int) -> bool:
+        return self._store.is_removed(index)
+
+    ##############################################
+
+    def __getitem__(self, index: int) -> Image:
+        length = len(self._store)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f"image index {index} out of range")
+        return self.__image_cls__(self, index)
 
     @property
     def first_image(self) -> Image:
         try:
-            return self._images[0]
+            return self[0]
         except IndexError:
             return None
 
     @property
     def last_image(self) -> Image:
         try:
-            return self._images[-1]
+            return self[-1]
         except IndexError:
             return None
 
     ##############################################
 
     def __iter__(self) -> Iterator[Image]:
-        # Should be by index
-        return iter(self._images)
+        return self._iter_permutation(self._store.live_indexes())
+
+    def _iter_permutation(self, permutation: Iterator[int]) -> Iterator[Image]:
+        for index in permutation:
+            yield self.__image_cls__(self, int(index))
 
     def iter_by(self, key: Callable) -> Iterator[Image]:
-        images = list(self._images)
-        images.sort(key=key)
-        return iter(images)
+        return iter(sorted(self, key=key))
+
+    def permutation(self, key: str, reverse: bool = False) -> np.ndarray:
+        """Return the permutation which sorts the collection by *key*, a key of :attr:`SORT_KEYS`.
+
+        The permutation is computed once and cached until the collection changes.  A reverse order
+        is a reversed view on the permutation.
+
+        """
+        permutation = self._permutations.get(key)
+        if permutation is None:
+            generation = self._generation
+            column = self.SORT_KEYS[key]
+            if column is None:
+                permutation = self._store.live_indexes()
+            elif column in self.COLLATIONS:
+                permutation = self._argsort_sort_keys(collation(numeric=self.COLLATIONS[column]))
+            else:
+                permutation = self._store.argsort(column)
+            # a reader must not modify the cache
+            permutation.flags.writeable = False
+            with self._permutations_lock:
+                # the collection was modified during the sort, the permutation is outdated
+                if generation == self._generation:
+                    self._permutations[key] = permutation
+        if reverse:
+            return permutation[::-1]
+        return permutation
+
+    def _invalidate_permutations(self) -> None:
+        with self._permutations_lock:
+            self._generation += 1
+            self._permutations.clear()
+
+    def sort_keys(self, collation: Collation) -> np.ndarray:
+        """Return the collation sort keys of the names, indexed by image index.
+
+        The sort keys are computed only for the images added since the last call.  The names are
+        never modified, thus the sort keys are valid as long as the collation is the same.
+
+        """
+        # Note: the loader thread can compute the keys while the GUI thread sorts,
+        #   the work is then done twice but the result is the same.
+        sort_keys = self._sort_keys.get(collation, np.empty(0, dtype=bytes))
+        length = len(self._store)
+        start = len(sort_keys)
+        if start < length:
+            # an ICU sort key doesn't contain a null byte, thus a NumPy bytes array can store it
+            _ = np.array(collation.sort_keys(self._store.name(i) for i in range(start, length)), dtype=bytes)
+            sort_keys = np.concatenate((sort_keys, _))
+            self._sort_keys[collation] = sort_keys
+        return sort_keys[:length]
+
+    def _argsort_sort_keys(self, collation: Collation) -> np.ndarray:
+        # a bytes sort, without ICU call
+        permutation = np.argsort(self.sort_keys(collation), kind='stable')
+        if self._store.number_of_removed:
+            permutation = permutation[~self._store.column('removed')[permutation]]
+        return permutation
+
+    def iter_sorted(self, key: str, reverse: bool = False) -> Iterator[Image]:
+        return self._iter_permutation(self.permutation(key, reverse))
 
     @property
     def iter_by_index(self) -> Iterator[Image]:
-        # return self.iter_by(lambda image: int(image))
-        return self.iter_by(lambda image: image.index)
+        return iter(self)
 
     @property
     def iter_by_name(self) -> Iterator[Image]:
-        return self.iter_by(lambda image: image.name)
+        return self.iter_sorted('name')
+
+    @property
+    def iter_by_natural_name(self) -> Iterator[Image]:
+        return self.iter_sorted('natural')
 
     @property
     def iter_by_mtime(self) -> Iterator[Image]:
-        return self.iter_by(lambda image: image.mtime)
+        return self.iter_sorted('mtime')
 
     @property
     def iter_by_size(self) -> Iterator[Image]:
-        return self.iter_by(lambda image: image.size)
+        return self.iter_sorted('size')
 
     ##############################################
 
-    def add_image(self, path: PathOrStr) -> Image:
-        _ = self.__image_cls__(self, path, len(self._images))
-        self._images.append(_)
-        return _
+    def _append(self, name: str, size: int, mtime_ns: int, inode: int, device: int) -> Image:
+        index = self._store.append(name, size, mtime_ns, inode, device)
+        if self._index_by_name is not None:
+            self._index_by_name[name] = index
+        self._invalidate_permutations()
+        return self.__image_cls__(self, index)
+
+    def _remove(self, index: int) -> None:
+        if self._index_by_name is not None:
+            self._index_by_name.pop(self._store.name(index), None)
+        self._store.remove(index)
+        self._invalidate_permutations()
+
+    def _update(self, index: int, size: int, mtime_ns: int, inode: int, device: int) -> bool:
+        """Update the metadata of an image and return True if they changed"""
+        store = self._store
+        if (store.value('size', index) == size
+            and store.value('mtime_ns', index) == mtime_ns
+            and store.value('inode', index) == inode):
+            return False
+        store.update(index, size, mtime_ns, inode, device)
+        self._invalidate_permutations()
+        return True
+
+    def add_image(self, path: PathOrStr, stat: Optional[os.stat_result] = None) -> Image:
+        path = Path(path)
+        if stat is None:
+            stat = path.stat()
+        return self._append(
+            self._name_for(path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            stat.st_ino,
+            stat.st_dev,
+        )
 
 ####################################################################################################
 
@@ -162,11 +433,24 @@ class DirectoryCollection(ImageCollection):
 
     ##############################################
 
-    def __init__(self, path: PathOrStr) -> None:
+    BATCH_SIZE = 256
+
+    ##############################################
+
+    def __init__(self, path: PathOrStr, scan: bool = True, index: Optional[ScanIndex] = None) -> None:
+        """When *scan* is False, the directory must be scanned using :meth:`iter_scan`.
+
+        If a scan *index* is given, it is used to skip the scan of an unchanged directory.
+
+        """
         super().__init__()
         self._path = Path(str(path)).expanduser().resolve()
+        self._index = index
+        self._device = None
         self._subdirectories = []
-        self._get_images()
+        self._number_of_entries = 0
+        if scan:
+            self._get_images()
 
     ##############################################
 
@@ -177,45 +461,396 @@ class DirectoryCollection(ImageCollection):
     def joinpath(self, name: str) -> Path:
         return self._path.joinpath(str(name))
 
+    def path_of(self, index: int) -> Path:
+        # the name is relative to the directory, or absolute
+        return self._path.joinpath(self._store.name(index))
+
+    def _name_for(self, path: Path) -> str:
+        if path.parent == self._path:
+            return path.name
+        return str(path)
+
     ##############################################
 
     @property
     def subdirectories(self) -> list[str]:
         return self._subdirectories
 
+    @property
+    def number_of_entries(self) -> int:
+        """Number of directory entries scanned so far"""
+        return self._number_of_entries
+
     ##############################################
 
     def _add_subdirectory(self, name: str) -> None:
         # Fixme: check duplicate ?
         self._subdirectories.append(name)
 
-    ##############################################
+    def _remove_subdirectory(self, name: str) -> bool:
+        try:
+            self._subdirectories.remove(name)
+            return True
+        except ValueError:
+            return False
 
-    # @property
-    # def _iter_dir(self) -> Iterator[str]:
-    #     return self._path.iterdir()
+    ##############################################
 
-    # Fixme: merge ?
-    #  callback ?
+    def _is_image(self, name: str) -> bool:
+        # e.g. IMG_0001.CR2
+        return os.path.splitext(name)[1].lower() in self.EXTENSIONS
 
     @property
-    def _iter_dir(self) -> Iterator[tuple[str, bool]]:
-        # For efficiency, scan directory in a single pass
-        # for name in self._iter_dir:
-        for name in self._path.iterdir():
-            path = self.joinpath(name)
-            if path.is_file() and path.suffix in self.EXTENSIONS:
-                yield path, False
-            elif path.is_dir():
-                yield path, True
+    def _iter_dir(self) -> Iterator[os.DirEntry]:
+        # For efficiency, scan directory in a single pass using os.scandir
+        #   On Linux, getdents returns the entry type, thus is_file/is_dir don't need a stat
+        #   unless the filesystem doesn't fill d_type or the entry is a symlink.
+        with os.scandir(self._path) as it:
+            yield from it
+
+    def _record_for(self, entry: os.DirEntry) -> Optional[ScanRecord]:
+        """Return a record for a subdirectory or an image entry"""
+        try:
+            if entry.is_dir():
+                # the mode tells a linked directory, see RecursiveDirectoryCollection
+                mode = stat_mode.S_IFLNK if entry.is_symlink() else stat_mode.S_IFDIR
+                return ScanRecord(entry.name, EntryKind.DIRECTORY, mode)
+            elif self._is_image(entry.name) and entry.is_file():
+                if entry.is_symlink():
+                    # stat will be done on the target
+                    return ScanRecord(entry.name, EntryKind.SYMLINK_IMAGE)
+                # use the stat cached by the entry, one lstat syscall at most per image
+                stat = entry.stat(follow_symlinks=False)
+                return ScanRecord.from_stat(entry.name, EntryKind.IMAGE, stat)
+        except Exception as e:
+            self._logger.warning(f"Error on {entry.path}{LINESEP}{e}")
+        return None
+
+    def _iter_records(self) -> Iterator[ScanRecord]:
+        directory_stat = self._path.stat()
+        # a regular file is on the device of its directory
+        self._device = directory_stat.st_dev
+        if self._index is None:
+            for entry in self._iter_dir:
+                self._number_of_entries += 1
+                record = self._record_for(entry)
+                if record is not None:
+                    yield record
+            return
+        records = self._index.lookup(self._path, directory_stat)
+        if records is not None:
+            self._logger.info(f"{self._path} is up to date in the scan index")
+            for record in records:
+                self._number_of_entries += 1
+                yield record
+        else:
+            # Note: a known entry is stat again, a file rewritten in place keeps its inode but
+            #   not its size and mtime
+            records = []
+            for entry in self._iter_dir:
+                self._number_of_entries += 1
+                record = self._record_for(entry)
+                if record is not None:
+                    records.append(record)
+                    yield record
+            # reached only if the scan is complete
+            self._index.store(self._path, directory_stat, records)
+
+    def _add_record(self, record: ScanRecord) -> Optional[Image]:
+        """Add a record and return the image if any"""
+        try:
+            match record.kind:
+                case EntryKind.DIRECTORY:
+                    self._add_subdirectory(record.name)
+                case EntryKind.SYMLINK_IMAGE:
+                    # follow the link
+                    return self.add_image(self.joinpath(record.name))
+                case EntryKind.IMAGE:
+                    return self._append(record.name, record.size, record.mtime_ns, record.inode, self._device)
+        except Exception as e:
+            self._logger.warning(f"Error on {self.joinpath(record.name)}{LINESEP}{e}")
+        return None
+
+    def iter_scan(
+        self,
+        batch_size: int = BATCH_SIZE,
+        time_budget: Optional[float] = None,
+    ) -> Iterator[list[Image]]:
+        """Scan the directory and yield the new images by batch.
+
+        A batch is yielded as soon as *batch_size* images are found, or when *time_budget* seconds
+        are elapsed since the last yield.  Thus a batch can be empty, it gives the caller a chance
+        to process events while a directory with a lot of non image entries is scanned.
+
+        """
+        batch = []
+        start = time.monotonic()
+        for record in self._iter_records():
+            image = self._add_record(record)
+            if image is not None:
+                batch.append(image)
+            if (len(batch) >= batch_size
+                or (time_budget is not None and time.monotonic() - start >= time_budget)):
+                yield batch
+                batch = []
+                start = time.monotonic()
+        if batch:
+            yield batch
 
     def _get_images(self) -> None:
-        for path, is_dir in self._iter_dir:
-            if is_dir:
-                self._add_subdirectory(path.name)
-            else:
+        for _ in self.iter_scan():
+            pass
+
+    ##############################################
+
+    def stat_names(self, names: Iterator[str]) -> dict[str, Optional[os.stat_result]]:
+        """Stat the entries *names* of the directory, the value is None for a missing entry.
+
+        This method doesn't modify the collection, thus it can be called from a worker thread.
+
+        """
+        stats = {}
+        for name in names:
+            try:
+                # follow the symlinks like add_image
+                stats[name] = os.stat(self.joinpath(name))
+            except OSError:
+                stats[name] = None
+        return stats
+
+    def apply_stats(self, stats: dict[str, Optional[os.stat_result]]) -> CollectionChanges:
+        """Update the collection from the stats of some entries, see :meth:`stat_names`"""
+        changes = CollectionChanges([], [], [])
+        subdirectories_changed = False
+        for name, stat in stats.items():
+            if stat is not None and stat_mode.S_ISDIR(stat.st_mode):
+                if name not in self._subdirectories:
+                    self._add_subdirectory(name)
+                    subdirectories_changed = True
+                continue
+            if stat is None and self._remove_subdirectory(name):
+                subdirectories_changed = True
+                continue
+            if not self._is_image(name):
+                continue
+            index = self.index_of(name)
+            if stat is None or not stat_mode.S_ISREG(stat.st_mode):
+                if index is not None:
+                    self._remove(index)
+                    changes.removed.append(index)
+            elif index is None:
+                image = self._append(name, stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_dev)
+                changes.added.append(image.index)
+            elif self._update(index, stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_dev):
+                changes.modified.append(index)
+        return changes._replace(subdirectories_changed=subdirectories_changed)
+
+    ##############################################
+
+    def snapshot(self) -> list[ScanRecord]:
+        """Scan the directory and return its records sorted by encoded name.
+
+        The symlinks to images are resolved.  The scan index is updated.
+
+        This method doesn't modify the collection, thus it can be called from a worker thread.
+
+        """
+        directory_stat = self._path.stat()
+        records = []
+        for entry in self._iter_dir:
+            record = self._record_for(entry)
+            if record is None:
+                continue
+            if record.kind == EntryKind.SYMLINK_IMAGE:
                 try:
-                    self.add_image(path)
-                except Exception as e:
-                    self._logger.warning(f"Error on {path}{LINESEP}{e}")
-        self._images.sort()   # by index
+                    record = ScanRecord.from_stat(record.name, record.kind, entry.stat())
+                except OSError:
+                    # dangling link
+                    continue
+            records.append(record)
+        if self._index is not None:
+            self._index.store(self._path, directory_stat, records)
+        records.sort(key=lambda _: os.fsencode(_.name))
+        return records
+
+    def diff_snapshot(self, records: list[ScanRecord]) -> SnapshotChanges:
+        """Compare a :meth:`snapshot` with the collection and return the changes to apply.
+
+        The images sorted by name are merged with the records on (name, inode, mtime, size).
+
+        This method doesn't modify the collection, thus it can be called from a worker thread while
+        the collection is not updated, then the changes are applied by :meth:`apply_snapshot_changes`.
+
+        """
+        changes = SnapshotChanges([], [], [], [])
+        images = []
+        for record in records:
+            if record.kind == EntryKind.DIRECTORY:
+                changes.subdirectories.append(record.name)
+            else:
+                images.append(record)
+        store = self._store
+        # the permutation excludes the removed images and is cached
+        permutation = self.permutation('bytes')
+        inodes = store.column('inode')
+        mtimes = store.column('mtime_ns')
+        sizes = store.column('size')
+        i = j = 0
+        number_of_images = len(permutation)
+        number_of_records = len(images)
+        while i < number_of_images or j < number_of_records:
+            if i < number_of_images:
+                index = int(permutation[i])
+                name = store.name_bytes(index)
+            if j < number_of_records:
+                record = images[j]
+                record_name = os.fsencode(record.name)
+            if j == number_of_records or (i < number_of_images and name < record_name):
+                changes.removed.append(index)
+                i += 1
+            elif i == number_of_images or record_name < name:
+                changes.added.append(record)
+                j += 1
+            else:
+                if (int(inodes[index]) != record.inode
+                    or int(mtimes[index]) != record.mtime_ns
+                    or int(sizes[index]) != record.size):
+                    changes.modified.append((index, record))
+                i += 1
+                j += 1
+        return changes
+
+    def apply_snapshot_changes(self, changes: SnapshotChanges) -> CollectionChanges:
+        """Apply the changes of :meth:`diff_snapshot`, the cost is proportional to the changes"""
+        device = self._device
+        for index in changes.removed:
+            self._remove(index)
+        modified = []
+        for index, record in changes.modified:
+            self._update(index, record.size, record.mtime_ns, record.inode, device)
+            modified.append(index)
+        added = []
+        for record in changes.added:
+            added.append(self._append(record.name, record.size, record.mtime_ns, record.inode, device).index)
+        subdirectories_changed = sorted(changes.subdirectories) != sorted(self._subdirectories)
+        if subdirectories_changed:
+            self._subdirectories = list(changes.subdirectories)
+        return CollectionChanges(added, list(changes.removed), modified, subdirectories_changed)
+
+    def apply_snapshot(self, records: list[ScanRecord]) -> CollectionChanges:
+        """Update the collection from a :meth:`snapshot` and return the changes"""
+        return self.apply_snapshot_changes(self.diff_snapshot(records))
+
+    def rescan(self) -> CollectionChanges:
+        """Rescan the directory and return the changes"""
+        return self.apply_snapshot(self.snapshot())
+
+####################################################################################################
+
+class _CollectionWalker(ParallelWalker):
+
+    ##############################################
+
+    def __init__(self, collection: 'RecursiveDirectoryCollection', **kwargs) -> None:
+        super().__init__(collection.path, **kwargs)
+        self._collection = collection
+
+    ##############################################
+
+    def scan_directory(self, relative_path: str) -> tuple[list[str], tuple[int, list[ScanRecord]]]:
+        return self._collection._scan_directory(relative_path)
+
+####################################################################################################
+
+class RecursiveDirectoryCollection(DirectoryCollection):
+
+    """Class to implement a collection of the images of a file hierarchy.
+
+    The name of an image is its path relative to the root.  The directories are scanned by a pool
+    of workers, and their images are added as soon as a directory is done.  The subdirectories are
+    the ones of the root.
+
+    """
+
+    _logger = _module_logger.getChild('RecursiveDirectoryCollection')
+
+    ##############################################
+
+    def __init__(
+        self,
+        path: PathOrStr,
+        scan: bool = True,
+        index: Optional[ScanIndex] = None,
+        max_depth: int = -1,
+        ignored_patterns: Optional[tuple[str]] = None,
+        skip_hidden: bool = True,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """See :class:`ParallelWalker` for *max_depth*, *ignored_patterns*, *skip_hidden* and
+        *max_workers*.
+
+        """
+        self._walker_kwargs = dict(
+            max_depth=max_depth,
+            ignored_patterns=ignored_patterns,
+            skip_hidden=skip_hidden,
+            max_workers=max_workers,
+        )
+        super().__init__(path, scan, index)
+
+    ##############################################
+
+    def _name_for(self, path: Path) -> str:
+        try:
+            return str(path.relative_to(self._path))
+        except ValueError:
+            return str(path)
+
+    ##############################################
+
+    def _scan_directory(self, relative_path: str) -> tuple[list[str], tuple[int, list[ScanRecord]]]:
+        """Scan a directory in a worker thread and return its subdirectory names, its device and its
+        image records.
+
+        The scan index is used like for :class:`DirectoryCollection`.
+
+        """
+        path = self._path.joinpath(relative_path)
+        directory_stat = path.stat()
+        records = None
+        if self._index is not None:
+            records = self._index.lookup(path, directory_stat)
+        if records is None:
+            records = []
+            with os.scandir(path) as it:
+                for entry in it:
+                    record = self._record_for(entry)
+                    if record is not None:
+                        records.append(record)
+            if self._index is not None:
+                self._index.store(path, directory_stat, records)
+        dirnames = []
+        images = []
+        for record in records:
+            if record.kind == EntryKind.DIRECTORY:
+                # a linked directory is not walked, like ParallelWalker, e.g. a link to a parent
+                if not stat_mode.S_ISLNK(record.mode):
+                    dirnames.append(record.name)
+                if not relative_path:
+                    # the subdirectories of the root, linked or not
+                    images.append(record)
+            else:
+                images.append(record._replace(name=os.path.join(relative_path, record.name)))
+        # a mount point in the hierarchy has another device
+        return dirnames, (directory_stat.st_dev, images)
+
+    def _iter_records(self) -> Iterator[ScanRecord]:
+        walker = _CollectionWalker(self, **self._walker_kwargs)
+        for relative_path, depth, dirnames, (device, records) in walker.iter_directories():
+            # a regular file is on the device of its directory,
+            # the records of a directory are added before the next one is yielded
+            self._device = device
+            # the records of the root include its subdirectories
+            self._number_of_entries += len(records) if not relative_path else len(dirnames) + len(records)
+            yield from records
+
@@ -0,0 +1,222 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to implement a columnar store for the image metadata of a collection.
+
+Each metadata is stored in a NumPy column, and the names are packed in a single buffer of bytes
+with an offset column.  Thus an image costs about 40 bytes plus its encoded name, instead of a
+Python object with a Path and a stat result.
+
+"""
+
+####################################################################################################
+
+__all__ = ['MetadataStore']
+
+####################################################################################################
+
+from typing import Iterator
+import logging
+import os
+
+import numpy as np
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class MetadataStore:
+
+    """Class to implement a growable columnar store"""
+
+    COLUMNS = {
+        'size': np.int64,
+        'mtime_ns': np.int64,
+        'inode': np.uint64,
+        'device': np.uint64,
+        # a removed row is kept as a tombstone, thus the indexes are stable
+        'removed': np.bool_,
+    }
+
+    INITIAL_CAPACITY = 1024
+
+    _logger = _module_logger.getChild('MetadataStore')
+
+    ##############################################
+
+    def __init__(self) -> None:
+        self._length = 0
+        self._number_of_removed = 0
+        self._capacity = 0
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        # end offset of each name in the buffer
+        self._name_offsets = np.empty(0, dtype=np.int64)
+        self._names = bytearray()
+
+    ##############################################
+
+    def __len__(self) -> int:
+        """Number of rows, including the removed ones"""
+        return self._length
+
+    @property
+    def number_of_removed(self) -> int:
+        return self._number_of_removed
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the store"""
+        _ = sum(column.nbytes for column in self._columns.values())
+        return _ + self._name_offsets.nbytes + len(self._names)
+
+    ##############################################
+
+    def _grow(self, capacity: int) -> None:
+        # Note: a reader in another thread can still use the previous arrays,
+        #   their content is valid up to the previous length.
+        capacity = max(capacity, self.INITIAL_CAPACITY, 2 * self._capacity)
+        for name, column in self._columns.items():
+            _ = np.empty(capacity, dtype=column.dtype)
+            _[:self._length] = column[:self._length]
+            self._columns[name] = _
+        _ = np.empty(capacity, dtype=np.int64)
+        _[:self._length] = self._name_offsets[:self._length]
+        self._name_offsets = _
+        self._capacity = capacity
+
+    ##############################################
+
+    def append(self, name: str, size: int, mtime_ns: int, inode: int, device: int) -> int:
+        """Append a row and return its index"""
+        index = self._length
+        if index == self._capacity:
+            self._grow(index + 1)
+        columns = self._columns
+        columns['size'][index] = size
+        columns['mtime_ns'][index] = mtime_ns
+        columns['inode'][index] = inode
+        columns['device'][index] = device
+        columns['removed'][index] = False
+        self._names += os.fsencode(name)
+        self._name_offsets[index] = len(self._names)
+        self._length += 1
+        return index
+
+    ##############################################
+
+    def update(self, index: int, size: int, mtime_ns: int, inode: int, device: int) -> None:
+        columns = self._columns
+        columns['size'][index] = size
+        columns['mtime_ns'][index] = mtime_ns
+        columns['inode'][index] = inode
+        columns['device'][index] = device
+
+    def remove(self, index: int) -> None:
+        if not self._columns['removed'][index]:
+            self._columns['removed'][index] = True
+            self._number_of_removed += 1
+
+    def is_removed(self, index: int) -> bool:
+        return bool(self._columns['removed'][index])
+
+    ##############################################
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a view on a column"""
+        return self._columns[name][:self._length]
+
+    def value(self, name: str, index: int) -> int:
+        return int(self._columns[name][index])
+
+    ##############################################
+
+    def _name_slice(self, index: int) -> slice:
+        start = int(self._name_offsets[index - 1]) if index else 0
+        return slice(start, int(self._name_offsets[index]))
+
+    def name_bytes(self, index: int) -> bytes:
+        return bytes(self._names[self._name_slice(index)])
+
+    def name(self, index: int) -> str:
+        return os.fsdecode(self.name_bytes(index))
+
+    def iter_names(self) -> Iterator[str]:
+        for i in range(self._length):
+            yield self.name(i)
+
+    ##############################################
+
+    def live_indexes(self) -> np.ndarray:
+        return np.flatnonzero(~self.column('removed'))
+
+    def _name_chunks(self, buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Return the 8 bytes of the names from *starts* as big-endian integers, zero padded"""
+        chunks = np.zeros(len(starts), dtype=np.uint64)
+        last = len(buffer) - 1
+        for i in range(8):
+            positions = starts + i
+            byte = np.where(positions < ends, buffer[np.minimum(positions, last)], 0).astype(np.uint64)
+            chunks = (chunks << np.uint64(8)) | byte
+        return chunks
+
+    def _argsort_names(self, length: int) -> np.ndarray:
+        """Sort the names read from the packed buffer, by chunks of 8 bytes.
+
+        A chunk is a zero padded big-endian integer, thus the integer order is the bytes order, a
+        name doesn't contain a null byte.  Only the names which are still tied are sorted by their
+        next chunk.  Thus the peak memory is a copy of the buffer and a few integer arrays, instead
+        of an array of bytes as wide as the longest name, e.g. a path of a recursive collection.
+
+        """
+        ends = self._name_offsets[:length].copy()
+        starts = np.zeros(length, dtype=np.int64)
+        starts[1:] = ends[:-1]
+        # a copy, a view would lock the size of the buffer which is appended by the loader thread
+        buffer = np.frombuffer(bytes(self._names[:int(ends[-1])]), dtype=np.uint8)
+        order = np.arange(length)
+        # position of the first name of the group of tied names, thus increasing with the position
+        rank = np.zeros(length, dtype=np.int64)
+        # positions of the tied groups to sort, a group is contiguous
+        positions = np.arange(length)
+        offset = 0
+        while len(positions):
+            indexes = order[positions]
+            chunks = self._name_chunks(buffer, starts[indexes] + offset, ends[indexes])
+            _ = np.lexsort((chunks, rank[positions]))
+            indexes = indexes[_]
+            chunks = chunks[_]
+            groups = rank[positions][_]
+            order[positions] = indexes
+            is_first = np.ones(len(positions), dtype=np.bool_)
+            is_first[1:] = (groups[1:] != groups[:-1]) | (chunks[1:] != chunks[:-1])
+            run = np.cumsum(is_first) - 1
+            rank[positions] = positions[is_first][run]
+            offset += 8
+            # a group is sorted if it has one name, or if its names are equal
+            run_size = np.bincount(run)[run]
+            is_longer = np.bincount(run, weights=ends[indexes] - starts[indexes] > offset)[run] > 0
+            positions = positions[(run_size > 1) & is_longer]
+        return order
+
+    def argsort(self, name: str) -> np.ndarray:
+        """Return the permutation which sorts a column, *name* can be a column or 'name'.
+
+        The removed rows are excluded.
+
+        """
+        length = self._length
+        if name == 'name':
+            # UTF-8 preserves the code point order, thus bytes are sorted like str
+            permutation = self._argsort_names(length) if length else np.arange(0)
+        else:
+            permutation = np.argsort(self._columns[name][:length], kind='stable')
+        if self._number_of_removed:
+            permutation = permutation[~self._columns['removed'][:length][permutation]]
+        return permutation
@@ -0,0 +1,220 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to implement a persistent index of directory scans.
+
+The index is a SQLite database stored in $XDG_CACHE_HOME/ImageBrowser/scan-index.sqlite.
+
+A directory is keyed by its path, and its scan is valid as long as the inode and the `st_mtime_ns`
+of the directory are unchanged.  The modification time of a directory changes when an entry is
+created, deleted or renamed, but not when the content of a file is modified in place.
+
+To avoid the "racy" case where the directory is modified during the same timestamp tick as the
+scan, a scan is not trusted when the directory mtime is too close to the scan time.
+
+"""
+
+####################################################################################################
+
+__all__ = ['ScanIndex', 'ScanRecord', 'EntryKind']
+
+####################################################################################################
+
+from enum import IntEnum
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from ImageBrowser.library.singleton import SingletonMetaClass
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class EntryKind(IntEnum):
+    DIRECTORY = 0
+    IMAGE = 1
+    SYMLINK_IMAGE = 2   # stat is done on the target
+
+####################################################################################################
+
+class ScanRecord(NamedTuple):
+
+    name: str
+    kind: EntryKind
+    mode: int = 0
+    size: int = 0
+    mtime_ns: int = 0
+    inode: int = 0
+
+    ##############################################
+
+    @classmethod
+    def from_stat(cls, name: str, kind: EntryKind, stat_result: Optional[os.stat_result]) -> 'ScanRecord':
+        if stat_result is None:
+            return cls(name, kind)
+        return cls(
+            name,
+            kind,
+            stat_result.st_mode,
+            stat_result.st_size,
+            stat_result.st_mtime_ns,
+            stat_result.st_ino,
+        )
+
+####################################################################################################
+
+class ScanIndex(metaclass=SingletonMetaClass):
+
+    """Class to implement a persistent index of directory scans"""
+
+    FILENAME = 'scan-index.sqlite'
+
+    # a scan is not trusted if the directory was modified less than this delay before
+    RACY_DELAY_NS = 2_000_000_000
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS directory (
+            id INTEGER PRIMARY KEY,
+            path BLOB UNIQUE NOT NULL,
+            inode INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS entry (
+            directory_id INTEGER NOT NULL REFERENCES directory(id) ON DELETE CASCADE,
+            name BLOB NOT NULL,
+            kind INTEGER NOT NULL,
+            mode INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            PRIMARY KEY (directory_id, name)
+        ) WITHOUT ROWID''',
+    )
+
+    _logger = _module_logger.getChild('ScanIndex')
+
+    ##############################################
+
+    @classmethod
+    def default_path(cls) -> Path:
+        cache_home = os.environ.get('XDG_CACHE_HOME')
+        if cache_home:
+            cache_path = Path(cache_home)
+        else:
+            cache_path = Path.home().joinpath('.cache')
+        return cache_path.joinpath('ImageBrowser', cls.FILENAME)
+
+    ##############################################
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        if path is None:
+            path = self.default_path()
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._logger.info(f"Open scan index {self._path}")
+        # the index is used from the collection loader threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self._path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA foreign_keys=ON')
+            for _ in self.SCHEMA:
+                self._connection.execute(_)
+
+    ##############################################
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    ##############################################
+
+    @staticmethod
+    def _encode(name: str | Path) -> bytes:
+        # filenames are bytes on Linux
+        return os.fsencode(name)
+
+    # An inode is an unsigned 64-bit integer, but a SQLite integer is signed,
+    #   an inode >= 2**63 is seen on some network and overlay file systems
+
+    @staticmethod
+    def _to_signed(inode: int) -> int:
+        return inode - 2**64 if inode >= 2**63 else inode
+
+    @staticmethod
+    def _to_unsigned(value: int) -> int:
+        return value + 2**64 if value < 0 else value
+
+    ##############################################
+
+    def _directory(self, path: Path) -> Optional[tuple[int, int, int]]:
+        cursor = self._connection.execute(
+            'SELECT id, inode, mtime_ns FROM directory WHERE path = ?',
+            (self._encode(path),),
+        )
+        return cursor.fetchone()
+
+    ##############################################
+
+    def _iter_records(self, directory_id: int) -> Iterator[ScanRecord]:
+        cursor = self._connection.execute(
+            'SELECT name, kind, mode, size, mtime_ns, inode FROM entry WHERE directory_id = ?',
+            (directory_id,),
+        )
+        for name, kind, mode, size, mtime_ns, inode in cursor:
+            yield ScanRecord(os.fsdecode(name), EntryKind(kind), mode, size, mtime_ns, self._to_unsigned(inode))
+
+    ##############################################
+
+    def lookup(self, path: Path, directory_stat: os.stat_result) -> Optional[list[ScanRecord]]:
+        """Return the records if the scan of the directory is up to date, else None"""
+        with self._lock:
+            _ = self._directory(path)
+            if _ is None:
+                return None
+            directory_id, inode, mtime_ns = _
+            if self._to_unsigned(inode) != directory_stat.st_ino or mtime_ns != directory_stat.st_mtime_ns:
+                return None
+            return list(self._iter_records(directory_id))
+
+    ##############################################
+
+    def store(self, path: Path, directory_stat: os.stat_result, records: list[ScanRecord]) -> None:
+        mtime_ns = directory_stat.st_mtime_ns
+        if time.time_ns() - mtime_ns < self.RACY_DELAY_NS:
+            # The directory could be modified again within the same timestamp tick,
+            # invalidate the key, the directory is scanned again next time
+            mtime_ns = -1
+        encoded_path = self._encode(path)
+        with self._lock, self._connection:
+            self._connection.execute(
+                '''INSERT INTO directory (path, inode, mtime_ns) VALUES (?, ?, ?)
+                   ON CONFLICT(path) DO UPDATE SET inode = excluded.inode, mtime_ns = excluded.mtime_ns''',
+                (encoded_path, self._to_signed(directory_stat.st_ino), mtime_ns),
+            )
+            directory_id = self._directory(path)[0]
+            self._connection.execute('DELETE FROM entry WHERE directory_id = ?', (directory_id,))
+            self._connection.executemany(
+                'INSERT INTO entry VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((directory_id, self._encode(_.name), int(_.kind), _.mode, _.size, _.mtime_ns, self._to_signed(_.inode))
+                 for _ in records),
+            )
+        self._logger.info(f"Stored {len(records)} entries for {path}")
+
+    ##############################################
+
+    def forget(self, path: Path) -> None:
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM directory WHERE path = ?', (self._encode(path),))
@@ -17,24 +17,49 @@ The thumbnails directory have the following internal structure:
 - $XDG_CACHE_HOME/thumbnails/xx-large/
 - $XDG_CACHE_HOME/thumbnails/fail/
 
+When a thumbnail cannot be made, a fail marker is written in fail/ImageBrowser-<version>/.  It is
+an empty PNG with the attributes of the source, thus the file is retried only when it is modified.
+
+The shared thumbnail repository, i.e. the directory .sh_thumbnails/{normal,large,...} next to the
+images, is read first.  Its thumbnails are named by the MD5 of the file name, thus they are valid
+on any mount point, e.g. for a removable medium.  Optionally the thumbnails are written there when
+the directory is writable.
+
+To avoid to decode the full image, an embedded preview is used when it is large enough: the EXIF
+thumbnail of a JPEG, a large thumbnail of a MPF (Multi-Picture Format) JPEG, or the preview of a
+camera RAW file if rawpy is installed.
+
 """
 
 ####################################################################################################
 
-__all__ = ['ThumbnailCache']
+__all__ = ['ThumbnailCache', 'ThumbnailFailed', 'ThumbnailSize', 'Thumbnail']
 
 ####################################################################################################
 
 from enum import IntEnum, auto
 from pathlib import Path
-from typing import Union
+from typing import Iterable, Iterator, Optional, Union
+import contextlib
+import functools
 import hashlib
+import io
 import logging
 import mimetypes
+import os
+import tempfile
+import threading
 # import shutil
 
-from PIL import Image, PngImagePlugin
+from PIL import ExifTags, Image, PngImagePlugin
 
+try:
+    # to read camera RAW files
+    import rawpy
+except ImportError:
+    rawpy = None
+
+from ImageBrowser import __version__
 from ImageBrowser.library.singleton import SingletonMetaClass
 
 ####################################################################################################
@@ -45,6 +70,11 @@ type PathOrStr = Union(Path, str)
 
 ####################################################################################################
 
+class ThumbnailFailed(Exception):
+    """Exception raised when a fail marker records that the thumbnail cannot be made"""
+
+####################################################################################################
+
 class ThumbnailSize(IntEnum):
     NORMAL = 0
     LARGE = auto()
@@ -52,6 +82,17 @@ class ThumbnailSize(IntEnum):
     XX = auto()
     FAIL = auto()
 
+    ##############################################
+
+    @classmethod
+    def image_sizes(cls) -> tuple['ThumbnailSize', ...]:
+        """Return the sizes of a thumbnail image, i.e. without FAIL"""
+        return (cls.NORMAL, cls.LARGE, cls.X, cls.XX)
+
+    def and_smaller(self) -> tuple['ThumbnailSize', ...]:
+        """Return this size and the smaller ones, e.g. LARGE and NORMAL for LARGE"""
+        return tuple(_ for _ in self.image_sizes() if _ <= self)
+
 ####################################################################################################
 
 class ThumbnailCache(metaclass=SingletonMetaClass):
@@ -60,6 +101,10 @@ class ThumbnailCache(metaclass=SingletonMetaClass):
 
     PATHS = ('normal', 'large', 'x-large', 'xx-large', 'fail')
     SIZES = (128, 256, 512, 1024, 0)
+    # the fail markers of an application are in a subdirectory
+    FAIL_DIRECTORY = f"ImageBrowser-{__version__ or 'dev'}"
+    # shared repository next to the images
+    SHARED_DIRECTORY = '.sh_thumbnails'
 
     _logger = _module_logger.getChild('ThumbnailCache')
 
@@ -69,13 +114,37 @@ class ThumbnailCache(metaclass=SingletonMetaClass):
     def size_for(cls, size: ThumbnailSize) -> int:
         return cls.SIZES[size]
 
+    @classmethod
+    def size_for_pixels(cls, pixels: float) -> ThumbnailSize:
+        """Return the smallest size covering *pixels*, e.g. the view size times the device pixel ratio"""
+        for size in ThumbnailSize.image_sizes():
+            if cls.SIZES[size] >= pixels:
+                return size
+        return ThumbnailSize.XX
+
     ##############################################
 
     def __init__(self) -> None:
         self._path = Path.home().joinpath('.cache', 'thumbnails')
         self._size_path = tuple([self._path.joinpath(_) for _ in self.PATHS])
+        self._size_path = self._size_path[:ThumbnailSize.FAIL] + (
+            self._size_path[ThumbnailSize.FAIL].joinpath(self.FAIL_DIRECTORY),
+        )
         for _ in self._size_path:
-            _.mkdir(parents=True, exist_ok=True)
+            # the specification requires 700
+            _.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._fsync = False
+        self._use_shared = True
+        self._write_shared = False
+        self._lock = threading.Lock()
+        # key -> [lock, number of users]
+        self._in_flight = {}
+        # names of the files in each size directory, read on demand
+        self._file_names = [None] * len(self._size_path)
+        # (image directory, size) -> names of the files in the shared repository
+        self._shared_file_names = {}
+        # image directories where the shared repository cannot be written
+        self._read_only_directories = set()
 
     ##############################################
 
@@ -83,6 +152,33 @@ class ThumbnailCache(metaclass=SingletonMetaClass):
     def path(self) -> Path:
         return self._path
 
+    @property
+    def fsync(self) -> bool:
+        return self._fsync
+
+    @fsync.setter
+    def fsync(self, value: bool) -> None:
+        """Flush a thumbnail to the disk before it is renamed, slower but safe on a power loss"""
+        self._fsync = bool(value)
+
+    @property
+    def use_shared(self) -> bool:
+        return self._use_shared
+
+    @use_shared.setter
+    def use_shared(self, value: bool) -> None:
+        """Read the shared repository next to the images"""
+        self._use_shared = bool(value)
+
+    @property
+    def write_shared(self) -> bool:
+        return self._write_shared
+
+    @write_shared.setter
+    def write_shared(self, value: bool) -> None:
+        """Write the thumbnails to the shared repository when the image directory is writable"""
+        self._write_shared = bool(value)
+
     def path_for(self, size: ThumbnailSize) -> Path:
         return self._size_path[size]
 
@@ -109,16 +205,38 @@ class ThumbnailCache(metaclass=SingletonMetaClass):
     ##############################################
 
     def clear_cache(self) -> None:
-        # Warning: This command is dangerous !!!
-        # self._logger.info('Clear thumbnail cache {}'.format(self._path))
-        # shutil.rmtree(str(self._path), ignore_errors=True)
-        pass
+        """Remove all the thumbnails, the directories are kept
+
+        See :mod:`.collector` to remove only the outdated thumbnails.
+
+        """
+        # Warning: the thumbnails are shared with the other applications
+        self._logger.info('Clear thumbnail cache {}'.format(self._path))
+        for path in self._size_path:
+            try:
+                with os.scandir(path) as it:
+                    for _ in it:
+                        if _.name.endswith(Thumbnail.IMAGE_EXTENSION) and _.is_file(follow_symlinks=False):
+                            with contextlib.suppress(FileNotFoundError):
+                                os.unlink(_.path)
+            except FileNotFoundError:
+                pass
+        self.rescan()
 
     ##############################################
 
     def thumbnail_path_for(self, path: PathOrStr, size: ThumbnailSize) -> Path:
         return self.path_for(size).joinpath(path)
 
+    def shared_path_for(self, directory: PathOrStr, size: ThumbnailSize) -> Path:
+        """Return the shared repository of the image *directory* for *size*"""
+        return Path(directory).joinpath(self.SHARED_DIRECTORY, self.PATHS[size])
+
+    @classmethod
+    def is_shared_path(cls, path: PathOrStr) -> bool:
+        """Return True if *path* is a thumbnail of a shared repository"""
+        return Path(path).parent.parent.name == cls.SHARED_DIRECTORY
+
     def normal_thumbnail_path(self, path: PathOrStr) -> Path:
         return self.thumbnail_path_for(path, ThumbnailSize.NORMAL)
 
@@ -133,16 +251,215 @@ class ThumbnailCache(metaclass=SingletonMetaClass):
 
     ##############################################
 
+    def _file_names_for(self, size: ThumbnailSize) -> set[str]:
+        names = self._file_names[size]
+        if names is None:
+            with self._lock:
+                names = self._file_names[size]
+                if names is None:
+                    names = self._file_names[size] = self._scan_names(self._size_path[size])
+                    self._logger.info(f"{len(names)} thumbnails in {self._size_path[size]}")
+        return names
+
+    @staticmethod
+    def _scan_names(path: Path) -> set[str]:
+        # the temporary files start with a dot
+        try:
+            with os.scandir(path) as it:
+                return {
+                    _.name for _ in it
+                    if _.name.endswith(Thumbnail.IMAGE_EXTENSION) and not _.name.startswith('.')
+                }
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            # e.g. the cache was cleared, no shared repository
+            return set()
+
+    def has_file(self, filename: str, size: ThumbnailSize) -> bool:
+        """Return True if the thumbnail file exists, without a system call
+
+        The names are read once from the size directory, then they are updated when a thumbnail
+        is written or deleted by this process.  A file written by another process is not seen
+        until :meth:`add_file` or :meth:`rescan` is called.
+
+        """
+        return filename in self._file_names_for(size)
+
+    def add_file(self, filename: str, size: ThumbnailSize) -> None:
+        self._file_names_for(size).add(filename)
+
+    def discard_file(self, filename: str, size: ThumbnailSize) -> None:
+        self._file_names_for(size).discard(filename)
+
+    def update_file(self, filename: str, size: ThumbnailSize) -> bool:
+        """Check if the thumbnail file exists on disk and update the names"""
+        if self.thumbnail_path_for(filename, size).exists():
+            self.add_file(filename, size)
+            return True
+        self.discard_file(filename, size)
+        return False
+
+    def _shared_file_names_for(self, directory: str, size: ThumbnailSize) -> set[str]:
+        key = (directory, size)
+        names = self._shared_file_names.get(key)
+        if names is None:
+            with self._lock:
+                names = self._shared_file_names.get(key)
+                if names is None:
+                    names = self._shared_file_names[key] = self._scan_names(self.shared_path_for(directory, size))
+        return names
+
+    def has_shared_file(self, directory: PathOrStr, filename: str, size: ThumbnailSize) -> bool:
+        """Return True if the shared repository of *directory* has the file, see :meth:`has_file`"""
+        return filename in self._shared_file_names_for(str(directory), size)
+
+    def add_shared_file(self, directory: PathOrStr, filename: str, size: ThumbnailSize) -> None:
+        self._shared_file_names_for(str(directory), size).add(filename)
+
+    def discard_shared_file(self, directory: PathOrStr, filename: str, size: ThumbnailSize) -> None:
+        self._shared_file_names_for(str(directory), size).discard(filename)
+
+    def add_thumbnail_path(self, path: PathOrStr, size: ThumbnailSize) -> None:
+        """Add the name of a thumbnail written by another process, in the cache or a shared repository"""
+        path = Path(path)
+        if self.is_shared_path(path):
+            self.add_shared_file(path.parent.parent.parent, path.name, size)
+        else:
+            self.add_file(path.name, size)
+
+    def is_read_only(self, directory: PathOrStr) -> bool:
+        return str(directory) in self._read_only_directories
+
+    def set_read_only(self, directory: PathOrStr) -> None:
+        """Record that the shared repository of *directory* cannot be written"""
+        self._read_only_directories.add(str(directory))
+
+    def rescan(self) -> None:
+        """Forget the names, they are read again on demand"""
+        with self._lock:
+            self._file_names = [None] * len(self._size_path)
+            self._shared_file_names = {}
+            self._read_only_directories = set()
+
+    ##############################################
+
+    @contextlib.contextmanager
+    def generating(self, key: str) -> Iterator[None]:
+        """Serialise the generation of the thumbnails for *key*
+
+        A concurrent request waits for the first one, then it should check if the thumbnail was
+        made in the meantime.
+
+        """
+        with self._lock:
+            entry = self._in_flight.get(key)
+            if entry is None:
+                entry = self._in_flight[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._in_flight[key]
+
+    ##############################################
+
     def __getitem__(self, path: PathOrStr) -> 'Thumbnail':
         return Thumbnail(self, path)
 
+    def thumbnails_for(
+        self,
+        paths: Iterable[PathOrStr],
+        sizes: Iterable[int],
+        mtimes_ns: Iterable[int],
+    ) -> list['Thumbnail']:
+        """Return the thumbnails of canonical *paths*, the URIs are hashed in one pass and the
+        sources are not stat
+
+        """
+        paths = [str(_) for _ in paths]
+        filenames = Thumbnail.mangle_paths(paths)
+        return [
+            Thumbnail(self, path, size=size, mtime_ns=mtime_ns, filename=filename, resolve=False)
+            for path, size, mtime_ns, filename in zip(paths, sizes, mtimes_ns, filenames)
+        ]
+
+####################################################################################################
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@functools.lru_cache(maxsize=10_000)
+def _read_thumb_attributes(path: str, mtime_ns: int) -> tuple[Optional[int], Optional[int]]:
+    """Return the Thumb::MTime and Thumb::Size attributes of the thumbnail *path*
+
+    Only the PNG chunks before the image data are parsed, the pixels are not decoded.  The
+    modification time of the thumbnail is part of the cache key, thus a rewritten thumbnail is
+    read again.
+
+    """
+    try:
+        with Image.open(path, formats=('PNG',)) as image:
+            # Note: image.text would load the pixels to find the chunks after IDAT
+            info = image.info
+    except (OSError, SyntaxError, ValueError):
+        return None, None
+    return _parse_int(info.get('Thumb::MTime')), _parse_int(info.get('Thumb::Size'))
+
 ####################################################################################################
 
 class Thumbnail:
 
     IMAGE_FORMAT = 'png'
     IMAGE_EXTENSION = '.' + IMAGE_FORMAT
-    SAMPLING = Image.BICUBIC
+    SAMPLING = Image.Resampling.LANCZOS
+    # modes which can be saved in PNG
+    PNG_MODES = ('1', 'L', 'LA', 'I', 'P', 'RGB', 'RGBA')
+
+    # EXIF Orientation -> transposition to display the image upright
+    ORIENTATION_TRANSPOSE = {
+        2: Image.Transpose.FLIP_LEFT_RIGHT,
+        3: Image.Transpose.ROTATE_180,
+        4: Image.Transpose.FLIP_TOP_BOTTOM,
+        5: Image.Transpose.TRANSPOSE,
+        6: Image.Transpose.ROTATE_270,
+        7: Image.Transpose.TRANSVERSE,
+        8: Image.Transpose.ROTATE_90,
+    }
+    # LibRaw flip -> EXIF Orientation
+    RAW_FLIP_ORIENTATION = {3: 3, 5: 8, 6: 6}
+    RAW_EXTENSIONS = (
+        '.arw',
+        '.cr2',
+        '.cr3',
+        '.dng',
+        '.nef',
+        '.nrw',
+        '.orf',
+        '.pef',
+        '.raf',
+        '.rw2',
+        '.srw',
+    )
+    # errors of a decoder, the image is invalid and a fail marker is written,
+    # while e.g. an I/O error can be transient
+    DECODE_ERRORS = (Image.UnidentifiedImageError, SyntaxError, ValueError)
+    if rawpy is not None:
+        DECODE_ERRORS += (rawpy.LibRawError,)
+    # Software attribute of the thumbnails made by this application
+    SOFTWARE = 'ImageBrowser'
+    # MPF image types which are a downscaled copy of the primary image
+    MPF_PREVIEW_TYPES = (
+        'Large Thumbnail (VGA Equivalent)',
+        'Large Thumbnail (Full HD Equivalent)',
+    )
+    # Some cameras pad the EXIF thumbnail to 4:3, such a preview is rejected
+    ASPECT_RATIO_TOLERANCE = .02
 
     _logger = _module_logger.getChild('Thumbnail')
 
@@ -157,15 +474,63 @@ class Thumbnail:
     @classmethod
     def mangle_path(cls, path: PathOrStr) -> str:
         uri = cls.add_uri(path)
-        return hashlib.md5(uri.encode('utf-8')).hexdigest() + cls.IMAGE_EXTENSION
+        # surrogateescape gives back the bytes of an undecodable file name
+        return hashlib.md5(uri.encode('utf-8', 'surrogateescape')).hexdigest() + cls.IMAGE_EXTENSION
+
+    @classmethod
+    def mangle_name(cls, name: str) -> str:
+        """Return the name of the thumbnail in a shared repository, i.e. the MD5 of the file name"""
+        return hashlib.md5(name.encode('utf-8', 'surrogateescape')).hexdigest() + cls.IMAGE_EXTENSION
+
+    @classmethod
+    def digest_paths(cls, paths: Iterable[PathOrStr]) -> list[str]:
+        """Return the MD5 of the URIs of *paths*, i.e. the thumbnail file names without extension"""
+        md5 = hashlib.md5
+        return [md5(f'file://{_}'.encode('utf-8', 'surrogateescape')).hexdigest() for _ in paths]
+
+    @classmethod
+    def mangle_paths(cls, paths: Iterable[PathOrStr]) -> list[str]:
+        """Return the thumbnail file names of *paths*, e.g. of all the images of a collection"""
+        extension = cls.IMAGE_EXTENSION
+        return [_ + extension for _ in cls.digest_paths(paths)]
+
+    @staticmethod
+    def canonical_path(path: PathOrStr) -> Path:
+        """Return the absolute path of *path*, a symbolic link to a file is kept like GIO does"""
+        path = Path(path)
+        return path.parent.resolve().joinpath(path.name)
 
     ##############################################
 
-    def __init__(self, cache: ThumbnailCache, path: PathOrStr) -> None:
+    def __init__(
+        self,
+        cache: ThumbnailCache,
+        path: PathOrStr,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None,
+        filename: Optional[str] = None,
+        resolve: bool = True,
+    ) -> None:
+        """The source is not stat if its *size* and *mtime_ns* are given, e.g. by a collection.
+
+        If *resolve* is False, *path* must be canonical, see :meth:`canonical_path`.
+
+        """
         self._cache = cache
-        self._source_path = Path(path).resolve()
-        self._filename = self.mangle_path(path)
-        self._stat = self._source_path.stat()
+        self._source_path = self.canonical_path(path) if resolve else Path(path)
+        self._filename = filename or self.mangle_path(self._source_path)
+        # the given metadata can be outdated, see _is_up_to_date
+        self._given_stat = size is not None and mtime_ns is not None
+        if not self._given_stat:
+            stat = self._source_path.stat()
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        self._size = int(size)
+        self._mtime_ns = int(mtime_ns)
+        # size -> thumbnail path
+        self._paths = {}
+        # size -> path of an up to date thumbnail, see cached_thumbnail_path
+        self._valid_paths = {}
+        self._shared_filename = None
 
     ##############################################
 
@@ -177,15 +542,24 @@ class Thumbnail:
     def uri(self) -> str:
         return self.add_uri(self._source_path)
 
+    @property
+    def filename(self) -> str:
+        return self._filename
+
     ##############################################
 
     @property
     def size(self) -> int:
-        return self._stat.st_size
+        return self._size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self._mtime_ns
 
     @property
     def mtime(self) -> int:
-        return int(self._stat.st_mtime_ns)
+        # Thumb::MTime is in seconds, i.e. st_mtim.tv_sec
+        return self._mtime_ns // 1_000_000_000
 
     @property
     def mime_type(self):
@@ -193,8 +567,58 @@ class Thumbnail:
 
     ##############################################
 
+    def _restat(self) -> bool:
+        """Stat the source and return True if its size or mtime changed"""
+        self._given_stat = False
+        try:
+            stat = self._source_path.stat()
+        except OSError:
+            return False
+        if stat.st_size == self._size and stat.st_mtime_ns == self._mtime_ns:
+            return False
+        self._logger.info(f"{self._source_path} was modified")
+        self._size = stat.st_size
+        self._mtime_ns = stat.st_mtime_ns
+        self._valid_paths.clear()
+        return True
+
+    def _matches(self, mtime: Optional[int], file_size: Optional[int], shared: bool = False) -> bool:
+        # a shared thumbnail without Thumb::MTime is valid
+        return (
+            (mtime == self.mtime or (shared and mtime is None))
+            and (file_size is None or file_size == self.size)
+        )
+
+    def _is_up_to_date(self, mtime: Optional[int], file_size: Optional[int], shared: bool = False) -> bool:
+        """Return True if the thumbnail attributes match the source
+
+        The metadata given by a collection can be outdated, e.g. a file rewritten in place in a
+        directory loaded from the scan index, thus the source is stat before to tell a thumbnail
+        is stale.
+
+        """
+        if self._matches(mtime, file_size, shared):
+            return True
+        if self._given_stat and self._restat():
+            return self._matches(mtime, file_size, shared)
+        return False
+
+    ##############################################
+
     def thumbnail_path(self, size: ThumbnailSize) -> Path:
-        return self._cache.thumbnail_path_for(self._filename, size)
+        path = self._paths.get(size)
+        if path is None:
+            path = self._paths[size] = self._cache.thumbnail_path_for(self._filename, size)
+        return path
+
+    @property
+    def shared_filename(self) -> str:
+        if self._shared_filename is None:
+            self._shared_filename = self.mangle_name(self._source_path.name)
+        return self._shared_filename
+
+    def shared_thumbnail_path(self, size: ThumbnailSize) -> Path:
+        return self._cache.shared_path_for(self._source_path.parent, size).joinpath(self.shared_filename)
 
     @property
     def normal_path(self) -> Path:
@@ -215,6 +639,7 @@ class Thumbnail:
     ##############################################
 
     def _delete_thumbnail(self, size: ThumbnailSize) -> None:
+        self._cache.discard_file(self._filename, size)
         _ = self.thumbnail_path(size)
         if _.exists():
             self._logger.info(f"Delete thumbnail for {self._source_path}")
@@ -227,24 +652,95 @@ class Thumbnail:
     ##############################################
 
     def has_thumbnail(self, size: ThumbnailSize) -> bool:
-        # Fixme: compare the original file's size and modification time
-        #        with the attribytes stored in the 'Thumb::MTime' and 'Thumb::Size' keys
-        #   if ((!thumb.isShared && !isSet(thumb.MTime)) ||
-        #       (isSet(thumb.MTime) && file.mtime != thumb.MTime) ||
-        #       (isSet(thumb.Size) && file.size != thumb.Size) {
-        #     recreate_thumbnail();
-        #   }
+        """Return True if the thumbnail is up to date, a stale thumbnail is deleted
+
+        See Detect Modifications in the specification::
+
+          if ((!thumb.isShared && !isSet(thumb.MTime)) ||
+              (isSet(thumb.MTime) && file.mtime != thumb.MTime) ||
+              (isSet(thumb.Size) && file.size != thumb.Size) {
+            recreate_thumbnail();
+          }
+
+        """
+        if not self._cache.has_file(self._filename, size):
+            return False
         path = self.thumbnail_path(size)
-        if path.exists():
+        try:
             stat = path.stat()
-            size = int(stat.st_size)
-            mtime = int(stat.st_mtime)   # Fixme: int ???
-            if not size or mtime < self.mtime:
-                self.delete_thumbnail()
-            else:
+        except FileNotFoundError:
+            # deleted by another process
+            self._cache.discard_file(self._filename, size)
+            return False
+        if stat.st_size:
+            mtime, file_size = _read_thumb_attributes(str(path), stat.st_mtime_ns)
+            if self._is_up_to_date(mtime, file_size):
                 return True
+        self._delete_thumbnail(size)
         return False
 
+    def has_shared_thumbnail(self, size: ThumbnailSize) -> bool:
+        """Return True if the shared repository has an up to date thumbnail
+
+        A shared thumbnail without Thumb::MTime is valid.  A stale one is not deleted, the
+        repository can be read-only.
+
+        """
+        if size == ThumbnailSize.FAIL or not self._cache.use_shared:
+            return False
+        directory = self._source_path.parent
+        if not self._cache.has_shared_file(directory, self.shared_filename, size):
+            return False
+        path = self.shared_thumbnail_path(size)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._cache.discard_shared_file(directory, self.shared_filename, size)
+            return False
+        if not stat.st_size:
+            return False
+        mtime, file_size = _read_thumb_attributes(str(path), stat.st_mtime_ns)
+        return self._is_up_to_date(mtime, file_size, shared=True)
+
+    def find_thumbnail(self, size: ThumbnailSize) -> Optional[Path]:
+        """Return the path of an up to date thumbnail, the shared repository first, or None"""
+        if self.has_shared_thumbnail(size):
+            return self.shared_thumbnail_path(size)
+        if self.has_thumbnail(size):
+            return self.thumbnail_path(size)
+        return None
+
+    def cached_thumbnail_path(self, size: ThumbnailSize) -> Optional[Path]:
+        """Like :meth:`find_thumbnail`, but a thumbnail is validated once by this instance
+
+        Then it is only looked up by name.  A new instance must be made when the source is modified.
+
+        """
+        path = self._valid_paths.get(size)
+        if path is not None:
+            if ThumbnailCache.is_shared_path(path):
+                if self._cache.has_shared_file(self._source_path.parent, self.shared_filename, size):
+                    return path
+            elif self._cache.has_file(self._filename, size):
+                return path
+        path = self.find_thumbnail(size)
+        if path is None:
+            self._valid_paths.pop(size, None)
+        else:
+            self._valid_paths[size] = path
+        return path
+
+    def cached_size(self, size: ThumbnailSize) -> Optional[ThumbnailSize]:
+        """Return *size* if its thumbnail is in the cache, else the smallest larger one, or None
+
+        A larger thumbnail can be downscaled for the display instead of making a new one.
+
+        """
+        for _ in ThumbnailSize.image_sizes():
+            if _ >= size and self.cached_thumbnail_path(_) is not None:
+                return _
+        return None
+
     def has_normal_thumbnail(self, path: PathOrStr) -> bool:
         return self.has_thumbnail(ThumbnailSize.NORMAL)
 
@@ -257,9 +753,13 @@ class Thumbnail:
     def has_xx_thumbnail(self, path: PathOrStr) -> bool:
         return self.has_thumbnail(ThumbnailSize.XX)
 
+    def has_failed(self) -> bool:
+        """Return True if a fail marker is up to date, i.e. the source was not modified since"""
+        return self.has_thumbnail(ThumbnailSize.FAIL)
+
     ##############################################
 
-    def _make_png_info(self) -> PngImagePlugin.PngInfo:
+    def _make_png_info(self, shared: bool = False) -> PngImagePlugin.PngInfo:
         # use ImageMagick command `identify -verbose file` to get PNG Properties
         # {
         #     'Thumb::URI': 'file:///home/fabrice/....png'
@@ -272,14 +772,16 @@ class Thumbnail:
         #     'dpi': (96, 96),
         # }
         png_info = PngImagePlugin.PngInfo()
-        # required
-        png_info.add_text('Thumb::URI', self.uri)
+        # required, the URI is relative in a shared repository
+        png_info.add_text('Thumb::URI', self._source_path.name if shared else self.uri)
         png_info.add_text('Thumb::MTime', str(self.mtime))
         # optional
         png_info.add_text('Thumb::Size', str(self.size))
-        png_info.add_text('Thumb::Mimetype', self.mime_type)
+        mime_type = self.mime_type
+        if mime_type:
+            png_info.add_text('Thumb::Mimetype', mime_type)
         # Description
-        png_info.add_text('Software', 'ImageBrowser')
+        png_info.add_text('Software', self.SOFTWARE)
         # Thumb::Image::Width
         # Thumb::Image::Height
         # Thumb::Movie::Length
@@ -287,29 +789,248 @@ class Thumbnail:
 
     ##############################################
 
-    def _make_thumbnail(self, dst_path: Path, size: int) -> None:
-        # Fixme:
-        #  async
-        #  convert
-        #  atomic rename tmp
-        image = Image.open(str(self._source_path))
-        image.thumbnail((size, size), resample=self.SAMPLING)
-        png_info = self._make_png_info()
-        image.save(str(dst_path), 'PNG', pnginfo=png_info)
+    @staticmethod
+    def fit_size(width: int, height: int, size: int) -> tuple[int, int]:
+        """Return the size of an image fitted in a *size* square, the aspect ratio is preserved"""
+        if width <= size and height <= size:
+            return width, height
+        if width >= height:
+            return size, max(round(height * size / width), 1)
+        return max(round(width * size / height), 1), size
+
+    @classmethod
+    def _is_usable_preview(cls, preview_size: tuple[int, int], source_size: tuple[int, int], final_size: tuple[int, int]) -> bool:
+        width, height = preview_size
+        if width < final_size[0] or height < final_size[1]:
+            return False
+        source_width, source_height = source_size
+        # compare the aspect ratios, w/h ~ sw/sh
+        delta = abs(width * source_height - height * source_width)
+        return delta <= cls.ASPECT_RATIO_TOLERANCE * width * source_height
 
     ##############################################
 
-    def _make_thumbnail_for(self, size: ThumbnailSize) -> None:
-        self._make_thumbnail(self.thumbnail_path(size), self._cache.size_for(size))
+    @staticmethod
+    def _exif_thumbnail(image: Image.Image) -> Optional[Image.Image]:
+        """Return the thumbnail stored in the IFD1 of the EXIF, usually 160x120"""
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(ExifTags.Base.JpegIFOffset)
+        length = ifd1.get(ExifTags.Base.JpegIFByteCount)
+        data = image.info.get('exif')
+        if not (offset and length and data):
+            return None
+        # the offsets are relative to the TIFF header
+        if data.startswith(b'Exif\x00\x00'):
+            data = data[6:]
+        return Image.open(io.BytesIO(data[offset:offset + length]))
+
+    @classmethod
+    def _mpf_previews(cls, image: Image.Image) -> Iterator[int]:
+        """Yield the frames of a MPF image which are a large thumbnail"""
+        mpinfo = getattr(image, 'mpinfo', None)
+        if not mpinfo:
+            return
+        for frame, entry in enumerate(mpinfo.get(0xB002, ())):
+            if frame and entry.get('Attribute', {}).get('MPType') in cls.MPF_PREVIEW_TYPES:
+                yield frame
+
+    def _open_preview(self, image: Image.Image, final_size: tuple[int, int]) -> Optional[Image.Image]:
+        """Return the smallest embedded preview which is at least as large as *final_size*"""
+        source_size = image.size
+        try:
+            _ = self._exif_thumbnail(image)
+            if _ is not None and self._is_usable_preview(_.size, source_size, final_size):
+                return _
+            # Fixme: MPF previews are usually sorted by increasing size
+            for frame in self._mpf_previews(image):
+                image.seek(frame)
+                if self._is_usable_preview(image.size, source_size, final_size):
+                    return image
+            image.seek(0)
+        except Exception as e:
+            # a corrupted preview must not prevent to decode the image
+            self._logger.warning(f"Failed to read the embedded preview of {self._source_path}: {e}")
+            try:
+                image.seek(0)
+            except EOFError:
+                pass
+        return None
+
+    def _open_raw(self, size: int) -> tuple[Image.Image, int]:
+        """Return the embedded preview or a half size decode of a camera RAW file, and the orientation"""
+        with rawpy.imread(str(self._source_path)) as raw:
+            source_size = (raw.sizes.width, raw.sizes.height)
+            final_size = self.fit_size(*source_size, size)
+            orientation = self.RAW_FLIP_ORIENTATION.get(raw.sizes.flip, 1)
+            try:
+                thumb = raw.extract_thumb()
+            except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+                thumb = None
+            if thumb is not None:
+                if thumb.format == rawpy.ThumbFormat.JPEG:
+                    image = Image.open(io.BytesIO(thumb.data))
+                    # an embedded JPEG can be already oriented
+                    orientation = image.getexif().get(ExifTags.Base.Orientation, orientation)
+                else:
+                    image = Image.fromarray(thumb.data)
+                if self._is_usable_preview(image.size, source_size, final_size):
+                    return image, orientation
+            # demosaic 2x2 blocks, a thumbnail does not need the full resolution
+            # LibRaw applies the flip to the output, thus it is upright
+            return Image.fromarray(raw.postprocess(half_size=True, use_camera_wb=True)), 1
+
+    ##############################################
+
+    def _decode(self, size: int) -> Image.Image:
+        """Decode the source image, resample it to fit in a *size* square and orient it upright"""
+        if rawpy is not None and self._source_path.suffix.lower() in self.RAW_EXTENSIONS:
+            image, orientation = self._open_raw(size)
+            final_size = self.fit_size(*image.size, size)
+        else:
+            image = Image.open(str(self._source_path))
+            orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+            final_size = self.fit_size(*image.size, size)
+            _ = self._open_preview(image, final_size)
+            if _ is not None:
+                image = _
+        if image.size != final_size:
+            # The DCT of a JPEG can be decoded at 1/2, 1/4 or 1/8 scale, thus the pixels are not
+            # fully decoded.  draft selects the smallest scale for which the image is still larger
+            # than the final size, and returns the box of the original image in the drafted one.
+            _ = image.draft(image.mode, final_size)
+            box = _[1] if _ is not None else None
+            if image.size != final_size:
+                image = image.resize(final_size, self.SAMPLING, box=box)
+        # the thumbnail is resampled before to be transposed, since it is cheaper
+        transpose = self.ORIENTATION_TRANSPOSE.get(orientation)
+        if transpose is not None:
+            image = image.transpose(transpose)
+        if image.mode not in self.PNG_MODES:
+            # e.g. CMYK
+            image = image.convert('RGB')
+        return image
+
+    def _save(self, image: Image.Image, size: ThumbnailSize) -> Path:
+        """Save the thumbnail, in the shared repository if enabled and writable, and return its path"""
+        if self._cache.write_shared and size != ThumbnailSize.FAIL:
+            directory = self._source_path.parent
+            if not self._cache.is_read_only(directory):
+                path = self.shared_thumbnail_path(size)
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    # readable by the other users
+                    self._write(image, path, self._make_png_info(shared=True), mode=0o644)
+                except OSError as e:
+                    # e.g. a read-only medium, then the cache is used
+                    self._logger.info(f"Cannot write the shared repository of {directory}: {e}")
+                    self._cache.set_read_only(directory)
+                else:
+                    self._cache.add_shared_file(directory, self.shared_filename, size)
+                    return path
+        path = self.thumbnail_path(size)
+        self._write(image, path, self._make_png_info())
+        self._cache.add_file(self._filename, size)
+        return path
+
+    def _write(self, image: Image.Image, dst_path: Path, png_info: PngImagePlugin.PngInfo, mode: Optional[int] = None) -> None:
+        # See Concurrent Thumbnail Creation in the specification: the thumbnail is written to a
+        # temporary file in the same directory, then renamed.  Since a rename is atomic, a reader
+        # sees the previous thumbnail or the new one, never a truncated file.
+        # mkstemp creates the file with the mode 600 required by the specification
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{dst_path.stem}-', suffix='.tmp', dir=dst_path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                if mode is not None:
+                    os.fchmod(fh.fileno(), mode)
+                image.save(fh, 'PNG', pnginfo=png_info)
+                if self._cache.fsync:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            os.replace(tmp_path, dst_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+    def _make_fail_marker(self) -> None:
+        self._save(Image.new('RGBA', (1, 1)), ThumbnailSize.FAIL)
+
+    def _decode_or_fail(self, size: int) -> Image.Image:
+        try:
+            return self._decode(size)
+        except self.DECODE_ERRORS as e:
+            self._logger.warning(f"Cannot make thumbnail for {self._source_path}: {e}")
+            self._make_fail_marker()
+            raise
+        except FileNotFoundError:
+            # removed in the meantime
+            raise
+        except Exception as e:
+            # e.g. a read error, retried by the next request
+            self._logger.warning(f"Error on {self._source_path}: {e}")
+            raise
+
+    def _check_failed(self) -> None:
+        if self.has_failed():
+            raise ThumbnailFailed(f"Thumbnail failed for {self._source_path}")
+
+    ##############################################
+
+    def _make_thumbnail_for(self, size: ThumbnailSize) -> Path:
+        return self._save(self._decode_or_fail(self._cache.size_for(size)), size)
+
+    def _make_thumbnails_for(self, sizes: Iterable[ThumbnailSize]) -> dict[ThumbnailSize, Path]:
+        """Make the thumbnails for *sizes* from one decode at the largest size"""
+        paths = {}
+        image = None
+        # cascade from the largest to the smallest, e.g. XX -> X -> LARGE -> NORMAL
+        for size in sorted(sizes, reverse=True):
+            pixels = self._cache.size_for(size)
+            if image is None:
+                image = self._decode_or_fail(pixels)
+            else:
+                final_size = self.fit_size(*image.size, pixels)
+                if image.size != final_size:
+                    image = image.resize(final_size, self.SAMPLING)
+            paths[size] = self._save(image, size)
+        return paths
 
     ##############################################
 
     def thumbnail(self, size: ThumbnailSize) -> Path:
-        # Fixme: mangle x3
-        if not self.has_thumbnail(size):
-            self._logger.info(f"Make thumbnail for {self._source_path}")
-            self._make_thumbnail_for(size)
-        return self.thumbnail_path(size)
+        path = self.find_thumbnail(size)
+        if path is None:
+            self._check_failed()
+            with self._cache.generating(self._filename):
+                # else made by a concurrent request
+                path = self.find_thumbnail(size)
+                if path is None:
+                    self._logger.info(f"Make thumbnail for {self._source_path}")
+                    path = self._make_thumbnail_for(size)
+        return path
+
+    def thumbnails(self, sizes: Iterable[ThumbnailSize]) -> dict[ThumbnailSize, Path]:
+        """Make the missing thumbnails for *sizes* and return the thumbnail paths
+
+        The source image is decoded once, at the largest missing size, then the smaller sizes are
+        resampled from the previous one.
+
+        """
+        paths = {ThumbnailSize(_): None for _ in sizes}
+        for size in paths:
+            paths[size] = self.find_thumbnail(size)
+        if None in paths.values():
+            self._check_failed()
+            with self._cache.generating(self._filename):
+                # some can be made by a concurrent request
+                for size, path in paths.items():
+                    if path is None:
+                        paths[size] = self.find_thumbnail(size)
+                missing = [size for size, path in paths.items() if path is None]
+                if missing:
+                    self._logger.info(f"Make thumbnails {' '.join(_.name for _ in missing)} for {self._source_path}")
+                    paths.update(self._make_thumbnails_for(missing))
+        return paths
 
     @property
     def normal(self) -> Path:
@@ -0,0 +1,231 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to implement the garbage collection of the thumbnail cache.
+
+For each size directory, a thumbnail is removed when:
+
+- its source was deleted, i.e. the file of the Thumb::URI is missing but its directory exists,
+- its source was modified, i.e. Thumb::MTime doesn't match, it would be made again,
+- it was not accessed since the maximum age of the policy,
+- the thumbnails exceed the maximum size of the policy, the least recently accessed are removed first.
+
+The cache is shared with the other applications, e.g. a file manager, thus the age and the size
+rules only apply to the thumbnails made by ImageBrowser, i.e. with its Software attribute, unless
+the policy sets *all_applications*.
+
+The last access is the atime of the thumbnail, or its mtime if it is later, e.g. for a file system
+mounted with noatime.
+
+A source on a missing directory is kept, e.g. an unmounted removable medium, it is removed by the
+age policy.
+
+The work is done in small batches by :meth:`ThumbnailCollector.steps`, thus the caller can throttle
+the I/O and run it at idle time.  This module must not import Qt.
+
+"""
+
+####################################################################################################
+
+__all__ = ['CachePolicy', 'CollectorStatistics', 'ThumbnailCollector']
+
+####################################################################################################
+
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+import logging
+import os
+import time
+import urllib.parse
+
+from PIL import Image
+
+from .FreeDesktop import Thumbnail, ThumbnailCache, ThumbnailSize, _parse_int
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class CachePolicy(NamedTuple):
+    # None is unlimited
+    max_bytes: Optional[int] = None
+    # in seconds since the last access
+    max_age: Optional[float] = None
+    # apply max_bytes and max_age to the thumbnails of the other applications
+    all_applications: bool = False
+
+####################################################################################################
+
+class CollectorStatistics(NamedTuple):
+    scanned: int
+    removed: int
+    freed_bytes: int
+
+####################################################################################################
+
+class _Entry(NamedTuple):
+    name: str
+    size: int
+    last_access: float
+
+####################################################################################################
+
+class ThumbnailCollector:
+
+    """Class to remove the outdated thumbnails of a :class:`ThumbnailCache`"""
+
+    # number of files processed between two steps
+    BATCH_SIZE = 32
+    # a temporary file of a writer which was killed
+    TEMPORARY_MAX_AGE = 24 * 3600
+
+    _logger = _module_logger.getChild('ThumbnailCollector')
+
+    ##############################################
+
+    def __init__(self, cache: ThumbnailCache, policies: dict[ThumbnailSize, CachePolicy]) -> None:
+        self._cache = cache
+        self._policies = dict(policies)
+        self._scanned = 0
+        self._removed = 0
+        self._freed_bytes = 0
+
+    ##############################################
+
+    @property
+    def statistics(self) -> CollectorStatistics:
+        return CollectorStatistics(self._scanned, self._removed, self._freed_bytes)
+
+    ##############################################
+
+    def collect(self) -> CollectorStatistics:
+        """Run all the steps at once"""
+        for _ in self.steps():
+            pass
+        return self.statistics
+
+    def steps(self) -> Iterator[int]:
+        """Yield the number of files processed after each batch"""
+        for size, policy in self._policies.items():
+            yield from self._collect_size(ThumbnailSize(size), policy)
+        self._logger.info(
+            f"Thumbnail cache: {self._scanned} scanned, {self._removed} removed, "
+            f"{self._freed_bytes / 2**20:.1f} MB freed"
+        )
+
+    ##############################################
+
+    def _collect_size(self, size: ThumbnailSize, policy: CachePolicy) -> Iterator[int]:
+        path = self._cache.path_for(size)
+        now = time.time()
+        entries = []
+        count = 0
+        try:
+            with os.scandir(path) as it:
+                for _ in it:
+                    count += 1
+                    if count % self.BATCH_SIZE == 0:
+                        yield self.BATCH_SIZE
+                    try:
+                        stat = _.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    if _.name.startswith('.'):
+                        if now - stat.st_mtime > self.TEMPORARY_MAX_AGE:
+                            self._remove(size, _.name, stat.st_size, temporary=True)
+                        continue
+                    if not _.name.endswith(Thumbnail.IMAGE_EXTENSION):
+                        continue
+                    entries.append(_Entry(_.name, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        except FileNotFoundError:
+            return
+        self._scanned += len(entries)
+
+        # thumbnails subject to the age and the size rules
+        kept = []
+        for i, entry in enumerate(entries):
+            if i and i % self.BATCH_SIZE == 0:
+                yield self.BATCH_SIZE
+            info = self._read_info(path.joinpath(entry.name))
+            if info is None:
+                continue
+            evictable = policy.all_applications or info.get('Software') == Thumbnail.SOFTWARE
+            if evictable and policy.max_age is not None and now - entry.last_access > policy.max_age:
+                self._remove(size, entry.name, entry.size)
+            elif self._is_outdated(info):
+                self._remove(size, entry.name, entry.size)
+            elif evictable:
+                kept.append(entry)
+
+        if policy.max_bytes is not None:
+            number_of_bytes = sum(_.size for _ in kept)
+            if number_of_bytes > policy.max_bytes:
+                kept.sort(key=lambda _: _.last_access)
+                for i, entry in enumerate(kept):
+                    if number_of_bytes <= policy.max_bytes:
+                        break
+                    if i and i % self.BATCH_SIZE == 0:
+                        yield self.BATCH_SIZE
+                    self._remove(size, entry.name, entry.size)
+                    number_of_bytes -= entry.size
+
+    ##############################################
+
+    @staticmethod
+    def _source_paths(uri: str) -> Iterator[Path]:
+        # ImageBrowser doesn't quote the URI, the specification does
+        path = uri[len('file://'):]
+        yield Path(path)
+        unquoted = urllib.parse.unquote(path, errors='surrogateescape')
+        if unquoted != path:
+            yield Path(unquoted)
+
+    @staticmethod
+    def _read_info(path: Path) -> Optional[dict]:
+        """Return the PNG attributes of a thumbnail, or None if it was removed"""
+        try:
+            with Image.open(path, formats=('PNG',)) as image:
+                return image.info
+        except FileNotFoundError:
+            return None
+        except (OSError, SyntaxError, ValueError):
+            # not our business, e.g. written by another application
+            return {}
+
+    def _is_outdated(self, info: dict) -> bool:
+        """Return True if the source of the thumbnail was deleted or modified"""
+        uri = info.get('Thumb::URI')
+        if not uri or not uri.startswith('file://'):
+            return False
+        mtime = _parse_int(info.get('Thumb::MTime'))
+        parent_exists = False
+        for source_path in self._source_paths(uri):
+            try:
+                stat = source_path.stat()
+            except OSError:
+                parent_exists = parent_exists or source_path.parent.is_dir()
+                continue
+            return mtime is not None and mtime != int(stat.st_mtime)
+        # the directory of a deleted file exists, an unmounted medium is kept
+        return parent_exists
+
+    def _remove(self, size: ThumbnailSize, name: str, file_size: int, temporary: bool = False) -> None:
+        try:
+            self._cache.path_for(size).joinpath(name).unlink()
+        except FileNotFoundError:
+            # removed by another process
+            pass
+        except OSError as e:
+            self._logger.warning(f"Cannot remove thumbnail {name}: {e}")
+            return
+        if not temporary:
+            self._cache.discard_file(name, size)
+        self._removed += 1
+        self._freed_bytes += file_size
@@ -0,0 +1,53 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to implement the functions run by the thumbnail worker processes.
+
+This module must not import Qt, a spawned worker imports only what it needs to unpickle a job.
+
+"""
+
+####################################################################################################
+
+__all__ = ['init_worker', 'make_thumbnail', 'make_thumbnails']
+
+####################################################################################################
+
+import signal
+
+from .FreeDesktop import Thumbnail, ThumbnailCache, ThumbnailSize
+
+####################################################################################################
+
+def init_worker(fsync: bool = False, use_shared: bool = True, write_shared: bool = False) -> None:
+    # Ctrl+C is handled by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # the options of the cache of the parent process
+    cache = ThumbnailCache()
+    cache.fsync = fsync
+    cache.use_shared = use_shared
+    cache.write_shared = write_shared
+
+####################################################################################################
+
+# Note: *path* is canonical, thus the thumbnail file name is the one computed by the application
+
+def make_thumbnail(path: str, size: ThumbnailSize) -> str:
+    """Make the thumbnail of *path* if it is not in the cache, and return the thumbnail path
+
+    The path can be in the shared repository next to the image.
+
+    """
+    thumbnail = Thumbnail(ThumbnailCache(), path, resolve=False)
+    return str(thumbnail.thumbnail(ThumbnailSize(size)))
+
+def make_thumbnails(path: str, sizes: tuple[ThumbnailSize, ...]) -> dict[ThumbnailSize, str]:
+    """Make the missing thumbnails of *path* from one decode, and return the thumbnail paths"""
+    thumbnail = Thumbnail(ThumbnailCache(), path, resolve=False)
+    paths = thumbnail.thumbnails(ThumbnailSize(_) for _ in sizes)
+    return {size: str(_) for size, _ in paths.items()}
@@ -49,6 +49,11 @@ from .ApplicationMetadata import ApplicationMetadata
 from .ApplicationSettings import ApplicationSettings   # , Shortcut
 from .QmlApplication import QmlApplication
 from .QmlImageCollection import QmlImageCollection
+from .ThumbnailEngine import ThumbnailEngine
+from .ThumbnailMaintenance import ThumbnailMaintenance
+from .ThumbnailProvider import ThumbnailProvider
+from ImageBrowser.backend.thumbnail.FreeDesktop import ThumbnailCache, ThumbnailSize
+from ImageBrowser.library.unicode import set_default_locale
 #! from ImageBrowser.library.os.platform import QtPlatform
 
 # if TYPE_CHECKING:
@@ -115,6 +120,8 @@ class Application(QObject):
         self._args = args
 
         self._collection = None
+        # collection being loaded, swapped with the current one when it is ready
+        self._pending_collection = None
         # Fixme: must be defined before QML
         #! self.load_collection(self._args.path)
 
@@ -148,8 +155,17 @@ class Application(QObject):
         number_of_threads_max = self._thread_pool.maxThreadCount()
         self._logger.info(f'Multithreading with maximum {number_of_threads_max} threads')
 
-        # self._image_provider = ImageProvider()
-        # self._engine.addImageProvider('image', self._image_provider)
+        thumbnail_cache = ThumbnailCache()
+        thumbnail_cache.use_shared = self._settings.thumbnail_use_shared
+        thumbnail_cache.write_shared = self._settings.thumbnail_write_shared
+        self._thumbnail_engine = ThumbnailEngine()
+
+        self._thumbnail_provider = ThumbnailProvider(self._settings.thumbnail_memory_cache_size * 2**20)
+        self._engine.addImageProvider(ThumbnailProvider.NAME, self._thumbnail_provider)
+        self._thumbnail_maintenance = ThumbnailMaintenance(
+            {_: self._settings.thumbnail_cache_policy(_) for _ in ThumbnailSize},
+            is_busy=self._is_busy,
+        )
 
         self._translator = None
         #! self._load_translation()
@@ -190,14 +206,24 @@ class Application(QObject):
     def thread_pool(self) -> QThreadPool:
         return self._thread_pool
 
-    # @property
-    # def image_provider(self) -> ImageProvider:
-    #     return self.image_provider
+    @property
+    def thumbnail_engine(self) -> ThumbnailEngine:
+        return self._thumbnail_engine
+
+    @property
+    def thumbnail_provider(self) -> ThumbnailProvider:
+        return self._thumbnail_provider
 
     @property
     def collection(self) -> QmlImageCollection:
         return self._collection
 
+    def _is_busy(self) -> bool:
+        if self._thumbnail_engine.number_of_jobs:
+            return True
+        collection = self._pending_collection or self._collection
+        return collection is not None and collection.loading
+
     ##############################################
 
     def _print_critical_message(self, message: str) -> None:
@@ -299,6 +325,7 @@ class Application(QObject):
 
         # Settings
         self._settings = ApplicationSettings()
+        set_default_locale(self._settings.collation_locale)
 
         # Set Flickable wheel speed
         #   qtdeclarative/src/quick/items/qquickflickable.cpp
@@ -365,6 +392,8 @@ class Application(QObject):
         self._logger.info('Start Qt event loop')
         rc = self._application.exec()
         self._logger.info(f"Qt event loop exited with {rc}")
+        self._thumbnail_maintenance.stop()
+        self._thumbnail_engine.shutdown()
         # Deleting the view before it goes out of scope is required
         # to make sure all child QML instances are destroyed in the correct order.
         # if self._view is not None:
@@ -377,15 +406,13 @@ class Application(QObject):
 
     def _post_init(self) -> None:
         self._logger.info('««« Post Init...')
-        # if self._args.watcher:
-        #     self._logger.info('Start watcher')
-        #     self._collection.start_watcher()   # QtCore.QFileSystemWatcher(self)
         path = Path(self._args.path).absolute()
         if path.exists():
             url = QUrl(f'file:{path}')
             self._qml_application.load_collection(url)
         if self._args.user_script is not None:
             self.execute_user_script(self._args.user_script)
+        self._thumbnail_maintenance.start()
         self._logger.info('  Post Init Done »»»')
 
     ##############################################
@@ -416,6 +443,48 @@ class Application(QObject):
     ##############################################
 
     def load_collection(self, path: PathOrStr) -> None:
+        """Load a collection in background, the current collection is kept until the new one is
+        ready.  A previous load is cancelled.
+
+        """
         self._logger.info(f"Load collection {path} ...")
-        self._collection = QmlImageCollection(path)
+        if self._pending_collection is not None:
+            self._pending_collection.close()
+            self._pending_collection = None
+        # e.g. a path typed in the navigator
+        if not Path(path).is_dir():
+            self._logger.warning(f"{path} is not a directory")
+            self._qml_application.notify_message(f"{path} is not a directory")
+            return
+        collection = QmlImageCollection(
+            path,
+            stream=True,
+            live=self._args.watcher,
+            recursive=self._args.recursive,
+            max_depth=self._args.max_depth,
+        )
+        self._pending_collection = collection
+        collection.progress.connect(self._qml_application.collection_progress)
+        collection.ready.connect(lambda: self._swap_collection(collection))
+        collection.failed.connect(lambda message: self._on_collection_failed(collection, message))
+
+    ##############################################
+
+    def _on_collection_failed(self, collection: QmlImageCollection, message: str) -> None:
+        # the current collection is kept
+        if collection is self._pending_collection:
+            self._pending_collection = None
+            collection.close()
+        self._qml_application.notify_message(f"Cannot load {collection.path}: {message}")
+
+    def _swap_collection(self, collection: QmlImageCollection) -> None:
+        if collection is not self._pending_collection:
+            # outdated load
+            return
+        self._pending_collection = None
+        old_collection = self._collection
+        self._collection = collection
+        if old_collection is not None:
+            old_collection.close()
         self._logger.info('ImageCollection loaded')
+        self._qml_application.collection_changed.emit()
@@ -79,12 +79,26 @@ class ApplicationArgs:
             help="",
         )
 
-        # parser.add_argument(
-        #     '--watcher',
-        #     action='store_true',
-        #     default=False,
-        #     help='start watcher',
-        # )
+        parser.add_argument(
+            '--watcher',
+            action='store_true',
+            default=False,
+            help='watch the directory and update the collection live',
+        )
+
+        parser.add_argument(
+            '--recursive',
+            action='store_true',
+            default=False,
+            help='collect the images of the subdirectories',
+        )
+
+        parser.add_argument(
+            '--max-depth',
+            type=int,
+            default=-1,
+            help='depth of the deepest subdirectory to collect, -1 is unlimited',
+        )
 
         self._args = parser.parse_args()
 
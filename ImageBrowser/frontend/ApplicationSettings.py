@@ -19,7 +19,7 @@ __all__ = [
 
 ####################################################################################################
 
-from typing import Iterator
+from typing import Iterator, Optional
 import logging
 
 from PySide6.QtCore import (
@@ -28,8 +28,10 @@ from PySide6.QtCore import (
 )
 from PySide6.QtQml import QmlElement, QmlUncreatable, ListProperty
 
+from ImageBrowser.backend.thumbnail.collector import CachePolicy
+from ImageBrowser.backend.thumbnail.FreeDesktop import ThumbnailCache, ThumbnailSize
 from . import DefaultSettings
-from .DefaultSettings import Shortcuts
+from .DefaultSettings import Shortcuts, ThumbnailCachePolicy
 
 ####################################################################################################
 
@@ -161,6 +163,41 @@ class ApplicationSettings(QSettings):
 
     ##############################################
 
+    @property
+    def collation_locale(self) -> Optional[str]:
+        """Locale to sort the names, e.g. fr_FR, None is the locale of the environment"""
+        return self.value('collation/locale') or None
+
+    @property
+    def thumbnail_memory_cache_size(self) -> int:
+        """Size in MB of the decoded thumbnails kept in memory"""
+        return int(self.value('thumbnail/memory_cache_size') or 128)
+
+    @property
+    def thumbnail_use_shared(self) -> bool:
+        """Read the shared thumbnail repository .sh_thumbnails next to the images"""
+        return self.value('thumbnail/use_shared', True, type=bool)
+
+    @property
+    def thumbnail_write_shared(self) -> bool:
+        """Write the thumbnails to the shared repository when the medium is writable"""
+        return self.value('thumbnail/write_shared', False, type=bool)
+
+    def thumbnail_cache_policy(self, size: ThumbnailSize) -> CachePolicy:
+        """Policy of a thumbnail directory, e.g. thumbnail/large/max_size in MB and max_age in days"""
+        name = ThumbnailCache.PATHS[size]
+        max_size = self.value(f'thumbnail/{name}/max_size') or ThumbnailCachePolicy.max_size[name]
+        max_age = self.value(f'thumbnail/{name}/max_age') or ThumbnailCachePolicy.max_age
+        return CachePolicy(
+            max_bytes=None if max_size is None else int(float(max_size) * 2**20),
+            max_age=float(max_age) * 24 * 3600,
+            all_applications=self.value(
+                'thumbnail/all_applications', ThumbnailCachePolicy.all_applications, type=bool,
+            ),
+        )
+
+    ##############################################
+
     # @Property(QQmlListProperty, constant=True)
     # def shortcuts(self) -> QQmlListProperty:
     #     return QQmlListProperty(Shortcut, self, self._shortcuts)
@@ -0,0 +1,128 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to scan a collection in a worker thread.
+
+"""
+
+####################################################################################################
+
+__all__ = ['CollectionLoader']
+
+####################################################################################################
+
+from typing import Optional
+import logging
+import threading
+import traceback
+
+from PySide6.QtCore import QRunnable, Signal, Slot, QObject
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class CollectionLoaderSignals(QObject):
+
+    """Class to define the signals available from a collection loader.
+
+    batch
+        `list` of new images
+
+    progress
+        `int` number of entries scanned, `int` number of images found
+
+    error
+        `str` traceback
+
+    finished
+        No data, emitted when the scan is done or cancelled
+
+    """
+
+    batch = Signal(object)
+    progress = Signal(int, int)
+    error = Signal(str)
+    finished = Signal()
+
+####################################################################################################
+
+class CollectionLoader(QRunnable):
+
+    """Class to scan a :class:`DirectoryCollection` in a worker thread.
+
+    The new images are sent by batches to the GUI thread through the queued signal `batch`.  The
+    scan can be cancelled from any thread, it stops at the next batch boundary.
+
+    When the scan is complete, the permutation for *sort_key* is computed, thus the first sort in
+    the GUI thread is a lookup.
+
+    """
+
+    _logger = _module_logger.getChild('CollectionLoader')
+
+    ##############################################
+
+    def __init__(
+        self,
+        collection: DirectoryCollection,
+        batch_size: int,
+        time_budget: float,
+        sort_key: Optional[str] = None,
+    ) -> None:
+        super().__init__()
+        self._collection = collection
+        self._batch_size = batch_size
+        self._time_budget = time_budget
+        self._sort_key = sort_key
+        self._cancel_event = threading.Event()
+        # created in the GUI thread, thus connections to GUI objects are queued
+        self._signals = CollectionLoaderSignals()
+
+    ##############################################
+
+    @property
+    def signals(self) -> CollectionLoaderSignals:
+        return self._signals
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    ##############################################
+
+    @Slot()
+    def run(self) -> None:
+        path = self._collection.path
+        self._logger.info(f"Scan {path}")
+        try:
+            it = self._collection.iter_scan(batch_size=self._batch_size, time_budget=self._time_budget)
+            for images in it:
+                if self.cancelled:
+                    # close the generator, thus the directory
+                    it.close()
+                    self._logger.info(f"Scan of {path} cancelled")
+                    break
+                if images:
+                    self._signals.batch.emit(images)
+                self._signals.progress.emit(self._collection.number_of_entries, len(self._collection))
+            else:
+                if self._sort_key is not None:
+                    self._collection.permutation(self._sort_key)
+        except Exception:
+            self._logger.warning(f"Scan of {path} failed")
+            self._signals.error.emit(traceback.format_exc())
+        finally:
+            self._signals.finished.emit()
@@ -0,0 +1,164 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to watch the directory of a collection.
+
+The events are debounced: the changed names are accumulated until no event is received for
+:attr:`CollectionWatcher.DEBOUNCE_DELAY`, or at most for :attr:`CollectionWatcher.MAX_DELAY`, thus a
+copy of hundreds of files is reported by a few bursts.
+
+"""
+
+####################################################################################################
+
+__all__ = ['CollectionWatcher']
+
+####################################################################################################
+
+from pathlib import Path
+import logging
+import time
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QSocketNotifier, QTimer, Signal
+
+from ImageBrowser.library.os.inotify import Inotify, InotifyMask
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class CollectionWatcher(QObject):
+
+    """Class to watch a directory using inotify, or QFileSystemWatcher as fallback.
+
+    The signal `changed` is emitted with the set of the changed names, or None if the changes are
+    unknown, e.g. when the inotify queue overflowed, and thus the whole directory must be checked.
+
+    """
+
+    DEBOUNCE_DELAY = 250   # ms
+    MAX_DELAY = 2000   # ms
+
+    MASK = (
+        InotifyMask.CREATE
+        | InotifyMask.CLOSE_WRITE
+        # e.g. touch, the mtime is set without a write
+        | InotifyMask.ATTRIB
+        | InotifyMask.MOVED_FROM
+        | InotifyMask.MOVED_TO
+        | InotifyMask.DELETE
+        | InotifyMask.DELETE_SELF
+        | InotifyMask.MOVE_SELF
+        | InotifyMask.ONLYDIR
+        | InotifyMask.EXCL_UNLINK
+    )
+
+    changed = Signal(object)
+
+    _logger = _module_logger.getChild('CollectionWatcher')
+
+    ##############################################
+
+    def __init__(self, path: Path, parent: QObject = None) -> None:
+        super().__init__(parent)
+        self._path = path
+        self._pending = set()
+        self._unknown_changes = False
+        self._first_event_time = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+        self._inotify = None
+        self._notifier = None
+        self._fallback = None
+        try:
+            self._inotify = Inotify()
+            self._inotify.add_watch(path, self.MASK)
+            self._notifier = QSocketNotifier(self._inotify.fileno(), QSocketNotifier.Type.Read, self)
+            self._notifier.activated.connect(self._on_inotify)
+            self._logger.info(f"Watch {path} using inotify")
+        except (OSError, AttributeError) as e:
+            # AttributeError: the libc doesn't provide inotify
+            self._logger.warning(f"Cannot use inotify on {path}: {e}")
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            # only tell a directory changed
+            self._fallback = QFileSystemWatcher([str(path)], self)
+            self._fallback.directoryChanged.connect(self._on_directory_changed)
+            self._logger.info(f"Watch {path} using QFileSystemWatcher")
+
+    ##############################################
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def stop(self) -> None:
+        self._timer.stop()
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+            self._notifier = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        if self._fallback is not None:
+            self._fallback.removePaths(self._fallback.directories())
+            self._fallback = None
+        self._pending.clear()
+        self._unknown_changes = False
+
+    ##############################################
+
+    def _on_inotify(self) -> None:
+        if self._inotify is None:
+            return
+        for event in self._inotify.read_events():
+            mask = event.mask
+            if mask & InotifyMask.Q_OVERFLOW:
+                self._logger.warning(f"inotify queue overflow for {self._path}")
+                self._unknown_changes = True
+            elif mask & (InotifyMask.DELETE_SELF | InotifyMask.MOVE_SELF):
+                self._logger.warning(f"{self._path} was removed or moved")
+            elif event.name:
+                self._pending.add(event.name)
+        self._schedule()
+
+    def _on_directory_changed(self, path: str) -> None:
+        self._unknown_changes = True
+        self._schedule()
+
+    ##############################################
+
+    def _schedule(self) -> None:
+        if not (self._pending or self._unknown_changes):
+            return
+        now = time.monotonic()
+        if self._first_event_time is None:
+            self._first_event_time = now
+        remaining = self.MAX_DELAY - int((now - self._first_event_time) * 1000)
+        if remaining <= 0:
+            self._flush()
+        else:
+            # restart the timer on each burst
+            self._timer.start(min(self.DEBOUNCE_DELAY, remaining))
+
+    def _flush(self) -> None:
+        self._timer.stop()
+        self._first_event_time = None
+        if self._unknown_changes:
+            names = None
+        elif self._pending:
+            names = self._pending
+        else:
+            return
+        self._pending = set()
+        self._unknown_changes = False
+        self.changed.emit(names)
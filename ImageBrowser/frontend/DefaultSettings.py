@@ -9,6 +9,7 @@
 __all__ = [
     'Shortcuts',
     'ExternalProgram',
+    'ThumbnailCachePolicy',
 ]
 
 ####################################################################################################
@@ -41,3 +42,19 @@ class ExternalProgram:
         gimp = None
 
     default = gimp
+
+####################################################################################################
+
+class ThumbnailCachePolicy:
+    # maximum size in MB of a size directory, None is unlimited
+    max_size = {
+        'normal': 256,
+        'large': 1024,
+        'x-large': 1024,
+        'xx-large': 1024,
+        'fail': None,
+    }
+    # maximum age in days since the last access, like GNOME housekeeping
+    max_age = 180
+    # the size and the age limits apply to the thumbnails of the other applications
+    all_applications = False
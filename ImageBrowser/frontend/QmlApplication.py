@@ -70,6 +70,8 @@ class QmlApplication(QObject):
         self._application = application
         self._file_system_model = QmlFileSystemModel()
         self._path_navigator = QmlPathNavigator(path=Path.cwd())
+        # navigating elsewhere cancels the load in progress
+        self._path_navigator.path_changed.connect(self._application.load_collection)
 
     ##############################################
 
@@ -107,6 +109,7 @@ class QmlApplication(QObject):
     ##############################################
 
     collection_changed = Signal()
+    collection_progress = Signal(int, int)   # number of entries scanned, number of images found
 
     @Property(QmlImageCollection, notify=collection_changed)
     def collection(self) -> QmlImageCollection:
@@ -121,5 +124,5 @@ class QmlApplication(QObject):
         _ = url.toString()
         self._logger.info(f"Load collection {_}")
         path = url.toLocalFile()
+        # collection_changed is emitted when the collection is ready
         self._application.load_collection(path)
-        self.collection_changed.emit()
@@ -11,24 +11,38 @@ __all__ = ['QmlImageCollection']
 ####################################################################################################
 
 from pathlib import Path
-import glob
+from typing import Iterator, Optional
 import logging
+import os
 import subprocess
-import time
 
 from PySide6.QtCore import (
     Qt,
     QAbstractListModel,
-    QFileSystemWatcher,
     Property, Signal, Slot, QObject,
     QByteArray,
+    QModelIndex,
+    QTimer,
 )
 from PySide6.QtQml import QmlElement, QmlUncreatable, ListProperty
 
+import numpy as np
+
 # Fixme: Linux only
-from ImageBrowser.backend.thumbnail.FreeDesktop import ThumbnailCache, ThumbnailSize
-from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection, Image
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailCache, ThumbnailSize
+from ImageBrowser.backend.ImageCollection.ImageCollection import (
+    CollectionChanges,
+    DirectoryCollection,
+    Image,
+    RecursiveDirectoryCollection,
+    SnapshotChanges,
+)
+from ImageBrowser.backend.ImageCollection.ScanIndex import ScanIndex
+from ImageBrowser.library.os.linux import is_network_file_system
+from .CollectionLoader import CollectionLoader
+from .CollectionWatcher import CollectionWatcher
 from .Runnable import Worker
+from .ThumbnailProvider import ThumbnailProvider
 
 ####################################################################################################
 
@@ -44,6 +58,19 @@ thumbnail_cache = ThumbnailCache()
 
 ####################################################################################################
 
+def _iter_ranges(rows: np.ndarray) -> Iterator[tuple[int, int]]:
+    """Yield the (first, last) ranges of consecutive rows, *rows* must be sorted"""
+    if not len(rows):
+        return
+    # position where a range starts
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(rows)]))
+    for start, stop in zip(starts, stops):
+        yield int(rows[start]), int(rows[stop - 1])
+
+####################################################################################################
+
 @QmlElement
 @QmlUncreatable('QmlImage')
 class QmlImage(QObject):
@@ -56,6 +83,9 @@ class QmlImage(QObject):
         super().__init__()
         self._qml_collection = qml_collection
         self._image = image
+        self._thumbnail = None
+        # size of the queued request
+        self._requested_size = None
 
     ##############################################
 
@@ -99,24 +129,84 @@ class QmlImage(QObject):
         return thumbnail_cache.size_for(ThumbnailSize.LARGE)
 
     large_thumbnail_path_changed = Signal()
+    thumbnail_changed = Signal()
+
+    @property
+    def thumbnail(self) -> Thumbnail:
+        # the QML bindings read the thumbnail path often
+        if self._thumbnail is None:
+            self._thumbnail = self._qml_collection.thumbnail_of(self._image)
+        return self._thumbnail
+
+    def invalidate_thumbnail(self) -> None:
+        """The image was modified"""
+        self._thumbnail = None
+        self.large_thumbnail_path_changed.emit()
+        self.thumbnail_changed.emit()
 
     @Property(str, notify=large_thumbnail_path_changed)
     def large_thumbnail_path(self) -> str:
-        # Fixme: cache thumbnail instance ?
-        return str(thumbnail_cache[self._image.path].large_path)
+        """Return the path of the large thumbnail, or an empty string if it must be requested"""
+        path = self.thumbnail.cached_thumbnail_path(ThumbnailSize.LARGE)
+        return '' if path is None else str(path)
+
+    @Property(str, notify=large_thumbnail_path_changed)
+    def large_thumbnail_url(self) -> str:
+        """Return the URL of the large thumbnail in the image provider, or an empty string"""
+        return ThumbnailProvider.url_for(self.thumbnail, ThumbnailSize.LARGE)
+
+    @Property(str, notify=thumbnail_changed)
+    def thumbnail_url(self) -> str:
+        """Return the URL of the thumbnail for the view, or an empty string if it must be requested
+
+        The size is the one of :attr:`QmlImageCollection.thumbnail_size`, or a larger one if it is in
+        the cache.
+
+        """
+        thumbnail = self.thumbnail
+        size = thumbnail.cached_size(self._qml_collection.thumbnail_size)
+        if size is None:
+            return ''
+        return ThumbnailProvider.url_for(thumbnail, size)
 
     thumbnail_ready = Signal()
 
+    def _request_thumbnail(self, size: ThumbnailSize) -> None:
+        # the thumbnail is made by a worker process
+        from .Application import Application
+        def on_ready(thumbnail_path: str) -> None:
+            if self._requested_size == size:
+                self._requested_size = None
+            self.thumbnail_ready.emit()
+        self._requested_size = size
+        Application.instance.thumbnail_engine.request(
+            self._image.path_str,
+            size,
+            on_ready,
+            thumbnail=self.thumbnail,
+            priority=lambda: self._qml_collection.thumbnail_priority(self),
+        )
+
     @Slot()
     def request_large_thumbnail(self) -> None:
-        # Fixme: async
-        def job():
-            # Fixme: issue when the application is closed
-            return str(thumbnail_cache[self._image.path].large)
-        worker = Worker(job)
-        worker.signals.finished.connect(self.thumbnail_ready)
+        self._request_thumbnail(ThumbnailSize.LARGE)
+
+    @Slot()
+    def request_thumbnail(self) -> None:
+        """Request the thumbnail for the view"""
+        self._request_thumbnail(self._qml_collection.thumbnail_size)
+
+    @Slot()
+    def cancel_thumbnail(self) -> None:
+        """Cancel the request if it is still queued, e.g. the delegate is destroyed"""
         from .Application import Application
-        Application.instance.thread_pool.start(worker)
+        if self._requested_size is not None:
+            Application.instance.thumbnail_engine.cancel(str(self.thumbnail.source_path), self._requested_size)
+            self._requested_size = None
+
+    @Slot()
+    def cancel_large_thumbnail(self) -> None:
+        self.cancel_thumbnail()
 
     ##############################################
 
@@ -144,21 +234,336 @@ class QmlImageCollection(QAbstractListModel):
 
     new_image = Signal(int)
 
+    # Streaming mode
+    #   The directory is scanned in a worker thread and the new images are sent by batches,
+    #   so the first rows are displayed without waiting the end of the scan.
+    BATCH_SIZE = 512
+    # the thumbnails of the next pages in the scroll direction are made after the visible ones
+    LOOK_AHEAD_PAGES = 2
+    # range of the thumbnail size in the view, in logical pixels
+    MIN_DISPLAY_SIZE = 64
+    MAX_DISPLAY_SIZE = 1024
+    TIME_BUDGET = .02   # s, time between two batches at most, thus the latency of the first screen
+
+    # emitted when the first batch is available or the scan is done
+    ready = Signal()
+    progress = Signal(int, int)   # number of entries scanned, number of images found
+    # emitted when the scan failed, e.g. the directory was removed
+    failed = Signal(str)   # message
+
+    # Live mode
+    #   The directory is watched, the changes are debounced by the watcher, then the entries are
+    #   stat in a worker thread, and the model is updated by ranges of rows.
+    #   On a network file system, inotify doesn't report the remote changes, thus the directory is
+    #   rescanned periodically and diffed against the collection.
+    POLL_INTERVAL = 10_000   # ms
+
     _logger = _module_logger.getChild('QmlImageCollection')
 
     ##############################################
 
-    def __init__(self, path: str, parent=None) -> None:
+    def __init__(
+        self,
+        path: str,
+        stream: bool = False,
+        live: bool = False,
+        recursive: bool = False,
+        max_depth: int = -1,
+        parent=None,
+    ) -> None:
+        """If *recursive* is set, the images of the hierarchy up to *max_depth* are collected."""
         super().__init__(parent)
-        self._collection = DirectoryCollection(path)
-        # We must prevent garbage collection
-        # iter = self._collection.iter_by_index
-        iter = self._collection.iter_by_name
-        self._images = [QmlImage(self, image) for image in iter]
+        self._sort_key = 'name'
+        self._reverse = False
+        self._loader = None
+        self._is_ready = False
+        self._number_of_rows = 0
+        # The model knows the first indexes of the collection,
+        #   the collection can be ahead of the model while it is scanned.
+        self._number_of_indexes = 0
+        # row -> image index, None is the index order
+        self._order = None
+        # QmlImage are made on demand, we must prevent garbage collection
+        self._qml_images = {}
+        # index -> MD5 of the URI, i.e. the thumbnail file name, empty if it is not hashed
+        self._thumbnail_digests = np.zeros(0, dtype='S32')
+        # rows shown by the view, and the last scroll direction
+        self._visible_range = (0, -1)
+        self._scroll_direction = 1
+        # row of an image index, computed on demand for an order
+        self._inverse_order = None
+        self._inverse_order_of = None
+        self._closed = False
+        # logical pixels of a thumbnail in the view, and the pixel density of the screen
+        self._display_size = thumbnail_cache.size_for(ThumbnailSize.LARGE)
+        self._device_pixel_ratio = 1.
+        self._thumbnail_size = ThumbnailSize.LARGE
+        self._watcher = None
+        self._poll_timer = None
+        self._updating = False
+        # changed names waiting for the end of the scan or of an update, None is unknown
+        self._pending_names = set()
+        if recursive:
+            collection_cls = RecursiveDirectoryCollection
+            kwargs = dict(max_depth=max_depth)
+        else:
+            collection_cls = DirectoryCollection
+            kwargs = {}
+        if stream:
+            self._collection = collection_cls(path, scan=False, index=ScanIndex(), **kwargs)
+        else:
+            self._collection = collection_cls(path, index=ScanIndex(), **kwargs)
+            self._number_of_rows = len(self._collection)
+            self._number_of_indexes = len(self._collection.store)
+            self._order = self._collection.permutation(self._sort_key)
+            self._hash_thumbnail_filenames(list(self._collection))
+            self._is_ready = True
+        if live:
+            # start before the scan, thus no change is missed
+            self.start_watcher()
+        if stream:
+            self._start_scan()
         # self.reset()
 
     ##############################################
 
+    def _start_scan(self) -> None:
+        from .Application import Application
+        self._logger.info(f"Stream {self._collection.path}")
+        self._loader = CollectionLoader(self._collection, self.BATCH_SIZE, self.TIME_BUDGET, self._sort_key)
+        signals = self._loader.signals
+        signals.batch.connect(self._on_batch)
+        signals.progress.connect(self.progress)
+        signals.error.connect(self._on_scan_error)
+        signals.finished.connect(self._on_scan_finished)
+        Application.instance.thread_pool.start(self._loader)
+        self.loading_changed.emit()
+
+    def _set_ready(self) -> None:
+        if not self._is_ready:
+            self._is_ready = True
+            self.ready.emit()
+
+    def _on_batch(self, images: list[Image]) -> None:
+        if self._loader is not None:
+            self.append_images(images)
+            self._set_ready()
+
+    def _on_scan_error(self, backtrace: str) -> None:
+        if self._loader is None:
+            # cancelled
+            return
+        # finished is emitted after, the collection must not be ready
+        self._loader = None
+        self._logger.warning(f"Scan of {self._collection.path} failed{os.linesep}{backtrace}")
+        self.loading_changed.emit()
+        self.failed.emit(backtrace.rstrip().splitlines()[-1])
+
+    def _on_scan_finished(self) -> None:
+        if self._loader is None:
+            # cancelled or failed
+            return
+        self._loader = None
+        self._logger.info(f"Stream done: {self._number_of_rows} images")
+        self.subdirectories_changed.emit()
+        self.loading_changed.emit()
+        self.sort(self._sort_key)
+        self._set_ready()
+        self._start_update()
+
+    def cancel_scan(self) -> None:
+        if self._loader is not None:
+            self._logger.info(f"Cancel scan of {self._collection.path}")
+            self._loader.cancel()
+            self._loader = None
+            self.loading_changed.emit()
+
+    def close(self) -> None:
+        """Cancel the scan, stop the watcher and cancel the queued thumbnails"""
+        from .Application import Application
+        self.cancel_scan()
+        self.stop_watcher()
+        self._closed = True
+        Application.instance.thumbnail_engine.reprioritize()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._is_ready
+
+    loading_changed = Signal()
+
+    @Property(bool, notify=loading_changed)
+    def loading(self) -> bool:
+        return self._loader is not None
+
+    ##############################################
+
+    def append_images(self, images: list[Image]) -> None:
+        if not images:
+            return
+        first = self._number_of_rows
+        last = first + len(images) - 1
+        indexes = np.fromiter((image.index for image in images), dtype=np.int64, count=len(images))
+        self.beginInsertRows(QModelIndex(), first, last)
+        if self._order is None and indexes[0] != self._number_of_indexes:
+            # the rows are no longer the index order
+            self._order = np.arange(self._number_of_indexes)
+        if self._order is not None:
+            # new images are appended at the end until the next sort
+            self._order = np.concatenate((self._order, indexes))
+        self._number_of_rows += len(images)
+        self._number_of_indexes = max(self._number_of_indexes, int(indexes.max()) + 1)
+        self._hash_thumbnail_filenames(images)
+        self.endInsertRows()
+        self.number_of_images_changed.emit()
+        self.last_index_changed.emit()
+
+    ##############################################
+
+    @property
+    def is_live(self) -> bool:
+        return self._watcher is not None or self._poll_timer is not None
+
+    def start_watcher(self) -> None:
+        if self.is_live:
+            return
+        path = self._collection.path
+        if isinstance(self._collection, RecursiveDirectoryCollection):
+            # Fixme: watch the hierarchy
+            self._logger.warning(f"Live updates are not supported for the hierarchy {path}")
+            return
+        if is_network_file_system(path):
+            self._logger.info(f"Poll {path} every {self.POLL_INTERVAL} ms")
+            self._poll_timer = QTimer(self)
+            self._poll_timer.setInterval(self.POLL_INTERVAL)
+            # None requests a rescan
+            self._poll_timer.timeout.connect(lambda: self._on_directory_changed(None))
+            self._poll_timer.start()
+        else:
+            self._watcher = CollectionWatcher(path, self)
+            self._watcher.changed.connect(self._on_directory_changed)
+
+    def stop_watcher(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        if self._poll_timer is not None:
+            self._poll_timer.stop()
+            self._poll_timer = None
+
+    def _on_directory_changed(self, names: Optional[set[str]]) -> None:
+        if names is None or self._pending_names is None:
+            self._pending_names = None
+        else:
+            self._pending_names |= names
+        self._start_update()
+
+    def _start_update(self) -> None:
+        # the collection is modified by the loader during the scan, and an update at a time
+        if self._loader is not None or self._updating:
+            return
+        if self._pending_names is not None and not self._pending_names:
+            return
+        from .Application import Application
+        names = self._pending_names
+        self._pending_names = set()
+        self._updating = True
+        self._logger.info(f"Update {self._collection.path}: {'all' if names is None else len(names)} entries")
+        # I/O is done in a worker thread, the collection and the model are updated in the GUI thread
+        if names is None:
+            # the changes are unknown, diff a rescan, only the changes are applied in the GUI thread
+            worker = Worker(self._diff_snapshot)
+            worker.signals.result.connect(self._on_snapshot)
+        else:
+            worker = Worker(self._collection.stat_names, names)
+            worker.signals.result.connect(self._on_stats)
+        worker.signals.finished.connect(self._on_update_finished)
+        Application.instance.thread_pool.start(worker)
+
+    def _on_stats(self, stats: dict[str, Optional[os.stat_result]]) -> None:
+        if self.is_live:
+            self.apply_changes(self._collection.apply_stats(stats))
+
+    def _diff_snapshot(self) -> SnapshotChanges:
+        # called in a worker thread, the collection is not modified during an update
+        return self._collection.diff_snapshot(self._collection.snapshot())
+
+    def _on_snapshot(self, changes: SnapshotChanges) -> None:
+        if self.is_live:
+            self.apply_changes(self._collection.apply_snapshot_changes(changes))
+
+    def _on_update_finished(self) -> None:
+        self._updating = False
+        if self.is_live:
+            self._start_update()
+
+    ##############################################
+
+    def _materialize_order(self) -> None:
+        if self._order is None:
+            self._order = np.arange(self._number_of_indexes)
+
+    def _row_of(self, index: int) -> Optional[int]:
+        if self._order is None:
+            return index if index < self._number_of_rows else None
+        # the order is replaced by a new array when it changes
+        if self._inverse_order_of is not self._order:
+            inverse = np.full(self._number_of_indexes, -1, dtype=np.int64)
+            inverse[self._order] = np.arange(len(self._order))
+            self._inverse_order = inverse
+            self._inverse_order_of = self._order
+        if index >= len(self._inverse_order):
+            return None
+        row = int(self._inverse_order[index])
+        return row if row >= 0 else None
+
+    def _rows_of(self, indexes: list[int]) -> np.ndarray:
+        """Return the sorted rows of the images *indexes*"""
+        self._materialize_order()
+        return np.flatnonzero(np.isin(self._order, indexes))
+
+    def apply_changes(self, changes: CollectionChanges) -> None:
+        """Update the model by ranges of rows"""
+        if not changes:
+            return
+        self._logger.info(
+            f"{len(changes.added)} added, {len(changes.removed)} removed, {len(changes.modified)} modified"
+        )
+        if changes.removed:
+            self._remove_rows(changes.removed)
+        if changes.modified:
+            self._update_rows(changes.modified)
+        if changes.added:
+            self.append_images([self._collection[_] for _ in changes.added])
+        if changes.subdirectories_changed:
+            self.subdirectories_changed.emit()
+
+    def _remove_rows(self, indexes: list[int]) -> None:
+        rows = self._rows_of(indexes)
+        # remove from the end, thus the rows of the next ranges are unchanged
+        for first, last in reversed(list(_iter_ranges(rows))):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._order = np.delete(self._order, np.s_[first:last + 1])
+            self._number_of_rows -= last - first + 1
+            self.endRemoveRows()
+        for index in indexes:
+            self._qml_images.pop(index, None)
+        self._thumbnail_digests[[_ for _ in indexes if _ < len(self._thumbnail_digests)]] = b''
+        self.number_of_images_changed.emit()
+        self.last_index_changed.emit()
+
+    def _update_rows(self, indexes: list[int]) -> None:
+        for index in indexes:
+            qml_image = self._qml_images.get(index)
+            if qml_image is not None:
+                # the thumbnail is outdated
+                qml_image.invalidate_thumbnail()
+        rows = self._rows_of(indexes)
+        for first, last in _iter_ranges(rows):
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+    ##############################################
+
     @Property(str, constant=True)
     def path(self) -> str:
         return str(self._collection.path)
@@ -178,7 +583,7 @@ class QmlImageCollection(QAbstractListModel):
     @Property(int, notify=number_of_images_changed)
     def number_of_images(self):
         # return self._collection.number_of_images
-        return len(self._images)
+        return self._number_of_rows
 
     @Slot(int, result=bool)
     def is_valid_index(self, index):
@@ -190,7 +595,7 @@ class QmlImageCollection(QAbstractListModel):
 
     @Property(int, notify=last_index_changed)
     def last_index(self):
-        return self._collection.last_index
+        return self._number_of_rows - 1
 
     ##############################################
 
@@ -211,7 +616,7 @@ class QmlImageCollection(QAbstractListModel):
         # _ = len(self._images)
         # self._logger.info(f"= {_}")
         # return _
-        return len(self._images)
+        return self._number_of_rows
 
     # def at(self, index: int) -> QmlImage:
     #     return self._images[index]
@@ -234,7 +639,7 @@ class QmlImageCollection(QAbstractListModel):
         # if role == Qt.DisplayRole:
         _ = index.row()
         # self._logger.info(f"index {_} role {role}")
-        return self._images[_]
+        return self._image_at(_)
         # return None
 
     # @Slot(result=bool)
@@ -260,87 +665,196 @@ class QmlImageCollection(QAbstractListModel):
     ##############################################
 
 
+    def _apply_order(self) -> None:
+        # the permutation is cached by the collection, thus a sort is only a lookup
+        permutation = self._collection.permutation(self._sort_key, self._reverse)
+        if len(permutation) != self._number_of_rows:
+            # the collection is ahead of the model
+            permutation = permutation[permutation < self._number_of_indexes]
+        number_of_rows = self._number_of_rows
+        # Fixme: layoutChanged would keep the delegates, but the QML delegate model resets anyway
+        self.beginResetModel()
+        self._order = permutation
+        # the rows are the ones of the order
+        self._number_of_rows = len(permutation)
+        self.endResetModel()
+        if self._number_of_rows != number_of_rows:
+            self.number_of_images_changed.emit()
+            self.last_index_changed.emit()
+
+    display_size_changed = Signal()
+    device_pixel_ratio_changed = Signal()
+    thumbnail_size_changed = Signal()
+
+    @Property(int, notify=display_size_changed)
+    def display_size(self) -> int:
+        """Size of a thumbnail in the view, in logical pixels"""
+        return self._display_size
+
+    @display_size.setter
+    def display_size(self, value: int) -> None:
+        value = min(max(int(value), self.MIN_DISPLAY_SIZE), self.MAX_DISPLAY_SIZE)
+        if value != self._display_size:
+            self._display_size = value
+            self.display_size_changed.emit()
+            self._update_thumbnail_size()
+
+    @Property(float, notify=device_pixel_ratio_changed)
+    def device_pixel_ratio(self) -> float:
+        return self._device_pixel_ratio
+
+    @device_pixel_ratio.setter
+    def device_pixel_ratio(self, value: float) -> None:
+        if value > 0 and value != self._device_pixel_ratio:
+            self._device_pixel_ratio = float(value)
+            self.device_pixel_ratio_changed.emit()
+            self._update_thumbnail_size()
+
+    @property
+    def thumbnail_size(self) -> ThumbnailSize:
+        """Smallest thumbnail size covering the physical pixels of the view"""
+        return self._thumbnail_size
+
+    def _update_thumbnail_size(self) -> None:
+        size = thumbnail_cache.size_for_pixels(self._display_size * self._device_pixel_ratio)
+        if size != self._thumbnail_size:
+            self._logger.info(f"Thumbnail size {size.name}")
+            self._thumbnail_size = size
+            self.thumbnail_size_changed.emit()
+
+    @Slot(int, int)
+    def set_visible_range(self, first: int, last: int) -> None:
+        """Set the rows shown by the view, the thumbnails are made by priority"""
+        from .Application import Application
+        if (first, last) == self._visible_range:
+            return
+        if first != self._visible_range[0]:
+            self._scroll_direction = 1 if first > self._visible_range[0] else -1
+        self._visible_range = (first, last)
+        Application.instance.thumbnail_engine.reprioritize()
+
+    def thumbnail_priority(self, qml_image: QmlImage) -> Optional[int]:
+        """Return the priority of the thumbnail of *qml_image*, lower is more urgent
+
+        The visible rows come first, then the rows of the next pages in the scroll direction.  The
+        other rows are demoted by their distance to the view.  None cancels the request.
+
+        """
+        if self._closed:
+            return None
+        row = self._row_of(qml_image.image.index)
+        if row is None:
+            # removed
+            return None
+        first, last = self._visible_range
+        if last < first:
+            # unknown view
+            return row
+        if first <= row <= last:
+            return row - first
+        number_of_visible = last - first + 1
+        look_ahead = self.LOOK_AHEAD_PAGES * number_of_visible
+        if row > last:
+            distance = row - last
+            ahead = self._scroll_direction > 0
+        else:
+            distance = first - row
+            ahead = self._scroll_direction < 0
+        if ahead and distance <= look_ahead:
+            return number_of_visible + distance
+        return number_of_visible + look_ahead + distance
+
     @Slot(str)
     def sort(self, key: str) -> None:
         self._logger.info(f"Sort by {key}")
+        if key not in self._collection.SORT_KEYS:
+            self._logger.warning(f"Unknown sort key {key}")
+            return
+        self._sort_key = key
+        self._apply_order()
+
+    reverse_changed = Signal()
+
+    @Property(bool, notify=reverse_changed)
+    def reverse(self) -> bool:
+        return self._reverse
 
-        def _sort(func):
-            self.beginResetModel()
-            self._logger.info(f"sent beginResetModel")
-            self._images.sort(key=func)
-            self._logger.info(f"sorting done")
-            self.endResetModel()
-            self._logger.info(f"sent endResetModel")
-
-        match key:
-            case 'index':
-                _sort(lambda qml_image: qml_image.image.index)
-            case 'name':
-                _sort(lambda qml_image: qml_image.image.name)
-            case 'mtime':
-                _sort(lambda qml_image: qml_image.image.mtime)
+    @reverse.setter
+    def reverse(self, value: bool) -> None:
+        if value != self._reverse:
+            self._reverse = value
+            self._apply_order()
+            self.reverse_changed.emit()
 
     ##############################################
 
+    def _hash_thumbnail_filenames(self, images: list[Image]) -> None:
+        # hash the URIs in one pass, instead of one by one on the first display
+        if not images:
+            return
+        indexes = np.fromiter((image.index for image in images), dtype=np.int64, count=len(images))
+        capacity = len(self._thumbnail_digests)
+        length = int(indexes.max()) + 1
+        if length > capacity:
+            # grow like the metadata store
+            _ = np.zeros(max(length, 2 * capacity), dtype=self._thumbnail_digests.dtype)
+            _[:capacity] = self._thumbnail_digests
+            self._thumbnail_digests = _
+        self._thumbnail_digests[indexes] = Thumbnail.digest_paths(image.path_str for image in images)
+
+    def _thumbnail_filename(self, index: int) -> Optional[str]:
+        if index < len(self._thumbnail_digests):
+            digest = self._thumbnail_digests[index]
+            if digest:
+                return digest.decode('ascii') + Thumbnail.IMAGE_EXTENSION
+        return None
+
+    def thumbnail_of(self, image: Image) -> Thumbnail:
+        """Return the thumbnail of *image*, the source is not stat"""
+        return Thumbnail(
+            thumbnail_cache,
+            image.path_str,
+            size=image.size,
+            mtime_ns=image.mtime,
+            filename=self._thumbnail_filename(image.index),
+            # the path of the collection is resolved
+            resolve=False,
+        )
+
+    def _qml_image(self, index: int) -> QmlImage:
+        """Return the QmlImage for the image *index* of the collection"""
+        qml_image = self._qml_images.get(index)
+        if qml_image is None:
+            qml_image = QmlImage(self, self._collection[index])
+            self._qml_images[index] = qml_image
+        return qml_image
+
+    def _image_at(self, row: int) -> QmlImage:
+        if row < 0:
+            row += self._number_of_rows
+        if not 0 <= row < self._number_of_rows:
+            raise IndexError(f"row {row} out of range")
+        if self._order is None:
+            return self._qml_image(row)
+        return self._qml_image(int(self._order[row]))
+
     @Property(QmlImage)
     def first_image(self):
         try:
-            return self._images[0]
+            return self._image_at(0)
         except IndexError:
             return None
 
     @Property(QmlImage)
     def last_image(self):
         try:
-            return self._images[-1]
+            return self._image_at(-1)
         except IndexError:
             return None
 
     @Slot(int, result=QmlImage)
     def image(self, index):
         try:
-            return self._images[index]
+            return self._image_at(index)
         except IndexError:
             return None
-
-    ##############################################
-
-    # def start_watcher(self, watcher=None):
-    #     self._files = set(self._glob_files())
-    #     self._watcher = watcher or QFileSystemWatcher()
-    #     self._watcher.addPath(str(self._collection.path))
-    #     self._watcher.directory_changed.connect(self._on_directory_change)
-
-    ##############################################
-
-    # def _glob_files(self):
-    #     pattern = str(self._collection.path.joinpath('*' + self._collection.extension))
-    #     for path in glob.glob(pattern):
-    #         yield Path(path).name
-
-    ##############################################
-
-    # def _on_directory_change(self, path):
-    #     time.sleep(3)
-    #     # QTimer::singleShot(200, this, SLOT(updateCaption()));
-    #     files = set(self._glob_files())
-    #     new_files = files - self._files
-    #     self._logger.info('New files {}'.format(new_files))
-    #     # Fixme: overwrite
-    #     for filename in new_files:
-    #         self._on_new_file(filename)
-    #     self._files = files
-
-    ##############################################
-
-    # def _on_new_file(self, filename):
-    #     self._logger.info('New file {}'.format(filename))
-    #     # try:
-    #     image = self._collection.add_image(filename)
-    #     image._index = self._collection.number_of_images   # Fixme: !!!
-    #     self._logger.info('New image\n{}'.format(image))
-    #     self._images.append(QmlImage(self, image))
-    #     self.number_of_images_changed.emit()
-    #     self.new_image.emit(image.index)
-    #     # except Exception as exception:
-    #     #     self._logger.warning('Error on {}\n{}'.format(filename, exception))
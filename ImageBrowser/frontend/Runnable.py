@@ -16,6 +16,7 @@ __all__ = ['Worker']
 ####################################################################################################
 
 import logging
+import sys
 import traceback
 
 ####################################################################################################
@@ -57,7 +58,7 @@ class WorkerSignals(QObject):
 
     finished = Signal()
     error = Signal(tuple)
-    result = Signal(str) # Fixme: object
+    result = Signal(object)
     progress = Signal(int)
 
 ####################################################################################################
@@ -106,9 +107,8 @@ class Worker(QRunnable):
             )
         except:
             traceback.print_exc()
-            # exctype, value = sys.exc_info()[:2]
+            exctype, value = sys.exc_info()[:2]
             self._logger.info('emit error')
-            # Fixme:
             self._signals.error.emit((exctype, value, traceback.format_exc()))
         else:
             self._logger.info('emit result {}'.format(result))
@@ -0,0 +1,332 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to generate thumbnails in a pool of worker processes.
+
+Decoding and resampling an image in Python threads is serialised by the GIL, thus the thumbnails
+are generated in worker processes.  The workers are spawned, instead of forked, since the Qt
+application is multithreaded.
+
+A file which has a fail marker in the thumbnail cache is not submitted, it is retried only when it
+is modified.
+
+The thumbnails are written by the workers, thus the engine updates the names of the thumbnail
+files known by the cache of the application process.
+
+In cascade mode, a job makes the requested size and the smaller ones from one decode, thus a
+NORMAL thumbnail requested after a LARGE one is already in the cache.
+
+Only a few jobs per worker are submitted to the pool, the others wait in a priority queue.  A
+request can give a priority function, e.g. the distance of the image to the visible rows, which is
+evaluated again by :meth:`ThumbnailEngine.reprioritize` when the view is scrolled.  Thus the
+visible thumbnails are made first, and a queued job can be cancelled.
+
+"""
+
+####################################################################################################
+
+__all__ = ['ThumbnailEngine']
+
+####################################################################################################
+
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from typing import Callable, Optional
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+
+from PySide6.QtCore import QObject, Signal
+
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailCache, ThumbnailSize
+from ImageBrowser.backend.thumbnail.worker import init_worker, make_thumbnails
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+type ThumbnailKey = tuple[str, ThumbnailSize]
+type ThumbnailCallback = Callable[[str], None]
+# lower is more urgent, None cancels the job
+type ThumbnailPriority = Callable[[], Optional[float]]
+
+####################################################################################################
+
+class ThumbnailEngine(QObject):
+
+    """Class to generate thumbnails in a pool of worker processes.
+
+    A job is identified by (source path, size), a job already in flight is not submitted twice.
+    The callbacks and the signals are called in the thread of the engine, i.e. the GUI thread.
+
+    """
+
+    # number of jobs submitted to the pool per worker, the others are queued
+    SUBMITTED_PER_WORKER = 2
+
+    # source path, size, thumbnail path
+    thumbnail_ready = Signal(str, int, str)
+    # source path, size, error
+    thumbnail_failed = Signal(str, int, str)
+    number_of_jobs_changed = Signal(int)
+    queue_depth_changed = Signal(int)
+
+    # emitted by the executor thread, thus queued to the engine thread
+    _job_done = Signal(object, object, object, object)
+
+    _logger = _module_logger.getChild('ThumbnailEngine')
+
+    ##############################################
+
+    def __init__(self, max_workers: Optional[int] = None, cascade: bool = True, parent: QObject = None) -> None:
+        super().__init__(parent)
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._cascade = bool(cascade)
+        # started on demand, thus the workers are not spawned if the thumbnails are cached
+        self._executor = None
+        # key -> callbacks
+        self._jobs = {}
+        # queued jobs: requested key -> [priority function, priority, sequence, sizes]
+        self._queue = {}
+        # (priority, sequence, key), an entry is outdated if it doesn't match the queue
+        self._heap = []
+        self._sequence = itertools.count()
+        self._number_of_submitted = 0
+        self._job_done.connect(self._on_job_done)
+
+    ##############################################
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def cascade(self) -> bool:
+        return self._cascade
+
+    @property
+    def number_of_jobs(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting to be submitted to the pool"""
+        return len(self._queue)
+
+    @property
+    def number_of_submitted(self) -> int:
+        return self._number_of_submitted
+
+    ##############################################
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._logger.info(f"Start {self._max_workers} thumbnail workers")
+            cache = ThumbnailCache()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(cache.fsync, cache.use_shared, cache.write_shared),
+            )
+        return self._executor
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._logger.info("Shutdown thumbnail workers")
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        self._jobs.clear()
+        self._queue.clear()
+        self._heap.clear()
+        self._number_of_submitted = 0
+
+    ##############################################
+
+    def request(
+        self,
+        path: str,
+        size: ThumbnailSize,
+        callback: Optional[ThumbnailCallback] = None,
+        thumbnail: Optional[Thumbnail] = None,
+        priority: Optional[ThumbnailPriority] = None,
+    ) -> None:
+        """Request the thumbnail of *path*, *callback* is called with the thumbnail path
+
+        If the :class:`Thumbnail` of *path* is known, the source is not stat again.  The job is
+        queued by *priority*, then by request order.
+
+        """
+        if thumbnail is not None:
+            path = thumbnail.source_path
+        else:
+            path = Thumbnail.canonical_path(path)
+        key = (str(path), ThumbnailSize(size))
+        callbacks = self._jobs.get(key)
+        if callbacks is not None:
+            # in flight
+            if callback is not None:
+                callbacks.append(callback)
+            job = self._queue.get(key)
+            if job is not None and priority is not None:
+                # the last requester decides, e.g. a new delegate
+                job[0] = priority
+                if not self._push(key, job):
+                    # like reprioritize, the outdated heap entry is skipped
+                    self._drop(key[0], self._queue.pop(key)[3])
+                    self.queue_depth_changed.emit(len(self._queue))
+                    self.number_of_jobs_changed.emit(len(self._jobs))
+            return
+        path, size = key
+        try:
+            if thumbnail is None:
+                thumbnail = Thumbnail(ThumbnailCache(), path, resolve=False)
+            failed = thumbnail.has_failed()
+        except OSError as e:
+            # e.g. removed
+            failed = True
+            self._logger.warning(f"Cannot make thumbnail for {path}: {e}")
+        if failed:
+            self.thumbnail_failed.emit(path, int(size), 'failed')
+            return
+        if self._cascade:
+            # skip the sizes already in flight
+            keys = [(path, _) for _ in size.and_smaller() if (path, _) not in self._jobs]
+        else:
+            keys = [key]
+        for _ in keys:
+            self._jobs[_] = []
+        if callback is not None:
+            self._jobs[key].append(callback)
+        job = [priority, None, None, tuple(_[1] for _ in keys)]
+        self._queue[key] = job
+        self._push(key, job)
+        self._submit_queued()
+        self.number_of_jobs_changed.emit(len(self._jobs))
+
+    ##############################################
+
+    def _push(self, key: ThumbnailKey, job: list) -> bool:
+        """Evaluate the priority of *job* and push it in the heap, return False if it is cancelled"""
+        priority_func = job[0]
+        priority = 0 if priority_func is None else priority_func()
+        if priority is None:
+            return False
+        job[1] = priority
+        job[2] = next(self._sequence)
+        heapq.heappush(self._heap, (priority, job[2], key))
+        return True
+
+    def _submit_queued(self) -> None:
+        max_submitted = self._max_workers * self.SUBMITTED_PER_WORKER
+        while self._number_of_submitted < max_submitted and self._heap:
+            priority, sequence, key = heapq.heappop(self._heap)
+            job = self._queue.get(key)
+            if job is None or job[2] != sequence:
+                # outdated entry
+                continue
+            del self._queue[key]
+            path = key[0]
+            sizes = job[3]
+            future = self._get_executor().submit(make_thumbnails, path, sizes)
+            future.add_done_callback(lambda future, path=path, sizes=sizes: self._on_future_done(path, sizes, future))
+            self._number_of_submitted += 1
+        self.queue_depth_changed.emit(len(self._queue))
+
+    ##############################################
+
+    def cancel(self, path: str, size: ThumbnailSize) -> bool:
+        """Cancel a queued job, a submitted job cannot be cancelled
+
+        In cascade mode, the job is kept if a smaller size was requested by another requester, only
+        the callbacks of *size* are dropped.
+
+        """
+        key = (str(path), ThumbnailSize(size))
+        job = self._queue.get(key)
+        if job is None:
+            return False
+        path = key[0]
+        if any(self._jobs.get((path, _)) for _ in job[3] if _ != key[1]):
+            self._jobs[key].clear()
+            return True
+        del self._queue[key]
+        self._drop(path, job[3])
+        self.queue_depth_changed.emit(len(self._queue))
+        self.number_of_jobs_changed.emit(len(self._jobs))
+        return True
+
+    def _drop(self, path: str, sizes: tuple[ThumbnailSize, ...]) -> None:
+        # the callbacks are not called
+        for size in sizes:
+            self._jobs.pop((path, size), None)
+
+    def reprioritize(self) -> None:
+        """Evaluate the priorities of the queued jobs, e.g. when the visible rows changed"""
+        if not self._queue:
+            return
+        self._heap.clear()
+        cancelled = []
+        for key, job in self._queue.items():
+            if not self._push(key, job):
+                cancelled.append(key)
+        for key in cancelled:
+            self._drop(key[0], self._queue.pop(key)[3])
+        if cancelled:
+            self._logger.info(f"{len(cancelled)} thumbnail jobs cancelled")
+            self.number_of_jobs_changed.emit(len(self._jobs))
+        self.queue_depth_changed.emit(len(self._queue))
+
+    ##############################################
+
+    def _on_future_done(self, path: str, sizes: tuple[ThumbnailSize, ...], future: Future) -> None:
+        # called in the executor thread
+        try:
+            self._job_done.emit(path, sizes, future.result(), None)
+        except CancelledError:
+            self._job_done.emit(path, sizes, None, 'cancelled')
+        except Exception as e:
+            self._job_done.emit(path, sizes, None, f"{type(e).__name__}: {e}")
+
+    def _on_job_done(
+        self,
+        path: str,
+        sizes: tuple[ThumbnailSize, ...],
+        thumbnail_paths: Optional[dict[ThumbnailSize, str]],
+        error: Optional[str],
+    ) -> None:
+        if self._executor is None:
+            # shutdown
+            return
+        self._number_of_submitted -= 1
+        self._submit_queued()
+        cache = ThumbnailCache()
+        if error is not None:
+            self._logger.warning(f"Failed to make thumbnail for {path}: {error}")
+            # a fail marker can be written
+            cache.update_file(Thumbnail.mangle_path(path), ThumbnailSize.FAIL)
+        for size in sizes:
+            callbacks = self._jobs.pop((path, size), None)
+            if callbacks is None:
+                # shutdown
+                continue
+            if error is not None:
+                self.thumbnail_failed.emit(path, int(size), error)
+            else:
+                thumbnail_path = thumbnail_paths[size]
+                # in the cache or a shared repository
+                cache.add_thumbnail_path(thumbnail_path, size)
+                for callback in callbacks:
+                    try:
+                        callback(thumbnail_path)
+                    except Exception as e:
+                        # e.g. the receiver was deleted
+                        self._logger.warning(f"Thumbnail callback failed for {path}: {e}")
+                self.thumbnail_ready.emit(path, int(size), thumbnail_path)
+        self.number_of_jobs_changed.emit(len(self._jobs))
@@ -0,0 +1,169 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to run the garbage collection of the thumbnail cache at idle time.
+
+A batch of files is processed on each timeout when the application is idle, thus the I/O are
+throttled to a few hundred files per second and the generation of the thumbnails has priority.
+
+A batch is run in a worker thread, since a stat or the read of a thumbnail can block, e.g. a
+source on a hung network file system.  Only the timer and the state run in the GUI thread.  The
+thread is not the one of the application pool, thus a blocked batch doesn't block a scan.
+
+"""
+
+####################################################################################################
+
+__all__ = ['ThumbnailMaintenance']
+
+####################################################################################################
+
+from typing import Callable, Iterator, Optional
+import logging
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
+
+from ImageBrowser.backend.thumbnail.collector import CachePolicy, ThumbnailCollector
+from ImageBrowser.backend.thumbnail.FreeDesktop import ThumbnailCache, ThumbnailSize
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class _CollectorStepSignals(QObject):
+
+    """Class to define the signals of a :class:`_CollectorStep`.
+
+    done
+        the steps, `bool` True if the collection is finished
+
+    error
+        the steps, `str` error
+
+    """
+
+    done = Signal(object, bool)
+    error = Signal(object, str)
+
+####################################################################################################
+
+class _CollectorStep(QRunnable):
+
+    """Class to run a batch of a :class:`ThumbnailCollector` in a worker thread"""
+
+    ##############################################
+
+    def __init__(self, steps: Iterator[int], signals: _CollectorStepSignals) -> None:
+        super().__init__()
+        self._steps = steps
+        self._signals = signals
+
+    ##############################################
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            next(self._steps)
+        except StopIteration:
+            self._signals.done.emit(self._steps, True)
+        except Exception as e:
+            self._signals.error.emit(self._steps, str(e))
+        else:
+            self._signals.done.emit(self._steps, False)
+
+####################################################################################################
+
+class ThumbnailMaintenance(QObject):
+
+    """Class to run a :class:`ThumbnailCollector` batch by batch at idle time"""
+
+    # ms between two batches
+    INTERVAL = 100
+    # ms before the first batch, the startup is not slowed down
+    START_DELAY = 60_000
+
+    # scanned, removed, freed bytes
+    finished = Signal(int, int, int)
+
+    _logger = _module_logger.getChild('ThumbnailMaintenance')
+
+    ##############################################
+
+    def __init__(
+        self,
+        policies: dict[ThumbnailSize, CachePolicy],
+        is_busy: Optional[Callable[[], bool]] = None,
+        parent: QObject = None,
+    ) -> None:
+        super().__init__(parent)
+        self._policies = policies
+        self._is_busy = is_busy
+        # a batch at a time
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+        self._collector = None
+        self._steps = None
+        # a batch is running in the pool
+        self._step_running = False
+        # created in the GUI thread, thus the connections are queued
+        self._signals = _CollectorStepSignals(self)
+        self._signals.done.connect(self._on_step_done)
+        self._signals.error.connect(self._on_step_error)
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.INTERVAL)
+        self._timer.timeout.connect(self._step)
+
+    ##############################################
+
+    @property
+    def running(self) -> bool:
+        return self._steps is not None
+
+    def start(self, delay: Optional[int] = None) -> None:
+        if self.running:
+            return
+        self._collector = ThumbnailCollector(ThumbnailCache(), self._policies)
+        self._steps = self._collector.steps()
+        QTimer.singleShot(self.START_DELAY if delay is None else delay, self._timer.start)
+
+    def stop(self) -> None:
+        self._timer.stop()
+        if self._steps is not None and not self._step_running:
+            # close the directory
+            self._steps.close()
+        # else it is closed when the batch is done
+        self._steps = None
+
+    ##############################################
+
+    def _step(self) -> None:
+        if self._steps is None:
+            # stopped before the start delay
+            self._timer.stop()
+            return
+        if self._step_running or (self._is_busy is not None and self._is_busy()):
+            return
+        self._step_running = True
+        self._thread_pool.start(_CollectorStep(self._steps, self._signals))
+
+    def _on_step_done(self, steps: Iterator[int], finished: bool) -> None:
+        self._step_running = False
+        if steps is not self._steps:
+            # stopped during the batch
+            steps.close()
+        elif finished:
+            self.stop()
+            self.finished.emit(*self._collector.statistics)
+
+    def _on_step_error(self, steps: Iterator[int], error: str) -> None:
+        self._step_running = False
+        self._logger.warning(f"Thumbnail cache collection failed: {error}")
+        if steps is self._steps:
+            self.stop()
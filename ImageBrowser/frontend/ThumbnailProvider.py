@@ -0,0 +1,226 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Module to implement a QML image provider for the thumbnails.
+
+An :code:`Image { source: "image://thumbnail/large/<md5>.png?<version>" }` is loaded from an
+in-memory LRU of decoded images, thus a delegate which is recreated when the view is scrolled back
+does not read and decode the PNG again.  The version is the modification time of the source, thus
+the URL changes when the thumbnail is made again.
+
+A thumbnail of a shared repository is :code:`image://thumbnail/shared/<quoted absolute path>`.
+
+"""
+
+####################################################################################################
+
+__all__ = ['ThumbnailImageCache', 'ThumbnailProvider']
+
+####################################################################################################
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import logging
+import threading
+import urllib.parse
+
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QImage
+from PySide6.QtQuick import QQuickImageProvider
+from PySide6.QtQml import QQmlImageProviderBase
+
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailCache, ThumbnailSize
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class ThumbnailImageCache:
+
+    """Class to implement a LRU of decoded images limited by a number of bytes.
+
+    The cache is thread safe, the images are requested by the loader threads of the QML engine.
+
+    """
+
+    _logger = _module_logger.getChild('ThumbnailImageCache')
+
+    ##############################################
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = int(max_bytes)
+        self._number_of_bytes = 0
+        # key -> image, the last one is the most recently used
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    ##############################################
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    @property
+    def number_of_bytes(self) -> int:
+        return self._number_of_bytes
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int) -> None:
+        with self._lock:
+            self._max_bytes = int(value)
+            self._evict()
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    ##############################################
+
+    def get(self, key: str) -> Optional[QImage]:
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key: str, image: QImage) -> None:
+        size = image.sizeInBytes()
+        with self._lock:
+            old_image = self._images.pop(key, None)
+            if old_image is not None:
+                self._number_of_bytes -= old_image.sizeInBytes()
+            if size > self._max_bytes:
+                return
+            self._images[key] = image
+            self._number_of_bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._number_of_bytes > self._max_bytes and self._images:
+            _, image = self._images.popitem(last=False)
+            self._number_of_bytes -= image.sizeInBytes()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self._number_of_bytes = 0
+
+####################################################################################################
+
+class ThumbnailProvider(QQuickImageProvider):
+
+    """Class to provide the thumbnails of the cache to QML.
+
+    The id of an image is :code:`<size directory>/<thumbnail file name>?<version>` or
+    :code:`shared/<quoted path>?<version>`, see :meth:`url_for`.  A missing thumbnail is a null
+    image, thus the QML Image is in error.
+
+    """
+
+    NAME = 'thumbnail'
+    SHARED = 'shared'
+
+    _logger = _module_logger.getChild('ThumbnailProvider')
+
+    ##############################################
+
+    @classmethod
+    def url_for(cls, thumbnail: Thumbnail, size: ThumbnailSize) -> str:
+        """Return the URL of the thumbnail, or an empty string if it is not in the cache"""
+        path = thumbnail.cached_thumbnail_path(size)
+        if path is None:
+            return ''
+        if ThumbnailCache.is_shared_path(path):
+            id = f"{cls.SHARED}/{urllib.parse.quote(str(path), safe='', errors='surrogateescape')}"
+        else:
+            id = f"{ThumbnailCache.PATHS[size]}/{thumbnail.filename}"
+        return f"image://{cls.NAME}/{id}?{thumbnail.mtime_ns}"
+
+    ##############################################
+
+    def __init__(self, max_bytes: int) -> None:
+        # the images are loaded in a thread of the QML engine
+        # Note: QObject.setProperty doesn't release the GIL, thus Python code must not set the
+        #   source of a QML Image, it would deadlock with the loader thread
+        super().__init__(
+            QQmlImageProviderBase.ImageType.Image,
+            QQmlImageProviderBase.Flag.ForceAsynchronousImageLoading,
+        )
+        self._images = ThumbnailImageCache(max_bytes)
+        self._cache = ThumbnailCache()
+
+    ##############################################
+
+    @property
+    def images(self) -> ThumbnailImageCache:
+        return self._images
+
+    ##############################################
+
+    def _shared_path_for(self, id: str) -> Optional[str]:
+        path = Path(urllib.parse.unquote(id, errors='surrogateescape'))
+        # only the thumbnails of a shared repository can be read
+        if (
+            not path.is_absolute()
+            or '..' in path.parts
+            or not ThumbnailCache.is_shared_path(path)
+            or path.parent.name not in ThumbnailCache.PATHS
+            or not path.name.endswith(Thumbnail.IMAGE_EXTENSION)
+        ):
+            return None
+        return str(path)
+
+    def _path_for(self, id: str) -> Optional[str]:
+        directory, _, filename = id.partition('?')[0].partition('/')
+        if directory == self.SHARED:
+            return self._shared_path_for(filename)
+        try:
+            size = ThumbnailSize(ThumbnailCache.PATHS.index(directory))
+        except ValueError:
+            return None
+        # the id must not escape the thumbnail directory
+        if not filename.endswith(Thumbnail.IMAGE_EXTENSION) or '/' in filename or filename.startswith('.'):
+            return None
+        return str(self._cache.thumbnail_path_for(filename, size))
+
+    def requestImage(self, id: str, size: QSize, requested_size: QSize) -> QImage:
+        image = self._images.get(id)
+        if image is None:
+            path = self._path_for(id)
+            if path is None:
+                self._logger.warning(f"Invalid thumbnail id {id}")
+                return QImage()
+            image = QImage(path)
+            if image.isNull():
+                # the thumbnail must be made
+                return image
+            self._images.put(id, image)
+        size.setWidth(image.width())
+        size.setHeight(image.height())
+        # a larger thumbnail of the cache is downscaled to the source size of the QML Image
+        if (
+            requested_size.width() > 0 and requested_size.height() > 0
+            and (image.width() > requested_size.width() or image.height() > requested_size.height())
+        ):
+            image = image.scaled(requested_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return image
@@ -36,6 +36,7 @@ Item {
     // Fixme: export ids
     property alias reload_action: reload_action
     property alias sort_action_group: sort_action_group
+    property alias reverse_order_action: reverse_order_action
 
     property alias fit_to_screen_action: fit_to_screen_action
     property alias flip_action: flip_action
@@ -77,6 +78,14 @@ Item {
             onTriggered: application.collection.sort('name')
         }
 
+        Action {
+            id: sort_by_natural_name
+            checked: false
+            checkable: true
+            text: qsTr("Name (natural order)")
+            onTriggered: application.collection.sort('natural')
+        }
+
         Action {
             id: sort_by_modified_date
             checked: false
@@ -90,9 +99,18 @@ Item {
             checked: false
             checkable: true
             text: qsTr("Size")
+            onTriggered: application.collection.sort('size')
         }
     }
 
+    Action {
+        id: reverse_order_action
+        checked: false
+        checkable: true
+        text: qsTr("Reverse order")
+        onTriggered: application.collection.reverse = checked
+    }
+
     /******************************************************
      *
      * Image Viewer
@@ -68,6 +68,7 @@ ToolBar {
                         console.info('init sort menu', actions.sort_action_group)
                         var _ = actions.sort_action_group.actions
                         _.forEach(action => sort_menu.addAction(action))
+                        sort_menu.addAction(actions.reverse_order_action)
                         sort_menu.addAction(actions.reload_action)
                     }
                 }
@@ -93,12 +93,17 @@ Page {
                     }
                 }
 
+                function update_progress(number_of_entries, number_of_images) {
+                    info_bar_text.text = '%1 images (%2 entries scanned)'.arg(number_of_images).arg(number_of_entries)
+                }
+
                 Component.onCompleted: {
                     console.info('info_bar_text completed')
                     // var collection = application.collection
                     // collection.number_of_images_changed.connect(update_text)
                     // update_text()
                     application.collection_changed.connect(update_text)
+                    application.collection_progress.connect(update_progress)
                 }
             }
         }
@@ -65,6 +65,24 @@ Item {
         }
     }
 
+    // the thumbnail size is the smallest one covering the physical pixels of the view
+    Binding {
+        target: thumbnail_container.thumbnail_model
+        property: 'device_pixel_ratio'
+        value: Screen.devicePixelRatio
+        when: !!thumbnail_container.thumbnail_model
+    }
+
+    Shortcut {
+        sequence: StandardKey.ZoomIn
+        onActivated: thumbnail_model.display_size = Math.round(thumbnail_model.display_size * 1.25)
+    }
+
+    Shortcut {
+        sequence: StandardKey.ZoomOut
+        onActivated: thumbnail_model.display_size = Math.round(thumbnail_model.display_size / 1.25)
+    }
+
     Shortcut {
         id: shortcut2
         sequence: StandardKey.MoveToPreviousPage
@@ -90,6 +108,35 @@ Item {
         clip: true
 
         interactive: true
+
+        // Tell the model which rows are visible, thus the thumbnails are made by priority
+        function update_visible_range() {
+            var item = repeater.itemAt(0)
+            if (item === null)
+                return
+            var pitch = item.height + flow.spacing
+            var columns = Math.max(1, Math.floor((flow.width + flow.spacing) / (item.width + flow.spacing)))
+            var first = Math.floor(contentY / pitch) * columns
+            var last = Math.min(Math.ceil((contentY + height) / pitch) * columns, repeater.count) - 1
+            thumbnail_container.thumbnail_model.set_visible_range(first, last)
+        }
+
+        Timer {
+            // throttle the updates while scrolling
+            id: visible_range_timer
+            interval: 100
+            onTriggered: flickable.update_visible_range()
+        }
+
+        function schedule_visible_range() {
+            if (!visible_range_timer.running)
+                visible_range_timer.start()
+        }
+
+        onContentYChanged: schedule_visible_range()
+        onHeightChanged: schedule_visible_range()
+        onWidthChanged: schedule_visible_range()
+
         /*
         MouseArea
         {
@@ -133,7 +180,9 @@ Item {
             spacing: 30
 
             Repeater {
+                id: repeater
                 model: thumbnail_model
+                onCountChanged: flickable.schedule_visible_range()
 
                 Rectangle {
                     id: image_container
@@ -143,7 +192,7 @@ Item {
 
                     property bool selected: false
                     property int border_width: 5
-                    property int image_size: image.large_thumbnail_size
+                    property int image_size: thumbnail_container.thumbnail_model.display_size
                     property bool image_ready: thumbnail.status === Image.Ready
 
                     // width:  (image_ready ? thumbnail.sourceSize.width  : image_size) + 2*border_width
@@ -184,6 +233,12 @@ Item {
                         id: thumbnail
                         anchors.centerIn: parent
                         // visible: ! image.is_empty
+                        // the thumbnail can be larger than the view, e.g. a HiDPI screen
+                        width: Math.min(implicitWidth, image_size)
+                        height: Math.min(implicitHeight, image_size)
+                        fillMode: Image.PreserveAspectFit
+                        sourceSize.width: image_size * Screen.devicePixelRatio
+                        sourceSize.height: image_size * Screen.devicePixelRatio
 
                         // load images on the local filesystem in a separate thread
                         asynchronous: true
@@ -204,23 +259,71 @@ Item {
                             console.info(source, image_size)
                         }
 
+                        property bool requested: false
+
+                        function request_thumbnail() {
+                            if (!requested)
+                                image.thumbnail_ready.connect(on_thumbnail_ready)
+                            requested = true
+                            image.request_thumbnail()
+                        }
+
+                        function load_thumbnail() {
+                            // Set Image.source to the thumbnail in the image provider
+                            //   the decoded images are kept in memory
+                            source = image.thumbnail_url
+                            // empty if the thumbnail is not in the cache
+                            if (source == '')
+                                request_thumbnail()
+                            log_thumbnail_info()
+                        }
+
+                        Component.onDestruction: {
+                            if (requested)
+                                image.cancel_thumbnail()
+                        }
+
                         Component.onCompleted: {
                             // if (!image.is_empty)
-                            // Set Image.source to the thumbnail path
-                            source = image.large_thumbnail_path
-                            log_thumbnail_info()
+                            load_thumbnail()
+                        }
+
+                        function reload_thumbnail() {
+                            if (requested)
+                                image.cancel_thumbnail()
+                            load_thumbnail()
+                        }
+
+                        Connections {
+                            target: thumbnail_container.thumbnail_model
+                            function onThumbnail_size_changed() {
+                                thumbnail.reload_thumbnail()
+                            }
+                        }
+
+                        Connections {
+                            target: image
+                            // the image was modified, the thumbnail is made again
+                            function onThumbnail_changed() {
+                                thumbnail.reload_thumbnail()
+                            }
                         }
 
                         function on_thumbnail_ready() {
-                            source = image.large_thumbnail_path
+                            var url = image.thumbnail_url
+                            // empty if it is the request of a previous size
+                            if (!requested || url == '')
+                                return
+                            requested = false
+                            image.thumbnail_ready.disconnect(on_thumbnail_ready)
+                            source = url
                             log_thumbnail_info()
                         }
 
                         onStatusChanged: {
                             if (thumbnail.status == Image.Error) {
                                 source = ''
-                                image.request_large_thumbnail()
-                                image.thumbnail_ready.connect(on_thumbnail_ready)
+                                request_thumbnail()
                             }
                         }
                     }
@@ -121,23 +121,59 @@ Item {
                             console.info(source, image_size)
                         }
 
-                        Component.onCompleted: {
-                            // if (!image.is_empty)
+                        property bool requested: false
+
+                        function request_thumbnail() {
+                            if (!requested)
+                                image.thumbnail_ready.connect(on_thumbnail_ready)
+                            requested = true
+                            image.request_large_thumbnail()
+                        }
+
+                        function load_thumbnail() {
                             // Set Image.source to the thumbnail path
-                            source = image.large_thumbnail_path
+                            source = image.large_thumbnail_url
+                            // empty if the thumbnail is not in the cache
+                            if (source == '')
+                                request_thumbnail()
                             log_thumbnail_info()
                         }
 
+                        Component.onDestruction: {
+                            if (requested)
+                                image.cancel_large_thumbnail()
+                        }
+
+                        Component.onCompleted: {
+                            // if (!image.is_empty)
+                            load_thumbnail()
+                        }
+
                         function on_thumbnail_ready() {
-                            source = image.large_thumbnail_path
+                            var url = image.large_thumbnail_url
+                            // empty if it is the request of another size
+                            if (!requested || url == '')
+                                return
+                            requested = false
+                            image.thumbnail_ready.disconnect(on_thumbnail_ready)
+                            source = url
                             log_thumbnail_info()
                         }
 
+                        Connections {
+                            target: image
+                            // the image was modified, the thumbnail is made again
+                            function onLarge_thumbnail_path_changed() {
+                                if (thumbnail.requested)
+                                    image.cancel_large_thumbnail()
+                                thumbnail.load_thumbnail()
+                            }
+                        }
+
                         onStatusChanged: {
                             if (thumbnail.status == Image.Error) {
                                 source = ''
-                                image.request_large_thumbnail()
-                                image.thumbnail_ready.connect(on_thumbnail_ready)
+                                request_thumbnail()
                             }
                         }
                     }
@@ -0,0 +1,179 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Minimal Linux inotify interface using ctypes.
+
+The file descriptor is non-blocking, thus it can be polled by an event loop, e.g. using a
+QSocketNotifier, and :meth:`Inotify.read_events` returns the pending events without waiting.
+
+see INOTIFY(7)
+
+"""
+
+####################################################################################################
+
+__all__ = ['Inotify', 'InotifyEvent', 'InotifyMask']
+
+####################################################################################################
+
+from enum import IntFlag
+from pathlib import Path
+from typing import NamedTuple, Union
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+type PathOrStr = Union[Path, str]
+
+####################################################################################################
+
+class InotifyMask(IntFlag):
+    ACCESS = 0x00000001
+    MODIFY = 0x00000002
+    ATTRIB = 0x00000004
+    CLOSE_WRITE = 0x00000008
+    CLOSE_NOWRITE = 0x00000010
+    OPEN = 0x00000020
+    MOVED_FROM = 0x00000040
+    MOVED_TO = 0x00000080
+    CREATE = 0x00000100
+    DELETE = 0x00000200
+    DELETE_SELF = 0x00000400
+    MOVE_SELF = 0x00000800
+    # events sent by the kernel
+    UNMOUNT = 0x00002000
+    Q_OVERFLOW = 0x00004000
+    IGNORED = 0x00008000
+    # flags
+    ONLYDIR = 0x01000000
+    DONT_FOLLOW = 0x02000000
+    EXCL_UNLINK = 0x04000000
+    ISDIR = 0x40000000
+
+####################################################################################################
+
+class InotifyEvent(NamedTuple):
+
+    wd: int
+    mask: InotifyMask
+    cookie: int
+    name: str
+
+####################################################################################################
+
+class Inotify:
+
+    """Class to watch directories using inotify"""
+
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+
+    EVENT_HEADER = struct.Struct('iIII')   # wd, mask, cookie, len
+    READ_SIZE = 64 * 1024
+
+    _libc = None
+
+    _logger = _module_logger.getChild('Inotify')
+
+    ##############################################
+
+    @classmethod
+    def _load_libc(cls) -> ctypes.CDLL:
+        if cls._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            libc.inotify_init1.argtypes = (ctypes.c_int,)
+            libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+            libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+            cls._libc = libc
+        return cls._libc
+
+    ##############################################
+
+    def __init__(self) -> None:
+        self._libc = self._load_libc()
+        self._fd = self._check(self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC))
+        # wd -> path
+        self._watches = {}
+
+    ##############################################
+
+    @staticmethod
+    def _check(rc: int, path: PathOrStr = None) -> int:
+        if rc == -1:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), None if path is None else str(path))
+        return rc
+
+    ##############################################
+
+    def fileno(self) -> int:
+        return self._fd
+
+    @property
+    def closed(self) -> bool:
+        return self._fd == -1
+
+    def close(self) -> None:
+        if self._fd != -1:
+            os.close(self._fd)
+            self._fd = -1
+            self._watches.clear()
+
+    def __enter__(self) -> 'Inotify':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    ##############################################
+
+    def add_watch(self, path: PathOrStr, mask: InotifyMask) -> int:
+        wd = self._check(self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask), path)
+        self._watches[wd] = Path(path)
+        return wd
+
+    def remove_watch(self, wd: int) -> None:
+        if self._watches.pop(wd, None) is not None:
+            # fails if the watch was already removed by the kernel
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def path_of(self, wd: int) -> Path:
+        return self._watches.get(wd)
+
+    ##############################################
+
+    def read_events(self) -> list[InotifyEvent]:
+        """Return the pending events, an empty list if there is none"""
+        events = []
+        header = self.EVENT_HEADER
+        while True:
+            try:
+                data = os.read(self._fd, self.READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = header.unpack_from(data, offset)
+                offset += header.size
+                # the name is padded with null bytes
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                mask = InotifyMask(mask)
+                if mask & InotifyMask.IGNORED:
+                    self._watches.pop(wd, None)
+                events.append(InotifyEvent(wd, mask, cookie, os.fsdecode(name)))
+            if len(data) < self.READ_SIZE // 2:
+                # the queue is likely empty, avoid a last syscall
+                break
+        return events
@@ -25,7 +25,7 @@ see also https://psutil.readthedocs.io/en/latest/#psutil.disk_partitions
 
 ####################################################################################################
 
-__ALL__ = ['MountPoints', 'Device']
+__ALL__ = ['MountPoints', 'Device', 'file_system_type', 'is_network_file_system']
 
 ####################################################################################################
 
@@ -37,9 +37,10 @@ import collections
 import json
 import logging
 import os
+import re
 import subprocess
 
-from ImageBrowser.common.singleton import SingletonMetaClass
+from ImageBrowser.library.singleton import SingletonMetaClass
 
 ####################################################################################################
 
@@ -49,6 +50,52 @@ type PathStr = Union[Path, str]
 
 ####################################################################################################
 
+PROC_MOUNTS = '/proc/self/mounts'
+
+# file systems where inotify doesn't report the remote changes
+NETWORK_FILE_SYSTEM_TYPES = (
+    '9p',
+    'afs',
+    'ceph',
+    'cifs',
+    'fuse.sshfs',
+    'glusterfs',
+    'ncpfs',
+    'nfs',
+    'nfs4',
+    'smb3',
+    'smbfs',
+)
+
+####################################################################################################
+
+def _unescape_mount_field(field: str) -> str:
+    # space, tab, newline and backslash are octal escaped, e.g. \040
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), field)
+
+def file_system_type(path: PathStr) -> str:
+    """Return the type of the file system of *path*, from the nearest mount point"""
+    path = str(Path(path).resolve())
+    fs_type = None
+    mount_point_length = -1
+    with open(PROC_MOUNTS, encoding='utf8') as fh:
+        for line in fh:
+            _ = line.split()
+            mount_point = _unescape_mount_field(_[1])
+            if ((path == mount_point or path.startswith(mount_point.rstrip('/') + '/'))
+                and len(mount_point) > mount_point_length):
+                fs_type = _[2]
+                mount_point_length = len(mount_point)
+    return fs_type
+
+def is_network_file_system(path: PathStr) -> bool:
+    try:
+        return file_system_type(path) in NETWORK_FILE_SYSTEM_TYPES
+    except OSError:
+        return False
+
+####################################################################################################
+
 class LsblkInterface():
 
     _logger = _module_logger.getChild('LsblkInterface')
@@ -73,7 +73,13 @@ class File:
 
     ##############################################
 
-    def __init__(self, *path: list[PathStr], resolve: bool = True, strict: bool = False) -> None:
+    def __init__(
+        self,
+        *path: list[PathStr],
+        resolve: bool = True,
+        strict: bool = False,
+        stat: Optional[os.stat_result] = None,
+    ) -> None:
         # Fixme: typing
         _ = Path(*path)
         if resolve:
@@ -84,6 +90,9 @@ class File:
             _ = _.resolve(strict)
         self._path = _
         self.vacuum()
+        # A stat result already known by the caller, e.g. from os.DirEntry.stat(),
+        # saves a syscall
+        self._stat = stat
 
     ##############################################
 
@@ -6,14 +6,25 @@
 #
 ####################################################################################################
 
+__all__ = ['WalkerAbc', 'ParallelWalker']
+
+####################################################################################################
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import List, Union
+from typing import Any, Iterator, List, Optional, Union
+import fnmatch
+import logging
 import os
 
 type PathStr = Union[Path, str]
 
 ####################################################################################################
 
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
 class WalkerAbc:
 
     """Base class to implement a walk in a file hierarchy."""
@@ -40,22 +51,28 @@ class WalkerAbc:
             follow_links: bool = False,
             max_depth: int = -1,
             ) -> None:
+        """Walk the hierarchy, *max_depth* is the depth of the deepest directory to walk, 0 is the
+        root, -1 is unlimited.
+
+        """
         if max_depth >= 0:
+            # required to prune the subdirectories
             top_down = True
-            depth = 0
-        for dirpath, dirnames, filenames in self._path.walk(topdown=top_down, followlinks=follow_links):
+        for dirpath, dirnames, filenames in self._path.walk(top_down=top_down, follow_symlinks=follow_links):
             if top_down and sort:
                 self.sort_dirnames(dirnames)
+            if max_depth >= 0 and len(dirpath.relative_to(self._path).parts) >= max_depth:
+                # the subdirectories are reported, but not walked
+                subdirnames = list(dirnames)
+                dirnames.clear()
+            else:
+                subdirnames = dirnames
             if hasattr(self, 'on_directory'):
-                for directory in dirnames:
+                for directory in subdirnames:
                     self.on_directory(dirpath, directory)
             if hasattr(self, 'on_filename'):
                 for filename in filenames:
                     self.on_filename(dirpath, filename)
-            if max_depth >= 0:
-                depth += 1
-                if depth > max_depth:
-                    break
 
     ##############################################
 
@@ -71,3 +88,122 @@ class WalkerAbc:
 
     # def on_filename(self, dirpath: str, filename: str) -> None:
     #     raise NotImplementedError
+
+####################################################################################################
+
+class ParallelWalker(WalkerAbc):
+
+    """Class to walk a file hierarchy using a pool of threads.
+
+    Each directory is scanned by a worker using :meth:`scan_directory`, and its result is yielded
+    by :meth:`iter_directories` as soon as the directory is done, thus the order is not
+    deterministic.  Since os.scandir releases the GIL during the syscalls, the latency of a
+    network file system is overlapped.
+
+    """
+
+    IGNORED_PATTERNS = (
+        '.git',
+        '@eaDir',   # Synology thumbnails
+        '#recycle',
+        '$RECYCLE.BIN',
+        'lost+found',
+    )
+
+    MAX_WORKERS = 8
+
+    _logger = _module_logger.getChild('ParallelWalker')
+
+    ##############################################
+
+    def __init__(
+        self,
+        path: PathStr,
+        max_depth: int = -1,
+        ignored_patterns: Optional[tuple[str]] = None,
+        skip_hidden: bool = True,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """*max_depth* is the depth of the deepest directory to walk, 0 is the root, -1 is unlimited.
+        A directory matching a pattern of *ignored_patterns* is pruned, as well as a hidden one if
+        *skip_hidden* is set.
+
+        """
+        super().__init__(path)
+        self._max_depth = max_depth
+        if ignored_patterns is None:
+            ignored_patterns = self.IGNORED_PATTERNS
+        self._ignored_patterns = tuple(ignored_patterns)
+        self._skip_hidden = skip_hidden
+        self._max_workers = max_workers or self.MAX_WORKERS
+
+    ##############################################
+
+    def is_ignored(self, dirname: str) -> bool:
+        if self._skip_hidden and dirname.startswith('.'):
+            return True
+        return any(fnmatch.fnmatchcase(dirname, _) for _ in self._ignored_patterns)
+
+    ##############################################
+
+    def scan_directory(self, relative_path: str) -> tuple[list[str], Any]:
+        """Scan a directory in a worker thread and return the subdirectory names and a result.
+
+        The default implementation returns the filenames.
+
+        """
+        dirnames = []
+        filenames = []
+        with os.scandir(self._path.joinpath(relative_path)) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    dirnames.append(entry.name)
+                else:
+                    filenames.append(entry.name)
+        return dirnames, filenames
+
+    ##############################################
+
+    def _scan(self, relative_path: str, depth: int) -> tuple[str, int, list[str], Any]:
+        return relative_path, depth, *self.scan_directory(relative_path)
+
+    def iter_directories(self) -> Iterator[tuple[str, int, list[str], Any]]:
+        """Yield (relative path, depth, subdirectory names, result) for each directory.
+
+        The relative path of the root is ''.  The ignored subdirectories are removed from the names.
+
+        """
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            pending = {executor.submit(self._scan, '', 0)}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            relative_path, depth, dirnames, result = future.result()
+                        except OSError as e:
+                            # e.g. permission denied
+                            self._logger.warning(f"{e}")
+                            continue
+                        dirnames = [_ for _ in dirnames if not self.is_ignored(_)]
+                        if self._max_depth < 0 or depth < self._max_depth:
+                            for dirname in dirnames:
+                                _ = os.path.join(relative_path, dirname)
+                                pending.add(executor.submit(self._scan, _, depth + 1))
+                        yield relative_path, depth, dirnames, result
+            finally:
+                # the generator was closed
+                for future in pending:
+                    future.cancel()
+
+    ##############################################
+
+    def run(self) -> None:
+        for relative_path, depth, dirnames, filenames in self.iter_directories():
+            dirpath = self._path.joinpath(relative_path)
+            if hasattr(self, 'on_directory'):
+                for directory in dirnames:
+                    self.on_directory(dirpath, directory)
+            if hasattr(self, 'on_filename'):
+                for filename in filenames:
+                    self.on_filename(dirpath, filename)
@@ -6,20 +6,115 @@
 #
 ####################################################################################################
 
-__all__ = ['usorted']
+"""Module to sort strings using ICU collations.
+
+A collation sort key is a bytes object, such that comparing the sort keys is equivalent to
+compare the strings using the collation.  Thus the sort keys can be computed once and then sorted
+without any ICU call.
+
+The locale is taken from the environment (LC_ALL, LC_COLLATE, LANG) unless it is set using
+:func:`set_default_locale`.
+
+"""
+
+####################################################################################################
+
+__all__ = ['Collation', 'collation', 'default_locale', 'set_default_locale', 'usorted']
 
 ####################################################################################################
 
+from typing import Iterable, Optional
+import functools
+import os
+
 # To sort correctly latin and unicode
-from icu import Collator, Locale
+from icu import Collator, Locale, UCollAttribute, UCollAttributeValue
+
+####################################################################################################
+
+_default_locale = None
+
+def default_locale() -> str:
+    if _default_locale is not None:
+        return _default_locale
+    for name in ('LC_ALL', 'LC_COLLATE', 'LANG'):
+        _ = os.environ.get(name)
+        if _ and _ not in ('C', 'POSIX'):
+            # e.g. fr_FR.UTF-8
+            return _.split('.')[0].split('@')[0]
+    _ = Locale.getDefault().getName()
+    if 'POSIX' in _:
+        # en_US_POSIX sorts like C, use the CLDR root collation
+        return 'root'
+    return _
+
+def set_default_locale(locale: Optional[str]) -> None:
+    """Set the locale of the collations, None is the locale of the environment"""
+    global _default_locale
+    _default_locale = locale or None
+
+####################################################################################################
+
+class Collation:
+
+    """Class to compare strings using an ICU collator.
+
+    If *numeric* is set, the sequences of digits are compared by their numeric value, thus
+    "IMG_2" is before "IMG_10".
+
+    """
+
+    ##############################################
+
+    def __init__(self, locale: str, numeric: bool = False) -> None:
+        self._locale = str(locale)
+        self._numeric = bool(numeric)
+        self._collator = Collator.createInstance(Locale(self._locale))
+        if self._numeric:
+            self._collator.setAttribute(UCollAttribute.NUMERIC_COLLATION, UCollAttributeValue.ON)
+
+    ##############################################
+
+    def __repr__(self) -> str:
+        return f"Collation {self._locale}{' numeric' if self._numeric else ''}"
+
+    @property
+    def locale(self) -> str:
+        return self._locale
+
+    @property
+    def numeric(self) -> bool:
+        return self._numeric
+
+    ##############################################
+
+    def sort_key(self, string: str) -> bytes:
+        return self._collator.getSortKey(string)
+
+    def sort_keys(self, strings: Iterable[str]) -> list[bytes]:
+        get_sort_key = self._collator.getSortKey
+        return [get_sort_key(_) for _ in strings]
+
+    ##############################################
+
+    def sorted(self, iter: Iterable, key: str = None) -> list:
+        # sorted calls the key function once per element
+        if key is not None:
+            return sorted(iter, key=lambda _: self.sort_key(getattr(_, key)))
+        else:
+            return sorted(iter, key=self.sort_key)
+
+####################################################################################################
+
+@functools.cache
+def _collation(locale: str, numeric: bool) -> Collation:
+    return Collation(locale, numeric)
 
-# Fixme:
-collator = Collator.createInstance(Locale('fr_FR'))
+def collation(locale: Optional[str] = None, numeric: bool = False) -> Collation:
+    """Return the collation for *locale*, the default locale if None"""
+    return _collation(locale or default_locale(), bool(numeric))
 
 ####################################################################################################
 
-def usorted(iter: list, key: str = None) -> list:
-    if key is not None:
-        return sorted(iter, key=lambda _: collator.getSortKey(getattr(_, key)))
-    else:
-        return sorted(iter, key=collator.getSortKey)
+def usorted(iter: list, key: str = None, locale: Optional[str] = None, numeric: bool = False) -> list:
+    return collation(locale, numeric).sorted(iter, key)
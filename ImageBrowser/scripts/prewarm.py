@@ -0,0 +1,241 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Command to fill the thumbnail cache for the images of a tree, without a GUI.
+
+The thumbnails are made by a pool of worker processes.  An image which has valid thumbnails, or a
+fail marker, is skipped, thus an interrupted run is resumed by running it again: the thumbnails
+are written atomically, a killed worker doesn't leave a truncated file.
+
+"""
+
+####################################################################################################
+
+__ALL__ = ['main']
+
+####################################################################################################
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+import argparse
+import logging
+import os
+import sys
+import time
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import ImageCollection
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailCache, ThumbnailSize
+from ImageBrowser.backend.thumbnail.worker import init_worker, make_thumbnails
+from ImageBrowser.library.args import PathAction
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+SIZES = {
+    name: ThumbnailSize(size)
+    for size, name in enumerate(ThumbnailCache.PATHS)
+    if size != ThumbnailSize.FAIL
+}
+
+####################################################################################################
+
+def iter_images(path: Path) -> Iterator[os.DirEntry]:
+    """Yield the images of the tree *path*, the hidden and linked directories are skipped"""
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda _: _.name)
+    except OSError as e:
+        _module_logger.warning(f"Cannot scan {path}: {e}")
+        return
+    for _ in entries:
+        if _.name.startswith('.'):
+            continue
+        if _.is_dir(follow_symlinks=False):
+            yield from iter_images(_.path)
+        elif os.path.splitext(_.name)[1].lower() in ImageCollection.EXTENSIONS and _.is_file():
+            yield _
+
+####################################################################################################
+
+class Prewarm:
+
+    # number of jobs submitted per worker
+    SUBMITTED_PER_WORKER = 4
+
+    _logger = _module_logger.getChild('Prewarm')
+
+    ##############################################
+
+    def __init__(
+        self,
+        sizes: tuple[ThumbnailSize, ...],
+        jobs: int,
+        report_interval: float,
+        fsync: bool = False,
+        write_shared: bool = False,
+    ) -> None:
+        self._cache = ThumbnailCache()
+        self._cache.write_shared = write_shared
+        # the largest first, the others are made from the same decode
+        self._sizes = tuple(sorted(set(sizes), reverse=True))
+        self._jobs = jobs
+        self._fsync = fsync
+        self._report_interval = report_interval
+        self._found = 0
+        self._skipped = 0
+        self._made = 0
+        self._failed = 0
+        # source bytes of the images thumbnailed, and of the failures
+        self._bytes = 0
+        self._failed_bytes = 0
+        self._start = None
+        self._last_report = None
+
+    ##############################################
+
+    def _missing_sizes(self, thumbnail: Thumbnail) -> tuple[ThumbnailSize, ...]:
+        if thumbnail.has_failed():
+            return ()
+        return tuple(_ for _ in self._sizes if thumbnail.find_thumbnail(_) is None)
+
+    def _iter_jobs(self, paths: list[Path]) -> Iterator[tuple[str, tuple[ThumbnailSize, ...], int]]:
+        for path in paths:
+            for entry in iter_images(path):
+                self._found += 1
+                try:
+                    stat = entry.stat()
+                    thumbnail = Thumbnail(
+                        self._cache, entry.path,
+                        size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                    )
+                    sizes = self._missing_sizes(thumbnail)
+                except OSError as e:
+                    self._logger.warning(f"Cannot read {entry.path}: {e}")
+                    continue
+                if sizes:
+                    yield str(thumbnail.source_path), sizes, stat.st_size
+                else:
+                    self._skipped += 1
+
+    ##############################################
+
+    def run(self, paths: list[Path]) -> int:
+        self._start = self._last_report = time.monotonic()
+        max_submitted = self._jobs * self.SUBMITTED_PER_WORKER
+        # future -> source path, source size
+        futures = {}
+        jobs = self._iter_jobs(paths)
+        executor = ProcessPoolExecutor(
+            max_workers=self._jobs,
+            initializer=init_worker,
+            initargs=(self._fsync, self._cache.use_shared, self._cache.write_shared),
+        )
+        try:
+            while True:
+                for path, sizes, size in jobs:
+                    futures[executor.submit(make_thumbnails, path, sizes)] = (path, size)
+                    if len(futures) >= max_submitted:
+                        break
+                if not futures:
+                    break
+                done, _ = wait(futures, timeout=self._report_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, size = futures.pop(future)
+                    try:
+                        future.result()
+                        self._made += 1
+                        self._bytes += size
+                    except Exception as e:
+                        # a fail marker is written for a decode error
+                        self._failed += 1
+                        self._failed_bytes += size
+                        self._logger.warning(f"Failed to make thumbnail for {path}: {e}")
+                self._report()
+        except KeyboardInterrupt:
+            print('Interrupted, run again to resume', file=sys.stderr)
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._report(final=True)
+            return 130
+        executor.shutdown(wait=True)
+        self._report(final=True)
+        return 1 if self._failed else 0
+
+    ##############################################
+
+    def _report(self, final: bool = False) -> None:
+        now = time.monotonic()
+        if not final and now - self._last_report < self._report_interval:
+            return
+        self._last_report = now
+        dt = max(now - self._start, 1e-9)
+        print(
+            f"{dt:7.1f} s  "
+            f"{self._found} found  {self._skipped} skipped  {self._made} made  "
+            f"{self._failed} failed ({self._failed_bytes / 2**20:.1f} MB)  "
+            f"{self._made / dt:6.1f} images/s  {self._bytes / 2**20 / dt:6.1f} MB/s",
+            flush=True,
+        )
+
+####################################################################################################
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Fill the thumbnail cache for the images of a tree',
+    )
+    parser.add_argument(
+        'paths', metavar='PATH',
+        nargs='+',
+        action=PathAction,
+        help='root of the tree',
+    )
+    parser.add_argument(
+        '--size',
+        choices=SIZES.keys(),
+        action='append',
+        help='thumbnail size, can be repeated (default: normal and large)',
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='number of worker processes (default: number of cores)',
+    )
+    parser.add_argument(
+        '--fsync',
+        action='store_true',
+        default=False,
+        help='flush the thumbnails to the disk, slower but safe on a power loss',
+    )
+    parser.add_argument(
+        '--write-shared',
+        action='store_true',
+        default=False,
+        help='write the thumbnails to the shared repository .sh_thumbnails next to the images, if writable',
+    )
+    parser.add_argument(
+        '--report-interval',
+        type=float,
+        default=5,
+        help='seconds between two reports',
+    )
+    parser.add_argument(
+        '--logging-level',
+        default='WARNING',
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=args.logging_level,
+    )
+
+    sizes = tuple(SIZES[_] for _ in (args.size or ('normal', 'large')))
+    prewarm = Prewarm(sizes, max(args.jobs, 1), args.report_interval, args.fsync, args.write_shared)
+    sys.exit(prewarm.run(args.paths))
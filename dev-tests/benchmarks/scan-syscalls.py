@@ -0,0 +1,224 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Benchmark to count the syscalls per entry done by a directory scan.
+
+Usage::
+
+    python dev-tests/benchmarks/scan-syscalls.py [--number-of-files 10000] [PATH]
+
+When *PATH* is not given, a temporary directory is filled with fake images.
+
+If strace is available, the scan is run in a subprocess traced by ``strace -c`` and the real
+syscalls are counted, else the stat calls are counted at the Python level by wrapping :mod:`os`.
+
+"""
+
+####################################################################################################
+
+from pathlib import Path
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from ImageBrowser.library.timer import Timer
+
+####################################################################################################
+
+STAT_SYSCALLS = (
+    'stat', 'lstat', 'fstat', 'newfstatat', 'fstatat64', 'statx',
+    'readlink', 'getdents64', 'getdents', 'openat',
+)
+
+####################################################################################################
+
+def make_fake_directory(path: Path, number_of_files: int) -> None:
+    for i in range(number_of_files):
+        path.joinpath(f'IMG_{i:06}.jpg').write_bytes(b'')
+    # some noise
+    for i in range(number_of_files // 100 + 1):
+        path.joinpath(f'note_{i}.txt').write_bytes(b'')
+        path.joinpath(f'subdirectory_{i}').mkdir()
+
+####################################################################################################
+
+def scan_legacy(path: Path) -> int:
+    """Emulate the former Path.iterdir() based scan"""
+    from ImageBrowser.library.path.file import File
+    EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.tiff')
+    images = []
+    for name in path.iterdir():
+        _ = path.joinpath(name)
+        if _.is_file() and _.suffix in EXTENSIONS:
+            image = File(_)
+            image.mtime
+            images.append(image)
+        elif _.is_dir():
+            pass
+    return len(images)
+
+def scan(path: Path) -> int:
+    from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection
+    collection = DirectoryCollection(path)
+    # sort by mtime must not trigger any stat
+    for image in collection:
+        image.mtime
+    return len(collection)
+
+SCANNERS = {
+    'legacy': scan_legacy,
+    'scandir': scan,
+}
+
+####################################################################################################
+
+class PyStatCounter:
+
+    """Count stat calls at the Python level"""
+
+    ##############################################
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._saved = {}
+
+    ##############################################
+
+    def _wrap(self, name: str):
+        func = getattr(os, name)
+        self._saved[name] = func
+        def wrapper(*args, **kwargs):
+            self.count += 1
+            return func(*args, **kwargs)
+        setattr(os, name, wrapper)
+
+    ##############################################
+
+    def _wrap_scandir(self) -> None:
+        scandir = os.scandir
+        self._saved['scandir'] = scandir
+        counter = self
+
+        class Entry:
+            def __init__(self, entry):
+                self._entry = entry
+                self._stat = {}
+            def __getattr__(self, name):
+                return getattr(self._entry, name)
+            def __fspath__(self):
+                return self._entry.path
+            def stat(self, *, follow_symlinks=True):
+                if follow_symlinks not in self._stat:
+                    counter.count += 1
+                    self._stat[follow_symlinks] = self._entry.stat(follow_symlinks=follow_symlinks)
+                return self._stat[follow_symlinks]
+
+        class Iterator:
+            def __init__(self, *args):
+                self._it = scandir(*args)
+            def __enter__(self):
+                return self
+            def __exit__(self, *args):
+                self._it.close()
+            def __iter__(self):
+                for _ in self._it:
+                    yield Entry(_)
+
+        os.scandir = Iterator
+
+    ##############################################
+
+    def __enter__(self) -> 'PyStatCounter':
+        for name in ('stat', 'lstat', 'readlink'):
+            self._wrap(name)
+        self._wrap_scandir()
+        return self
+
+    def __exit__(self, *args) -> None:
+        for name, func in self._saved.items():
+            setattr(os, name, func)
+
+####################################################################################################
+
+def run_child(scanner: str, path: str) -> None:
+    number_of_images = SCANNERS[scanner](Path(path))
+    print(number_of_images)
+
+def run_strace(scanner: str, path: Path, number_of_entries: int) -> None:
+    # The import overhead is measured using a scan of an empty directory
+    def trace(path):
+        with tempfile.NamedTemporaryFile('r', suffix='.strace') as fh:
+            command = (
+                'strace', '-f', '-c', '-U', 'name,calls', '-o', fh.name,
+                sys.executable, __file__, '--child', scanner, str(path),
+            )
+            subprocess.run(command, check=True, capture_output=True)
+            calls = {}
+            for line in fh:
+                parts = line.split()
+                if len(parts) == 2 and parts[1].isdigit():
+                    calls[parts[0]] = int(parts[1])
+            return calls
+    with tempfile.TemporaryDirectory() as empty_path:
+        reference = trace(empty_path)
+    calls = trace(path)
+    total = 0
+    for name in STAT_SYSCALLS:
+        _ = calls.get(name, 0) - reference.get(name, 0)
+        if _ > 0:
+            print(f"  {name:12} {_:8}")
+            total += _
+    print(f"  {total / number_of_entries:.2f} syscalls per entry")
+
+def run_python(scanner: str, path: Path, number_of_entries: int) -> None:
+    # warm-up imports
+    SCANNERS[scanner](Path(tempfile.gettempdir()))
+    timer = Timer('scan')
+    with PyStatCounter() as counter:
+        SCANNERS[scanner](path)
+    timer.stop()
+    print(f"  {counter.count / number_of_entries:.2f} stat per entry (Python level), {timer.delta_ms:.1f} ms")
+
+####################################################################################################
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Count syscalls per entry for a directory scan')
+    parser.add_argument('path', nargs='?', default=None)
+    parser.add_argument('--number-of-files', type=int, default=10_000)
+    parser.add_argument('--child', default=None)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_path:
+        if args.path is None:
+            path = Path(tmp_path)
+            make_fake_directory(path, args.number_of_files)
+        else:
+            path = Path(args.path).resolve()
+        number_of_entries = sum(1 for _ in os.scandir(path)) or 1
+        print(f"Scan {path} with {number_of_entries} entries")
+        use_strace = shutil.which('strace') is not None
+        if not use_strace:
+            print("strace not found, fallback to Python level counting")
+        for scanner in SCANNERS:
+            print(f"{scanner}:")
+            if use_strace:
+                run_strace(scanner, path, number_of_entries)
+            else:
+                run_python(scanner, path, number_of_entries)
+
+####################################################################################################
+
+if __name__ == '__main__':
+    main()
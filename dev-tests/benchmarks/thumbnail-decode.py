@@ -0,0 +1,145 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Benchmark to compare the decoding strategies used to make a thumbnail.
+
+Usage::
+
+    python dev-tests/benchmarks/thumbnail-decode.py [--size 256] [--repeat 5] [PATH ...]
+
+When no *PATH* is given, a 24 MP camera like JPEG is generated in a temporary directory.
+
+The peak memory is the increase of the peak resident set size (VmHWM) of a child process which
+makes a single thumbnail.  Note: ru_maxrss cannot be used since Linux keeps it across execve, thus
+a child inherits the peak of the benchmark process.
+
+"""
+
+####################################################################################################
+
+from pathlib import Path
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+
+from PIL import Image
+
+from ImageBrowser.library.timer import Timer
+
+####################################################################################################
+
+def make_camera_jpeg(path: Path) -> None:
+    # a gradient with noise, to have a realistic entropy
+    import numpy as np
+    width, height = 6000, 4000
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = np.random.default_rng(0).normal(0, 20, (height, width, 3)).astype(np.float32)
+    data = np.dstack((x + 0*y, y + 0*x, (x + y) / 2)) + noise
+    Image.fromarray(np.clip(data, 0, 255).astype(np.uint8)).save(path, quality=92)
+
+####################################################################################################
+
+def full_decode(path: Path, size: int) -> Image.Image:
+    """Decode all the pixels, then resample"""
+    image = Image.open(path)
+    image.load()
+    image.thumbnail((size, size), resample=Image.Resampling.LANCZOS, reducing_gap=None)
+    return image
+
+def pillow_thumbnail(path: Path, size: int) -> Image.Image:
+    """Pillow default, drafts at twice the size"""
+    image = Image.open(path)
+    image.thumbnail((size, size), resample=Image.Resampling.LANCZOS)
+    return image
+
+def draft_decode(path: Path, size: int) -> Image.Image:
+    """ImageBrowser thumbnailer"""
+    from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail
+    thumbnail = Thumbnail.__new__(Thumbnail)
+    thumbnail._source_path = path
+    return thumbnail._decode(size)
+
+METHODS = {
+    'full': full_decode,
+    'pillow': pillow_thumbnail,
+    'draft': draft_decode,
+}
+
+####################################################################################################
+
+def max_rss_kb() -> int:
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_child(method: str, path: str, size: int) -> None:
+    # import and warm-up on a small image
+    with tempfile.TemporaryDirectory() as tmp_path:
+        _ = Path(tmp_path).joinpath('small.jpg')
+        Image.new('RGB', (64, 64)).save(_)
+        METHODS[method](_, size)
+    before = max_rss_kb()
+    METHODS[method](Path(path), size)
+    print(max_rss_kb() - before)
+
+def peak_memory_mb(method: str, path: Path, size: int) -> float:
+    command = (sys.executable, __file__, '--child', method, '--size', str(size), str(path))
+    process = subprocess.run(command, check=True, capture_output=True, text=True)
+    return int(process.stdout.split()[-1]) / 1024
+
+def benchmark(path: Path, size: int, repeat: int) -> None:
+    with Image.open(path) as image:
+        print(f"{path.name}  {image.format} {image.size[0]}x{image.size[1]}  ->  {size} px")
+    reference = None
+    for method, func in METHODS.items():
+        func(path, size)
+        timer = Timer(method)
+        for _ in range(repeat):
+            image = func(path, size)
+        timer.stop()
+        dt = timer.delta_ms / repeat
+        if reference is None:
+            reference = dt
+        memory = peak_memory_mb(method, path, size)
+        print(f"  {method:8} {dt:8.1f} ms  x{reference / dt:4.1f}  peak {memory:6.1f} MB  {image.size}")
+
+####################################################################################################
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare thumbnail decoding strategies')
+    parser.add_argument('paths', metavar='PATH', nargs='*')
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', default=None)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.paths[0], args.size)
+        return
+
+    if args.paths:
+        for path in args.paths:
+            benchmark(Path(path), args.size, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_path:
+            path = Path(tmp_path).joinpath('camera.jpg')
+            make_camera_jpeg(path)
+            benchmark(path, args.size, args.repeat)
+
+####################################################################################################
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+"""Fixtures of the unit tests, the caches are singletons made in temporary directories."""
+
+####################################################################################################
+
+from pathlib import Path
+import os
+import time
+
+from PIL import Image
+import pytest
+
+from ImageBrowser.backend.ImageCollection.ScanIndex import ScanIndex
+from ImageBrowser.backend.thumbnail.FreeDesktop import ThumbnailCache
+
+####################################################################################################
+
+def make_image(path: Path, size: tuple[int, int] = (320, 240), color: str = 'red') -> Path:
+    """Write a JPEG image with an old mtime, thus its directory is not racy"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', size, color).save(path, 'JPEG')
+    set_mtime(path, time.time() - 3600)
+    return path
+
+def set_mtime(path: Path, mtime: float) -> None:
+    mtime_ns = int(mtime * 1_000_000_000)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+####################################################################################################
+
+@pytest.fixture
+def thumbnail_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    ThumbnailCache._instance = None
+    yield ThumbnailCache()
+    ThumbnailCache._instance = None
+
+@pytest.fixture
+def scan_index(tmp_path):
+    ScanIndex._instance = None
+    yield ScanIndex(tmp_path / 'scan-index.sqlite')
+    ScanIndex._instance = None
@@ -0,0 +1,65 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2025 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import pytest
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import ImageCollection
+from ImageBrowser.library.unicode import collation, set_default_locale, usorted
+
+####################################################################################################
+
+NAMES = ['IMG_10.jpg', 'b.jpg', 'IMG_2.jpg', 'été.jpg', 'Eta.jpg', 'f.jpg', 'IMG_1.jpg']
+
+@pytest.fixture(autouse=True)
+def locale():
+    set_default_locale('en')
+    yield
+    set_default_locale(None)
+
+def _collection(names: list[str]) -> ImageCollection:
+    collection = ImageCollection()
+    for name in names:
+        collection._append(name, 0, 0, 0, 0)
+    return collection
+
+def _names(collection, permutation):
+    return [collection.name_of(_) for _ in permutation]
+
+####################################################################################################
+
+def test_collation():
+    assert usorted(NAMES) == ['b.jpg', 'Eta.jpg', 'été.jpg', 'f.jpg', 'IMG_1.jpg', 'IMG_10.jpg', 'IMG_2.jpg']
+    assert usorted(NAMES, numeric=True)[-3:] == ['IMG_1.jpg', 'IMG_2.jpg', 'IMG_10.jpg']
+    assert collation() is collation('en')
+    assert collation(numeric=True) is not collation()
+
+def test_permutation():
+    collection = _collection(NAMES)
+    assert _names(collection, collection.permutation('name')) == usorted(NAMES)
+    assert _names(collection, collection.permutation('natural')) == usorted(NAMES, numeric=True)
+    assert _names(collection, collection.permutation('bytes')) == sorted(NAMES)
+    assert _names(collection, collection.permutation('natural', reverse=True)) == \
+        usorted(NAMES, numeric=True)[::-1]
+
+def test_sort_keys_are_incremental():
+    collection = _collection(NAMES[:3])
+    _collation = collation()
+    sort_keys = collection.sort_keys(_collation)
+    assert len(sort_keys) == 3
+    collection._append('a.jpg', 0, 0, 0, 0)
+    sort_keys = collection.sort_keys(_collation)
+    # the trailing null byte of a sort key is dropped by NumPy
+    assert list(sort_keys) == [_.rstrip(b'\0') for _ in _collation.sort_keys(NAMES[:3] + ['a.jpg'])]
+    # a removed image is not sorted
+    collection._remove(0)
+    assert _names(collection, collection.permutation('name')) == ['a.jpg', 'b.jpg', 'IMG_2.jpg']
+
+def test_equal_sort_keys_are_stable():
+    # the order of the indexes is kept
+    collection = _collection(['a.jpg', 'A.jpg', 'a.jpg'])
+    assert list(collection.permutation('name')) == [0, 2, 1]
@@ -0,0 +1,104 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import os
+import time
+
+from PIL import Image, PngImagePlugin
+import pytest
+
+from ImageBrowser.backend.thumbnail.collector import CachePolicy, ThumbnailCollector
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailSize
+
+from conftest import make_image, set_mtime
+
+NORMAL = ThumbnailSize.NORMAL
+DAY = 24 * 3600
+
+####################################################################################################
+
+def _thumbnail(thumbnail_cache, path, age: float = 0) -> Thumbnail:
+    """Make a thumbnail last accessed *age* seconds ago"""
+    thumbnail = Thumbnail(thumbnail_cache, path)
+    thumbnail_path = thumbnail.thumbnail(NORMAL)
+    last_access = time.time() - age
+    os.utime(thumbnail_path, (last_access, last_access))
+    return thumbnail
+
+def _foreign_thumbnail(thumbnail_cache, path, age: float = 0) -> Thumbnail:
+    """Write a thumbnail like another application, e.g. a file manager"""
+    thumbnail = Thumbnail(thumbnail_cache, path)
+    png_info = PngImagePlugin.PngInfo()
+    png_info.add_text('Thumb::URI', thumbnail.uri)
+    png_info.add_text('Thumb::MTime', str(thumbnail.mtime))
+    png_info.add_text('Software', 'GNOME::ThumbnailFactory')
+    thumbnail_path = thumbnail.thumbnail_path(NORMAL)
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (128, 96)).save(thumbnail_path, 'PNG', pnginfo=png_info)
+    last_access = time.time() - age
+    os.utime(thumbnail_path, (last_access, last_access))
+    return thumbnail
+
+def _exists(thumbnail: Thumbnail) -> bool:
+    return thumbnail.thumbnail_path(NORMAL).exists()
+
+def _collect(thumbnail_cache, **kwargs):
+    return ThumbnailCollector(thumbnail_cache, {NORMAL: CachePolicy(**kwargs)}).collect()
+
+####################################################################################################
+
+def test_outdated(tmp_path, thumbnail_cache):
+    kept = _thumbnail(thumbnail_cache, make_image(tmp_path / 'a.jpg'))
+    deleted = _foreign_thumbnail(thumbnail_cache, make_image(tmp_path / 'b.jpg'))
+    modified = _foreign_thumbnail(thumbnail_cache, make_image(tmp_path / 'c.jpg'))
+    unmounted = _thumbnail(thumbnail_cache, make_image(tmp_path / 'medium/d.jpg'))
+    (tmp_path / 'b.jpg').unlink()
+    set_mtime(tmp_path / 'c.jpg', time.time() - 60)
+    (tmp_path / 'medium/d.jpg').unlink()
+    (tmp_path / 'medium').rmdir()
+    statistics = _collect(thumbnail_cache)
+    assert (statistics.scanned, statistics.removed) == (4, 2)
+    # the rule applies to all the applications
+    assert not _exists(deleted) and not _exists(modified)
+    assert _exists(kept) and _exists(unmounted)
+    assert not thumbnail_cache.has_file(deleted.filename, NORMAL)
+
+@pytest.mark.parametrize('all_applications', (False, True))
+def test_max_age(tmp_path, thumbnail_cache, all_applications):
+    old = _thumbnail(thumbnail_cache, make_image(tmp_path / 'a.jpg'), age=10 * DAY)
+    recent = _thumbnail(thumbnail_cache, make_image(tmp_path / 'b.jpg'), age=DAY)
+    foreign = _foreign_thumbnail(thumbnail_cache, make_image(tmp_path / 'c.jpg'), age=10 * DAY)
+    _collect(thumbnail_cache, max_age=5 * DAY, all_applications=all_applications)
+    assert not _exists(old)
+    assert _exists(recent)
+    assert _exists(foreign) != all_applications
+
+@pytest.mark.parametrize('all_applications', (False, True))
+def test_max_bytes(tmp_path, thumbnail_cache, all_applications):
+    thumbnails = [
+        _thumbnail(thumbnail_cache, make_image(tmp_path / f'{i}.jpg'), age=i * DAY)
+        for i in range(4)
+    ]
+    foreign = _foreign_thumbnail(thumbnail_cache, make_image(tmp_path / 'foreign.jpg'), age=10 * DAY)
+    # the two most recently accessed are kept
+    max_bytes = sum(_.thumbnail_path(NORMAL).stat().st_size for _ in thumbnails[:2])
+    _collect(thumbnail_cache, max_bytes=max_bytes, all_applications=all_applications)
+    assert [_exists(_) for _ in thumbnails] == [True, True, False, False]
+    assert _exists(foreign) != all_applications
+
+def test_temporary_file(tmp_path, thumbnail_cache):
+    directory = thumbnail_cache.path_for(NORMAL)
+    directory.mkdir(parents=True, exist_ok=True)
+    killed = directory.joinpath('.killed.png')
+    writing = directory.joinpath('.writing.png')
+    for path in (killed, writing):
+        path.write_bytes(b'')
+    set_mtime(killed, time.time() - 2 * DAY)
+    _collect(thumbnail_cache)
+    assert not killed.exists()
+    assert writing.exists()
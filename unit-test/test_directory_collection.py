@@ -0,0 +1,30 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import pytest
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection
+from ImageBrowser.backend.thumbnail import FreeDesktop
+
+from conftest import make_image
+
+####################################################################################################
+
+def test_images(tmp_path):
+    make_image(tmp_path / 'a.jpg')
+    make_image(tmp_path / 'B.JPG')
+    (tmp_path / 'c.txt').write_text('')
+    collection = DirectoryCollection(tmp_path)
+    assert sorted(_.name for _ in collection) == ['B.JPG', 'a.jpg']
+
+@pytest.mark.skipif(FreeDesktop.rawpy is None, reason="rawpy is not installed")
+def test_raw_images(tmp_path):
+    for name in ('a.cr2', 'b.NEF', 'c.dng'):
+        (tmp_path / name).write_bytes(b'')
+    collection = DirectoryCollection(tmp_path)
+    assert len(collection) == 3
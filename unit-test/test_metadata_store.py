@@ -0,0 +1,83 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import os
+import random
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection
+from ImageBrowser.backend.ImageCollection.MetadataStore import MetadataStore
+
+from conftest import make_image
+
+####################################################################################################
+
+def _store(names: list[str]) -> MetadataStore:
+    store = MetadataStore()
+    for i, name in enumerate(names):
+        store.append(name, i, i, i, 0)
+    return store
+
+def test_columns():
+    store = _store(['a', 'b'])
+    store.update(1, 10, 20, 30, 40)
+    assert len(store) == 2
+    assert store.name(1) == 'b'
+    assert [store.value(_, 1) for _ in ('size', 'mtime_ns', 'inode', 'device')] == [10, 20, 30, 40]
+    store.remove(0)
+    assert store.number_of_removed == 1
+    assert list(store.live_indexes()) == [1]
+
+def test_argsort_column():
+    store = _store(['a', 'b', 'c'])
+    store.update(0, 3, 0, 0, 0)
+    store.remove(1)
+    assert list(store.argsort('size')) == [2, 0]
+
+def test_argsort_names():
+    # tied prefixes longer than a chunk, a name prefix of another, equal names
+    names = [
+        'holiday/2023/IMG_0002.jpg',
+        'holiday/2023/IMG_0001.jpg',
+        'holiday/2023/IMG_0001.jpg',
+        'holiday/2023',
+        'été.jpg',
+        'a.jpg',
+        'holiday/2023/IMG_0001.jpg.jpg',
+    ]
+    store = _store(names)
+    assert list(store.argsort('name')) == [5, 3, 1, 2, 6, 0, 4]
+
+def test_argsort_names_random():
+    random.seed(1)
+    for _ in range(100):
+        names = []
+        for _ in range(random.randint(1, 50)):
+            if names and random.random() < .3:
+                name = random.choice(names) + random.choice(('', 'a', 'aaaaaaaaa'))
+            else:
+                name = ''.join(random.choice('ab/é_0') for _ in range(random.randint(0, 20)))
+            names.append(name)
+        store = _store(names)
+        for index in random.sample(range(len(names)), len(names) // 5):
+            store.remove(index)
+        expected = [
+            _ for _ in sorted(range(len(names)), key=lambda _: os.fsencode(names[_]))
+            if not store.is_removed(_)
+        ]
+        assert list(store.argsort('name')) == expected
+
+####################################################################################################
+
+def test_image_equality(tmp_path):
+    make_image(tmp_path / 'a.jpg')
+    make_image(tmp_path / 'b.jpg')
+    collection = DirectoryCollection(tmp_path)
+    assert collection[0] == collection[0]
+    assert collection[0] != collection[1]
+    assert collection[0] != None
+    assert collection[0] != 'a.jpg'
@@ -0,0 +1,61 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import pytest
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import ImageCollection
+
+####################################################################################################
+
+@pytest.fixture
+def collection():
+    collection = ImageCollection()
+    for name, size, mtime_ns in (('/c', 1, 30), ('/a', 3, 10), ('/b', 2, 20)):
+        collection._append(name, size, mtime_ns, 0, 0)
+    return collection
+
+def test_permutation(collection):
+    assert list(collection.permutation('index')) == [0, 1, 2]
+    assert list(collection.permutation('bytes')) == [1, 2, 0]
+    assert list(collection.permutation('size')) == [0, 2, 1]
+    assert list(collection.permutation('mtime', reverse=True)) == [0, 2, 1]
+
+def test_permutation_is_cached(collection):
+    permutation = collection.permutation('size')
+    assert collection.permutation('size') is permutation
+    # a reader must not modify the cache
+    assert not permutation.flags.writeable
+    # a reverse order is a view
+    assert collection.permutation('size', reverse=True).base is permutation
+
+@pytest.mark.parametrize('change', (
+    lambda _: _._append('/d', 0, 0, 0, 0),
+    lambda _: _._remove(1),
+    lambda _: _._update(0, 10, 30, 0, 0),
+))
+def test_permutation_is_invalidated(collection, change):
+    permutation = collection.permutation('size')
+    change(collection)
+    assert collection.permutation('size') is not permutation
+
+def test_no_cache_for_a_changed_collection(collection):
+    # the loader thread appends an image during a sort
+    argsort = collection.store.argsort
+    def argsort_and_append(column):
+        permutation = argsort(column)
+        collection._append('/d', 0, 0, 0, 0)
+        return permutation
+    collection.store.argsort = argsort_and_append
+    assert len(collection.permutation('size')) == 3
+    collection.store.argsort = argsort
+    assert list(collection.permutation('size')) == [3, 0, 2, 1]
+
+def test_unchanged_update(collection):
+    permutation = collection.permutation('size')
+    assert not collection._update(0, 1, 30, 0, 0)
+    assert collection.permutation('size') is permutation
@@ -0,0 +1,37 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import RecursiveDirectoryCollection
+
+from conftest import make_image
+
+####################################################################################################
+
+def test_scan(tmp_path):
+    for name in ('a.jpg', 'sub/b.jpg', 'sub/subsub/c.jpg', '.hidden/d.jpg'):
+        make_image(tmp_path / name)
+    (tmp_path / 'link').symlink_to(tmp_path / 'sub')
+    collection = RecursiveDirectoryCollection(tmp_path, max_workers=2)
+    names = sorted(collection.name_of(_) for _ in range(len(collection)))
+    assert names == ['a.jpg', 'sub/b.jpg', 'sub/subsub/c.jpg']
+    assert sorted(collection.subdirectories) == ['.hidden', 'link', 'sub']
+
+def test_device_of_a_mount_point(tmp_path, monkeypatch):
+    # an image has the device of its directory
+    make_image(tmp_path / 'a.jpg')
+    make_image(tmp_path / 'mount/b.jpg')
+    device = (tmp_path / 'a.jpg').stat().st_dev
+    other_device = device + 1
+    scan_directory = RecursiveDirectoryCollection._scan_directory
+    def _scan_directory(self, relative_path):
+        dirnames, (_, records) = scan_directory(self, relative_path)
+        return dirnames, (other_device if relative_path == 'mount' else device, records)
+    monkeypatch.setattr(RecursiveDirectoryCollection, '_scan_directory', _scan_directory)
+    collection = RecursiveDirectoryCollection(tmp_path)
+    assert collection[collection.index_of('a.jpg')].device == device
+    assert collection[collection.index_of('mount/b.jpg')].device == other_device
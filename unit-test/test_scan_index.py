@@ -0,0 +1,77 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+from types import SimpleNamespace
+import time
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection
+from ImageBrowser.backend.ImageCollection.ScanIndex import EntryKind, ScanRecord
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailSize
+
+from conftest import make_image, set_mtime
+
+####################################################################################################
+
+def _records(path):
+    return [ScanRecord.from_stat(_.name, EntryKind.IMAGE, _.stat()) for _ in sorted(path.iterdir())]
+
+def test_lookup_up_to_date(tmp_path, scan_index):
+    directory = tmp_path / 'images'
+    make_image(directory / 'a.jpg')
+    set_mtime(directory, time.time() - 3600)
+    records = _records(directory)
+    scan_index.store(directory, directory.stat(), records)
+    assert scan_index.lookup(directory, directory.stat()) == records
+
+def test_racy_directory_is_not_trusted(tmp_path, scan_index):
+    directory = tmp_path / 'images'
+    make_image(directory / 'a.jpg')
+    # modified within the racy delay
+    set_mtime(directory, time.time())
+    scan_index.store(directory, directory.stat(), _records(directory))
+    assert scan_index.lookup(directory, directory.stat()) is None
+
+def test_changed_directory(tmp_path, scan_index):
+    directory = tmp_path / 'images'
+    make_image(directory / 'a.jpg')
+    set_mtime(directory, time.time() - 3600)
+    scan_index.store(directory, directory.stat(), _records(directory))
+    make_image(directory / 'b.jpg')
+    assert scan_index.lookup(directory, directory.stat()) is None
+
+def test_large_inode(tmp_path, scan_index):
+    # seen on some network and overlay file systems
+    inode = 2**64 - 5
+    path = tmp_path / 'images'
+    directory_stat = SimpleNamespace(st_ino=2**63 + 1, st_mtime_ns=time.time_ns() - 3600 * 10**9)
+    records = [ScanRecord('a.jpg', EntryKind.IMAGE, 0o100644, 10, 20, inode)]
+    scan_index.store(path, directory_stat, records)
+    assert scan_index.lookup(path, directory_stat) == records
+
+####################################################################################################
+
+def test_file_rewritten_in_place(tmp_path, scan_index, thumbnail_cache):
+    directory = tmp_path / 'images'
+    path = make_image(directory / 'a.jpg')
+    directory_mtime = time.time() - 3600
+    set_mtime(directory, directory_mtime)
+    DirectoryCollection(directory, index=scan_index)
+    # the directory mtime doesn't change
+    make_image(path, color='blue')
+    set_mtime(path, time.time() - 60)
+    set_mtime(directory, directory_mtime)
+    collection = DirectoryCollection(directory, index=scan_index)
+    image = collection[collection.index_of('a.jpg')]
+    assert image.mtime != path.stat().st_mtime_ns
+    # made by a worker which stat the source
+    thumbnail_path = Thumbnail(thumbnail_cache, path).thumbnail(ThumbnailSize.NORMAL)
+    # the outdated metadata of the collection
+    thumbnail = Thumbnail(thumbnail_cache, path, size=image.size, mtime_ns=image.mtime)
+    assert thumbnail.has_thumbnail(ThumbnailSize.NORMAL)
+    assert thumbnail_path.exists()
+    assert thumbnail.mtime_ns == path.stat().st_mtime_ns
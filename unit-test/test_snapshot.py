@@ -0,0 +1,62 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import time
+
+from ImageBrowser.backend.ImageCollection.ImageCollection import DirectoryCollection
+
+from conftest import make_image, set_mtime
+
+####################################################################################################
+
+def _names(collection, indexes):
+    return sorted(collection[_].name for _ in indexes)
+
+def test_unchanged(tmp_path):
+    for name in ('a.jpg', 'b.jpg'):
+        make_image(tmp_path / name)
+    collection = DirectoryCollection(tmp_path)
+    changes = collection.rescan()
+    assert (changes.added, changes.removed, changes.modified) == ([], [], [])
+    assert not changes.subdirectories_changed
+
+def test_merge(tmp_path):
+    for name in ('a.jpg', 'b.jpg', 'c.jpg', 'd.jpg'):
+        make_image(tmp_path / name)
+    collection = DirectoryCollection(tmp_path)
+    index_of_b = collection.index_of('b.jpg')
+    index_of_d = collection.index_of('d.jpg')
+    (tmp_path / 'b.jpg').unlink()
+    (tmp_path / 'd.jpg').unlink()
+    make_image(tmp_path / '0.jpg')
+    make_image(tmp_path / 'bb.jpg')
+    make_image(tmp_path / 'e.jpg')
+    path = make_image(tmp_path / 'c.jpg', color='blue')
+    set_mtime(path, time.time() - 60)
+    (tmp_path / 'sub').mkdir()
+
+    # the diff doesn't modify the collection
+    snapshot_changes = collection.diff_snapshot(collection.snapshot())
+    assert len(collection) == 4
+    assert sorted(snapshot_changes.removed) == sorted((index_of_b, index_of_d))
+    assert snapshot_changes.subdirectories == ['sub']
+
+    changes = collection.apply_snapshot_changes(snapshot_changes)
+    assert sorted(changes.removed) == sorted((index_of_b, index_of_d))
+    assert _names(collection, changes.added) == ['0.jpg', 'bb.jpg', 'e.jpg']
+    assert _names(collection, changes.modified) == ['c.jpg']
+    assert changes.subdirectories_changed
+    assert collection.subdirectories == ['sub']
+    image = collection[collection.index_of('c.jpg')]
+    assert image.mtime == path.stat().st_mtime_ns
+    assert sorted(collection[_].name for _ in collection.permutation('bytes')) == \
+        ['0.jpg', 'a.jpg', 'bb.jpg', 'c.jpg', 'e.jpg']
+    # now up to date
+    changes = collection.rescan()
+    assert (changes.added, changes.removed, changes.modified) == ([], [], [])
+    assert not changes.subdirectories_changed
@@ -0,0 +1,96 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+import time
+
+from PIL import Image, PngImagePlugin
+import pytest
+
+from ImageBrowser.backend.thumbnail.FreeDesktop import Thumbnail, ThumbnailFailed, ThumbnailSize
+
+from conftest import make_image, set_mtime
+
+NORMAL = ThumbnailSize.NORMAL
+
+####################################################################################################
+
+def _write_thumbnail(thumbnail: Thumbnail, **attributes) -> None:
+    """Write a thumbnail like another application"""
+    png_info = PngImagePlugin.PngInfo()
+    png_info.add_text('Thumb::URI', thumbnail.uri)
+    for key, value in attributes.items():
+        png_info.add_text(f'Thumb::{key}', str(value))
+    path = thumbnail.thumbnail_path(NORMAL)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (128, 96)).save(path, 'PNG', pnginfo=png_info)
+    thumbnail._cache.add_file(thumbnail.filename, NORMAL)
+
+####################################################################################################
+
+def test_thumbnail(tmp_path, thumbnail_cache):
+    path = make_image(tmp_path / 'a.jpg')
+    thumbnail = Thumbnail(thumbnail_cache, path)
+    thumbnail_path = thumbnail.thumbnail(NORMAL)
+    with Image.open(thumbnail_path) as image:
+        assert max(image.size) == 128
+        assert image.info['Thumb::MTime'] == str(thumbnail.mtime)
+        assert image.info['Thumb::Size'] == str(path.stat().st_size)
+    assert Thumbnail(thumbnail_cache, path).has_thumbnail(NORMAL)
+
+def test_modified_source(tmp_path, thumbnail_cache):
+    path = make_image(tmp_path / 'a.jpg')
+    thumbnail_path = Thumbnail(thumbnail_cache, path).thumbnail(NORMAL)
+    set_mtime(path, time.time() - 60)
+    assert not Thumbnail(thumbnail_cache, path).has_thumbnail(NORMAL)
+    # a stale thumbnail is deleted
+    assert not thumbnail_path.exists()
+
+@pytest.mark.parametrize('attributes, valid', (
+    (dict(), False),
+    (dict(MTime=0), False),
+    (dict(MTime=None), True),
+    (dict(MTime=None, Size=1), False),
+    (dict(MTime=None, Size=None), True),
+))
+def test_thumb_attributes(tmp_path, thumbnail_cache, attributes, valid):
+    path = make_image(tmp_path / 'a.jpg')
+    thumbnail = Thumbnail(thumbnail_cache, path)
+    values = dict(MTime=thumbnail.mtime, Size=thumbnail.size)
+    _write_thumbnail(thumbnail, **{key: values[key] if value is None else value
+                                   for key, value in attributes.items()})
+    assert thumbnail.has_thumbnail(NORMAL) == valid
+    assert thumbnail.thumbnail_path(NORMAL).exists() == valid
+
+####################################################################################################
+
+def test_fail_marker(tmp_path, thumbnail_cache, monkeypatch):
+    path = tmp_path / 'a.jpg'
+    path.write_bytes(b'not a JPEG')
+    set_mtime(path, time.time() - 3600)
+    with pytest.raises(Image.UnidentifiedImageError):
+        Thumbnail(thumbnail_cache, path).thumbnail(NORMAL)
+    thumbnail = Thumbnail(thumbnail_cache, path)
+    assert thumbnail.has_failed()
+    # the image is not decoded again
+    monkeypatch.setattr(Thumbnail, '_decode', None)
+    with pytest.raises(ThumbnailFailed):
+        thumbnail.thumbnail(NORMAL)
+    monkeypatch.undo()
+    # the marker is outdated by a new version of the file
+    make_image(path)
+    assert not Thumbnail(thumbnail_cache, path).has_failed()
+    assert Thumbnail(thumbnail_cache, path).thumbnail(NORMAL).exists()
+
+def test_no_fail_marker_for_an_io_error(tmp_path, thumbnail_cache, monkeypatch):
+    path = make_image(tmp_path / 'a.jpg')
+    def _decode(self, size):
+        raise PermissionError(path)
+    monkeypatch.setattr(Thumbnail, '_decode', _decode)
+    with pytest.raises(PermissionError):
+        Thumbnail(thumbnail_cache, path).thumbnail(NORMAL)
+    assert not Thumbnail(thumbnail_cache, path).has_failed()
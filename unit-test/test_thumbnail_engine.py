@@ -0,0 +1,104 @@
+####################################################################################################
+#
+# ImageBrowser — ...
+# Copyright (C) 2024 Fabrice SALVAIRE
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+####################################################################################################
+
+from concurrent.futures import Future
+
+from PySide6.QtCore import QCoreApplication
+import pytest
+
+from ImageBrowser.backend.thumbnail.FreeDesktop import ThumbnailSize
+from ImageBrowser.frontend.ThumbnailEngine import ThumbnailEngine
+
+from conftest import make_image
+
+LARGE = ThumbnailSize.LARGE
+NORMAL = ThumbnailSize.NORMAL
+
+####################################################################################################
+
+class Executor:
+
+    """Record the submitted jobs, a job never completes"""
+
+    def __init__(self) -> None:
+        self.paths = []
+
+    def submit(self, func, path, sizes) -> Future:
+        self.paths.append(path)
+        return Future()
+
+@pytest.fixture
+def engine(thumbnail_cache):
+    # the signals require an application
+    if QCoreApplication.instance() is None:
+        QCoreApplication([])
+    engine = ThumbnailEngine(max_workers=1)
+    engine._executor = Executor()
+    # the jobs are queued until submit is called
+    engine.SUBMITTED_PER_WORKER = 0
+    yield engine
+    engine._executor = None
+
+def submit(engine: ThumbnailEngine) -> list[str]:
+    engine.SUBMITTED_PER_WORKER = 100
+    engine._submit_queued()
+    return [_.rsplit('/', 1)[-1] for _ in engine._executor.paths]
+
+@pytest.fixture
+def paths(tmp_path):
+    return [str(make_image(tmp_path / f'{_}.jpg', size=(8, 8))) for _ in 'abcd']
+
+####################################################################################################
+
+def test_priority(engine, paths):
+    for path, priority in zip(paths, (3, 1, None, 2)):
+        engine.request(path, LARGE, priority=None if priority is None else lambda _=priority: _)
+    assert engine.queue_depth == 4
+    # no priority is 0, then by request order
+    assert submit(engine) == ['c.jpg', 'b.jpg', 'd.jpg', 'a.jpg']
+
+def test_reprioritize(engine, paths):
+    priorities = dict(zip(paths, (1, 2, 3, 4)))
+    for path in paths:
+        engine.request(path, LARGE, priority=lambda path=path: priorities[path])
+    # e.g. the view is scrolled to the end, and the first image is no longer shown
+    priorities.update(zip(paths, (None, 3, 2, 1)))
+    engine.reprioritize()
+    assert engine.queue_depth == 3
+    assert (paths[0], LARGE) not in engine._jobs
+    assert submit(engine) == ['d.jpg', 'c.jpg', 'b.jpg']
+
+def test_request_cancelled_by_priority(engine, paths):
+    engine.request(paths[0], LARGE, priority=lambda: 1)
+    engine.request(paths[0], LARGE, priority=lambda: None)
+    assert engine.queue_depth == 0
+    assert engine.number_of_jobs == 0
+
+def test_cancel(engine, paths):
+    path = paths[0]
+    engine.request(path, LARGE, lambda _: None)
+    # cascade, the NORMAL thumbnail is made by the LARGE job
+    assert engine.number_of_jobs == 2
+    assert not engine.cancel(path, NORMAL)
+    assert engine.cancel(path, LARGE)
+    assert engine.queue_depth == 0
+    assert engine.number_of_jobs == 0
+    assert submit(engine) == []
+
+def test_cancel_keeps_another_requester(engine, paths):
+    path = paths[0]
+    normal = []
+    engine.request(path, LARGE, lambda _: None)
+    engine.request(path, NORMAL, normal.append)
+    # the NORMAL requester still waits for the job
+    assert engine.cancel(path, LARGE)
+    assert engine.queue_depth == 1
+    assert engine._jobs[(path, LARGE)] == []
+    assert engine._jobs[(path, NORMAL)] == [normal.append]
+    assert submit(engine) == ['a.jpg']
+    assert not engine.cancel(path, LARGE)